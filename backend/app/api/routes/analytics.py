@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import List, Optional, Tuple
+import logging
+
+from app.services.analytics_service import (
+    AnalyticsExportService, ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+)
+from app.utils.arrow import ArrowUnavailableError, require_pyarrow
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _resolve_period(
+    year: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> Tuple[date, date]:
+    """
+    年または開始日・終了日から対象期間を決定
+    """
+    if start_date and end_date:
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_date must be on or before end_date"
+            )
+        return start_date, end_date
+    if year:
+        return date(year, 1, 1), date(year, 12, 31)
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Specify year or both start_date and end_date"
+    )
+
+
+def _ensure_pyarrow() -> None:
+    try:
+        require_pyarrow()
+    except ArrowUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/attendance.parquet")
+async def export_attendance_parquet(
+    year: Optional[int] = Query(None, description="年（start_date/end_date未指定時）"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    user_id: Optional[List[int]] = Query(None, description="対象ユーザーID（未指定で全ユーザー）")
+):
+    """
+    勤怠データをParquet形式でエクスポート
+    """
+    _ensure_pyarrow()
+    start, end = _resolve_period(year, start_date, end_date)
+    service = AnalyticsExportService()
+    return StreamingResponse(
+        service.stream_parquet(start, end, user_id),
+        media_type=PARQUET_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="attendance_{start}_{end}.parquet"'}
+    )
+
+
+@router.get("/attendance.arrow")
+async def export_attendance_arrow(
+    year: Optional[int] = Query(None, description="年（start_date/end_date未指定時）"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    user_id: Optional[List[int]] = Query(None, description="対象ユーザーID（未指定で全ユーザー）")
+):
+    """
+    勤怠データをArrow IPCストリーム形式でエクスポート
+    """
+    _ensure_pyarrow()
+    start, end = _resolve_period(year, start_date, end_date)
+    service = AnalyticsExportService()
+    return StreamingResponse(
+        service.stream_arrow(start, end, user_id),
+        media_type=ARROW_STREAM_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="attendance_{start}_{end}.arrows"'}
+    )
@@ -2,122 +2,212 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, extract
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import date, datetime, time
 import logging
+from calendar import monthrange
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.events import event_broker
+from app.core.fast_json import FastJSONResponse, fast_json_available
+from app.core.idempotency import IdempotencyContext, get_idempotency_context
 from app.models.attendance import Attendance
 from app.models.user import User
 from app.schemas.attendance import (
     AttendanceResponse, AttendanceWithBreaks,
     ClockInRequest, ClockOutRequest, AttendanceUpdate, AttendanceCreate,
-    MonthlyCalendarResponse
+    MonthlyCalendarResponse, PunchRequest, PunchAcceptedResponse
 )
+from app.services.archive_service import ArchivedYearError, archive_service
 from app.services.attendance_service import AttendanceService
+from app.services.read_repository import AttendanceReadRepository
+from app.utils.response_shaping import parse_fields, project, shaped_response
+from app.services.punch_buffer import punch_buffer, Punch
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def ensure_writable(value: date) -> None:
+    """
+    アーカイブ済みの年の勤怠は変更できない
+    """
+    try:
+        archive_service.ensure_writable(value)
+    except ArchivedYearError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
 @router.post("/clock-in", response_model=AttendanceResponse)
 async def clock_in(
     request: ClockInRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency: IdempotencyContext = Depends(get_idempotency_context)
 ):
     """
     出勤記録
+    Idempotency-Keyヘッダー指定時は再送に対して保存済みレスポンスを返す
     """
-    service = AttendanceService(db)
-    attendance = await service.clock_in(
-        user_id=request.user_id,
-        clock_in_time=request.time
-    )
-    return attendance
+    async with idempotency:
+        if idempotency.replay_response:
+            return idempotency.replay_response
+        
+        service = AttendanceService(db)
+        attendance = await service.clock_in(
+            user_id=request.user_id,
+            clock_in_time=request.time
+        )
+        return await idempotency.save(AttendanceResponse.model_validate(attendance))
 
 
 @router.post("/clock-out", response_model=AttendanceResponse)
 async def clock_out(
     request: ClockOutRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency: IdempotencyContext = Depends(get_idempotency_context)
 ):
     """
     退勤記録
+    Idempotency-Keyヘッダー指定時は再送に対して保存済みレスポンスを返す
     """
-    service = AttendanceService(db)
-    attendance = await service.clock_out(
-        user_id=request.user_id,
-        clock_out_time=request.time
+    async with idempotency:
+        if idempotency.replay_response:
+            return idempotency.replay_response
+        
+        service = AttendanceService(db)
+        attendance = await service.clock_out(
+            user_id=request.user_id,
+            clock_out_time=request.time
+        )
+        return await idempotency.save(AttendanceResponse.model_validate(attendance))
+
+
+def _to_punch_response(punch: Punch) -> PunchAcceptedResponse:
+    return PunchAcceptedResponse(
+        punch_id=punch.punch_id,
+        user_id=punch.user_id,
+        kind=punch.kind,
+        date=punch.date,
+        punch_time=punch.time
     )
-    return attendance
+
+
+@router.post("/punches", response_model=PunchAcceptedResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_punch(
+    request: PunchRequest,
+    idempotency: IdempotencyContext = Depends(get_idempotency_context)
+):
+    """
+    打刻受付（打刻バッファ経由）
+    追記ログへの永続化で受付完了とし、DBへはバックグラウンドでまとめて反映する
+    """
+    if not punch_buffer.running:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Punch buffer is disabled (set PUNCH_BUFFER_ENABLED=true)"
+        )
+    
+    async with idempotency:
+        if idempotency.replay_response:
+            return idempotency.replay_response
+        
+        punch = await punch_buffer.submit(
+            user_id=request.user_id,
+            kind=request.kind,
+            punch_time=request.punch_time
+        )
+        logger.info(f"Punch {punch.punch_id} accepted for user {punch.user_id}: {punch.kind} at {punch.time}")
+        return await idempotency.save(
+            _to_punch_response(punch),
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+
+@router.get("/punches/pending", response_model=List[PunchAcceptedResponse])
+async def get_pending_punches(
+    user_id: int = Query(default=1)
+):
+    """
+    DB未反映の打刻一覧を取得（他のワーカーが受け付けた打刻を含む）
+    """
+    return [_to_punch_response(punch) for punch in await punch_buffer.pending_for(user_id)]
 
 
 @router.post("/", response_model=AttendanceResponse)
 async def create_attendance(
     attendance_create: AttendanceCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency: IdempotencyContext = Depends(get_idempotency_context)
 ):
     """
     新規勤怠記録作成
     指定された日付で新しい勤怠記録を作成します
+    Idempotency-Keyヘッダー指定時は再送に対して保存済みレスポンスを返す
     """
-    # 指定日付の勤怠記録が既に存在するかチェック
-    result = await db.execute(
-        select(Attendance).where(and_(
-            Attendance.user_id == attendance_create.user_id,
-            Attendance.date == attendance_create.date
-        ))
-    )
-    existing_attendance = result.scalar_one_or_none()
-    
-    if existing_attendance:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Attendance record already exists for {attendance_create.date}"
+    async with idempotency:
+        if idempotency.replay_response:
+            return idempotency.replay_response
+        
+        ensure_writable(attendance_create.date)
+        
+        # 指定日付の勤怠記録が既に存在するかチェック
+        result = await db.execute(
+            select(Attendance).where(and_(
+                Attendance.user_id == attendance_create.user_id,
+                Attendance.date == attendance_create.date
+            ))
         )
-    
-    # 新しい勤怠記録を作成
-    attendance = Attendance(
-        user_id=attendance_create.user_id,
-        date=attendance_create.date,
-        clock_in=attendance_create.clock_in,
-        clock_out=attendance_create.clock_out,
-        total_hours=0,
-        total_amount=0
-    )
-    
-    db.add(attendance)
-    
-    # 労働時間と金額の計算
-    service = AttendanceService(db)
-    await service.calculate_totals(attendance)
-    
-    await db.commit()
-    await db.refresh(attendance)
-    
-    logger.info(f"New attendance record created for user {attendance_create.user_id} on {attendance_create.date}")
-    return attendance
+        existing_attendance = result.scalar_one_or_none()
+        
+        if existing_attendance:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Attendance record already exists for {attendance_create.date}"
+            )
+        
+        # 新しい勤怠記録を作成
+        attendance = Attendance(
+            user_id=attendance_create.user_id,
+            date=attendance_create.date,
+            clock_in=attendance_create.clock_in,
+            clock_out=attendance_create.clock_out,
+            total_hours=0,
+            total_amount=0
+        )
+        
+        db.add(attendance)
+        
+        # 労働時間と金額の計算
+        service = AttendanceService(db)
+        await service.calculate_totals(attendance)
+        
+        await db.commit()
+        await db.refresh(attendance)
+        
+        logger.info(f"New attendance record created for user {attendance_create.user_id} on {attendance_create.date}")
+        await service.publish_attendance_event("attendance.created", attendance)
+        return await idempotency.save(AttendanceResponse.model_validate(attendance))
 
 
 @router.get("/today", response_model=Optional[AttendanceWithBreaks])
 async def get_today_attendance(
     user_id: int = Query(default=1),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     今日の勤怠情報を取得
     """
     today = date.today()
     
-    result = await db.execute(
-        select(Attendance)
-        .where(and_(
-            Attendance.user_id == user_id,
-            Attendance.date == today
-        ))
-        .options(selectinload(Attendance.break_times))
-    )
-    attendance = result.scalar_one_or_none()
+    # 打刻バッファ利用時は自分の打刻が反映されるまで待つ（待ち時間には上限あり）
+    if punch_buffer.running:
+        applied = await punch_buffer.wait_for_user(user_id, settings.PUNCH_READ_WAIT_MS / 1000)
+        if not applied:
+            logger.warning(f"Serving today's attendance for user {user_id} with unapplied punches")
+    
+    # 読み取り専用のため、ORMを経由せずリポジトリの軽量な行で取得
+    attendance = await AttendanceReadRepository(db).for_date(user_id, today)
     
     if not attendance:
         logger.info(f"No attendance record found for user {user_id} on {today}")
@@ -137,21 +227,38 @@ async def get_attendance_list(
     month: Optional[int] = Query(None),
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     勤怠一覧を取得（月別フィルタ対応）
     """
+    conditions = [Attendance.user_id == user_id]
     
-    query = select(Attendance).where(Attendance.user_id == user_id)
+    # 年月フィルタ（パーティションの絞り込みが効くよう日付範囲で指定）
+    if year and month:
+        _, last_day = monthrange(year, month)
+        conditions += [
+            Attendance.date >= date(year, month, 1),
+            Attendance.date <= date(year, month, last_day)
+        ]
+    elif year:
+        conditions += [
+            Attendance.date >= date(year, 1, 1),
+            Attendance.date <= date(year, 12, 31)
+        ]
+    elif month:
+        conditions.append(extract('month', Attendance.date) == month)
     
-    # 年月フィルタ
-    if year:
-        query = query.where(extract('year', Attendance.date) == year)
-    if month:
-        query = query.where(extract('month', Attendance.date) == month)
+    # 高速経路: 行タプルから組み立ててorjsonで送出
+    if settings.FAST_JSON_RESPONSES and fast_json_available():
+        repository = AttendanceReadRepository(db)
+        rows = await repository.fetch(
+            conditions, order_by=Attendance.date.desc(), skip=skip, limit=limit
+        )
+        return FastJSONResponse(rows)
     
     # ソートとページネーション
+    query = select(Attendance).where(and_(*conditions))
     query = query.order_by(Attendance.date.desc()).offset(skip).limit(limit)
     
     # 休憩時間も一緒に取得
@@ -182,6 +289,7 @@ async def update_attendance(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Attendance record not found"
         )
+    ensure_writable(attendance.date)
     
     try:
         service = AttendanceService(db)
@@ -214,6 +322,7 @@ async def update_attendance(
         await db.refresh(attendance)
         
         logger.info(f"Attendance {attendance_id} updated successfully with break times")
+        await service.publish_attendance_event("attendance.updated", attendance)
         return attendance
     
     except Exception as e:
@@ -243,11 +352,22 @@ async def delete_attendance(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Attendance record not found"
         )
+    ensure_writable(attendance.date)
+    
+    user_id = attendance.user_id
+    deleted_date = attendance.date
     
-    await db.delete(attendance)
+    service = AttendanceService(db)
+    await service.delete_attendance(attendance)
     await db.commit()
     
     logger.info(f"Attendance {attendance_id} deleted successfully")
+    await service.invalidate_cache(user_id)
+    await event_broker.publish(
+        "attendance.deleted",
+        user_id,
+        {"id": attendance_id, "date": deleted_date.isoformat()}
+    )
 
 
 @router.get("/calendar", response_model=MonthlyCalendarResponse)
@@ -255,18 +375,38 @@ async def get_monthly_calendar(
     user_id: int = Query(default=1),
     year: int = Query(..., description="年"),
     month: int = Query(..., ge=1, le=12, description="月"),
-    db: AsyncSession = Depends(get_db)
+    detail: Literal["full", "summary", "totals"] = Query(
+        "full", description="summary: 日ごとの勤怠詳細を省く / totals: 集計値のみ（日ごとのデータを返さない）"
+    ),
+    fields: Optional[str] = Query(None, description="返す項目（カンマ区切り、ネストはドット区切り 例: total_hours,calendar_days.status）"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     月間カレンダー形式で勤怠データを取得
     記録がない日も含めて月の全日程を返す
     """
+    excluded = {"full": [], "summary": ["calendar_days.attendance"], "totals": ["calendar_days"]}[detail]
+    try:
+        field_tree = parse_fields(fields, MonthlyCalendarResponse, exclude=excluded)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     service = AttendanceService(db)
+    if detail == "totals":
+        # 集計クエリのみ（勤怠の行を取得しない）
+        totals = await service.get_monthly_calendar_totals(user_id, year, month)
+        return shaped_response(project(totals, field_tree))
+    
     calendar_data = await service.get_monthly_calendar_summary(
         user_id=user_id,
         year=year,
-        month=month
+        month=month,
+        include_attendance=detail == "full"
     )
     
     logger.info(f"Monthly calendar retrieved for user {user_id}, {year}/{month}")
+    if detail == "summary" or field_tree:
+        return shaped_response(project(calendar_data, field_tree))
+    if settings.FAST_JSON_RESPONSES and fast_json_available():
+        return FastJSONResponse(calendar_data)
     return calendar_data
\ No newline at end of file
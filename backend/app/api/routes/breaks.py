@@ -5,103 +5,134 @@ from typing import List
 from datetime import datetime, time
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.events import event_broker
+from app.core.idempotency import IdempotencyContext, get_idempotency_context
 from app.models.break_time import BreakTime
 from app.models.attendance import Attendance
 from app.schemas.break_time import (
     BreakTimeResponse, BreakTimeUpdate,
     BreakStartRequest, BreakEndRequest
 )
+from app.services.archive_service import ArchivedYearError, archive_service
 from app.services.break_service import BreakService, BreakServiceError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+async def _ensure_writable(db: AsyncSession, break_time: BreakTime) -> None:
+    """
+    アーカイブ済みの年の勤怠の休憩は変更できない
+    """
+    attendance_date = break_time.attendance_date
+    if attendance_date is None:
+        attendance = await db.get(Attendance, break_time.attendance_id)
+        attendance_date = attendance.date if attendance else None
+    if attendance_date is None:
+        return
+    try:
+        archive_service.ensure_writable(attendance_date)
+    except ArchivedYearError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
 @router.post("/start", response_model=BreakTimeResponse)
 async def start_break(
     request: BreakStartRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency: IdempotencyContext = Depends(get_idempotency_context)
 ):
     """
     休憩開始
+    Idempotency-Keyヘッダー指定時は再送に対して保存済みレスポンスを返す
     """
-    try:
-        service = BreakService(db)
-        break_time = await service.start_break(
-            attendance_id=request.attendance_id,
-            start_time=request.time
-        )
-        logger.info(f"Break started successfully for attendance {request.attendance_id}: {break_time.id}")
-        logger.debug(f"Break start response: id={break_time.id}, start_time={break_time.start_time}, attendance_id={break_time.attendance_id}")
-        return break_time
-    except BreakServiceError as e:
-        logger.warning(f"Break start validation error: {e.message} (code: {e.error_code})")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "message": e.message,
-                "error_code": e.error_code,
-                "error_type": "break_error"
-            }
-        )
-    except Exception as e:
-        logger.error(f"Unexpected error starting break: {e}")
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "message": "休憩開始処理に失敗しました。再度お試しください。",
-                "error_code": "INTERNAL_ERROR",
-                "error_type": "system_error"
-            }
-        )
+    async with idempotency:
+        if idempotency.replay_response:
+            return idempotency.replay_response
+        
+        try:
+            service = BreakService(db)
+            break_time = await service.start_break(
+                attendance_id=request.attendance_id,
+                start_time=request.time
+            )
+            logger.info(f"Break started successfully for attendance {request.attendance_id}: {break_time.id}")
+            logger.debug(f"Break start response: id={break_time.id}, start_time={break_time.start_time}, attendance_id={break_time.attendance_id}")
+            return await idempotency.save(BreakTimeResponse.model_validate(break_time))
+        except BreakServiceError as e:
+            logger.warning(f"Break start validation error: {e.message} (code: {e.error_code})")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": e.message,
+                    "error_code": e.error_code,
+                    "error_type": "break_error"
+                }
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error starting break: {e}")
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail={
+                    "message": "休憩開始処理に失敗しました。再度お試しください。",
+                    "error_code": "INTERNAL_ERROR",
+                    "error_type": "system_error"
+                }
+            )
 
 
 @router.post("/end", response_model=BreakTimeResponse)
 async def end_break(
     request: BreakEndRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency: IdempotencyContext = Depends(get_idempotency_context)
 ):
     """
     休憩終了
+    Idempotency-Keyヘッダー指定時は再送に対して保存済みレスポンスを返す
     """
-    try:
-        service = BreakService(db)
-        break_time = await service.end_break(
-            break_id=request.break_id,
-            end_time=request.time
-        )
-        logger.info(f"Break {request.break_id} ended successfully: duration={break_time.duration} minutes")
-        logger.debug(f"Break end response: id={break_time.id}, end_time={break_time.end_time}, duration={break_time.duration}, attendance_id={break_time.attendance_id}")
-        return break_time
-    except BreakServiceError as e:
-        logger.warning(f"Break end validation error: {e.message} (code: {e.error_code})")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "message": e.message,
-                "error_code": e.error_code,
-                "error_type": "break_error"
-            }
-        )
-    except Exception as e:
-        logger.error(f"Unexpected error ending break {request.break_id}: {e}")
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "message": "休憩終了処理に失敗しました。再度お試しください。",
-                "error_code": "INTERNAL_ERROR",
-                "error_type": "system_error"
-            }
-        )
+    async with idempotency:
+        if idempotency.replay_response:
+            return idempotency.replay_response
+        
+        try:
+            service = BreakService(db)
+            break_time = await service.end_break(
+                break_id=request.break_id,
+                end_time=request.time
+            )
+            logger.info(f"Break {request.break_id} ended successfully: duration={break_time.duration} minutes")
+            logger.debug(f"Break end response: id={break_time.id}, end_time={break_time.end_time}, duration={break_time.duration}, attendance_id={break_time.attendance_id}")
+            return await idempotency.save(BreakTimeResponse.model_validate(break_time))
+        except BreakServiceError as e:
+            logger.warning(f"Break end validation error: {e.message} (code: {e.error_code})")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": e.message,
+                    "error_code": e.error_code,
+                    "error_type": "break_error"
+                }
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error ending break {request.break_id}: {e}")
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail={
+                    "message": "休憩終了処理に失敗しました。再度お試しください。",
+                    "error_code": "INTERNAL_ERROR",
+                    "error_type": "system_error"
+                }
+            )
 
 
 @router.get("/{attendance_id}", response_model=List[BreakTimeResponse])
 async def get_breaks_by_attendance(
     attendance_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     特定の勤怠に紐づく休憩時間一覧を取得
@@ -160,6 +191,7 @@ async def update_break(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Break time record {break_id} not found"
             )
+        await _ensure_writable(db, break_time)
         
         # 更新データの適用
         update_data = break_update.model_dump(exclude_unset=True)
@@ -176,19 +208,23 @@ async def update_break(
         # 休憩時間の再計算
         service = BreakService(db)
         await service.calculate_duration(break_time)
+        await db.flush()
         
-        await db.commit()
-        await db.refresh(break_time)
-        
-        # 勤怠の合計時間も更新
+        # 勤怠の合計時間も同じトランザクションで更新
         from app.services.attendance_service import AttendanceService
         attendance_service = AttendanceService(db)
         attendance = await db.get(Attendance, break_time.attendance_id)
         if attendance:
             await attendance_service.calculate_totals(attendance)
-            await db.commit()
+        
+        await db.commit()
+        await db.refresh(break_time)
         
         logger.info(f"Break time {break_id} updated successfully")
+        if attendance:
+            await db.refresh(attendance)
+            await service.publish_break_event("break.updated", break_time, attendance.user_id)
+            await attendance_service.publish_attendance_event("attendance.updated", attendance)
         return break_time
     
     except HTTPException:
@@ -222,21 +258,31 @@ async def delete_break(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Break time record {break_id} not found"
             )
+        await _ensure_writable(db, break_time)
         
         attendance_id = break_time.attendance_id
         
         await db.delete(break_time)
-        await db.commit()
+        await db.flush()
         
-        # 勤怠の合計時間も更新
+        # 勤怠の合計時間も同じトランザクションで更新
         from app.services.attendance_service import AttendanceService
         attendance_service = AttendanceService(db)
         attendance = await db.get(Attendance, attendance_id)
         if attendance:
             await attendance_service.calculate_totals(attendance)
-            await db.commit()
+        
+        await db.commit()
         
         logger.info(f"Break time {break_id} deleted successfully")
+        if attendance:
+            await db.refresh(attendance)
+            await event_broker.publish(
+                "break.deleted",
+                attendance.user_id,
+                {"id": break_id, "attendance_id": attendance_id}
+            )
+            await attendance_service.publish_attendance_event("attendance.updated", attendance)
     
     except HTTPException:
         raise
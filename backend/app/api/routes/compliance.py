@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import logging
+
+from app.core.database import get_db, get_read_db
+from app.schemas.compliance import OvertimeComplianceEntry
+from app.services.overtime_service import OvertimeService
+from app.utils.timezone import today_jst
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/overtime", response_model=List[OvertimeComplianceEntry])
+async def get_overtime_compliance(
+    year: Optional[int] = Query(None, description="年（未指定で今月）"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="月（未指定で今月）"),
+    warning_ratio: Optional[float] = Query(None, gt=0, le=1, description="上限に対する警告の割合"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    36協定の上限に近い・超えているユーザーの一覧を取得
+    """
+    today = today_jst()
+    service = OvertimeService(db)
+    return await service.get_compliance(
+        year=year or today.year,
+        month=month or today.month,
+        warning_ratio=warning_ratio
+    )
+
+
+@router.post("/overtime/rebuild")
+async def rebuild_overtime_accumulators(
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    時間外労働の累計を勤怠データから作り直す
+    """
+    service = OvertimeService(db)
+    count = await service.rebuild()
+    await db.commit()
+    return {"accumulators": count}
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.core.fast_json import FastJSONResponse, fast_json_available
+from app.schemas.dashboard import DashboardResponse
+from app.services.attendance_service import AttendanceService
+from app.services.punch_buffer import punch_buffer
+from app.services.read_repository import AttendanceReadRepository
+from app.utils.timezone import today_jst
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/", response_model=DashboardResponse)
+async def get_dashboard(
+    user_id: int = Query(default=1),
+    year: Optional[int] = Query(None, description="年（未指定で今月）"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="月（未指定で今月）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    ダッシュボードの初期表示に必要なデータを1回で取得
+    ユーザー・月の勤怠・休憩を2回のクエリで取得し、今日の勤怠と月間カレンダーを組み立てる
+    """
+    today = today_jst()
+    year = year or today.year
+    month = month or today.month
+    
+    # 打刻バッファ利用時は自分の打刻が反映されるまで待つ（/api/attendance/today と同じ）
+    if punch_buffer.running:
+        applied = await punch_buffer.wait_for_user(user_id, settings.PUNCH_READ_WAIT_MS / 1000)
+        if not applied:
+            logger.warning(f"Serving dashboard for user {user_id} with unapplied punches")
+    
+    user, attendances = await AttendanceReadRepository(db).user_with_month(
+        user_id, year, month, include_date=today
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    # 同じ勤怠の行から今日の勤怠とカレンダーを組み立てる
+    today_attendance = next((a for a in attendances if a.date == today), None)
+    calendar_days = AttendanceService.build_calendar_days(year, month, attendances)
+    
+    content = {
+        "user": user,
+        "today": today_attendance,
+        "calendar": AttendanceService.summarize_calendar(year, month, calendar_days)
+    }
+    
+    logger.info(f"Dashboard retrieved for user {user_id}, {year}/{month}")
+    if settings.FAST_JSON_RESPONSES and fast_json_available():
+        return FastJSONResponse(content)
+    return content
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncGenerator, List, Optional
+import json
+import logging
+
+from app.core.events import event_broker, AttendanceEvent
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# ハートビート間隔（秒）: プロキシによる切断を防ぐ
+HEARTBEAT_INTERVAL = 15.0
+
+
+def _format_event(event: AttendanceEvent) -> str:
+    """
+    Server-Sent Events形式に変換
+    """
+    data = json.dumps(event.to_payload(), ensure_ascii=False, default=str)
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    user_id: Optional[List[int]] = Query(
+        default=None,
+        description="購読するユーザーID（複数指定でチーム単位、未指定で全ユーザー）"
+    )
+):
+    """
+    勤怠変更イベントをSSEで配信
+    """
+    async def event_generator() -> AsyncGenerator[str, None]:
+        # 購読は送出の開始時に作成する（送出前に切断された場合に購読が残らないように）
+        async with event_broker.subscribe(user_id) as subscription:
+            logger.info(f"Event stream opened for users: {user_id or 'all'}")
+            yield ": connected\n\n"
+            while True:
+                if await request.is_disconnected():
+                    logger.info(f"Event stream closed for users: {user_id or 'all'}")
+                    break
+
+                event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield _format_event(event)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
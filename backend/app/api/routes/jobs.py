@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import logging
+
+from app.core.database import get_db
+from app.models.job import Job
+from app.schemas.job import JobCreate, JobResponse
+from app.services import job_handlers  # noqa: F401 組み込みジョブの登録
+from app.services.job_service import JOB_STATUSES, JobService, registered_job_types
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def _get_job_or_404(service: JobService, job_id: int) -> Job:
+    job = await service.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_job(
+    request: JobCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ジョブを登録（実行結果は GET /api/jobs/{job_id} で確認）
+    """
+    service = JobService(db)
+    try:
+        return await service.enqueue(
+            request.type,
+            payload=request.payload,
+            priority=request.priority,
+            max_attempts=request.max_attempts,
+            run_after=request.run_after
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    status_filter: Optional[str] = Query(None, alias="status", description="queued / running / succeeded / failed / cancelled"),
+    job_type: Optional[str] = Query(None, alias="type"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ジョブ一覧を取得（新しい順）
+    """
+    if status_filter and status_filter not in JOB_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"status must be one of: {', '.join(JOB_STATUSES)}"
+        )
+    service = JobService(db)
+    return await service.list_jobs(status=status_filter, job_type=job_type, limit=limit)
+
+
+@router.get("/types", response_model=List[str])
+async def list_job_types():
+    """
+    登録できるジョブの種類
+    """
+    return registered_job_types()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ジョブの状態と結果を取得
+    """
+    return await _get_job_or_404(JobService(db), job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    実行待ちのジョブを取り消す
+    """
+    service = JobService(db)
+    job = await _get_job_or_404(service, job_id)
+    try:
+        return await service.cancel(job)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+
+@router.post("/{job_id}/retry", response_model=JobResponse)
+async def retry_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    失敗・取り消したジョブを再実行
+    """
+    service = JobService(db)
+    job = await _get_job_or_404(service, job_id)
+    try:
+        return await service.retry(job)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Literal, Optional
 import logging
 
-from app.core.database import get_db
-from app.schemas.reports import MonthlyReport, YearlyReport
+from app.core.cache import Cache, get_cache, reports_namespace
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.core.fast_json import FastJSONResponse, fast_json_available
+from app.core.single_flight import data_version, single_flight
+from app.schemas.reports import MonthlyReport, PayPeriodList, PayPeriodRange, PeriodReport, YearlyReport
+from app.services.archive_service import archive_service
+from app.services.pay_period import default_pay_periods
 from app.services.report_service import ReportService
+from app.utils.response_shaping import parse_fields, project, shaped_response
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,32 +23,143 @@ async def get_monthly_report(
     user_id: int = Query(default=1),
     year: int = Query(..., description="年"),
     month: int = Query(..., ge=1, le=12, description="月"),
-    db: AsyncSession = Depends(get_db)
+    detail: Literal["full", "summary"] = Query("full", description="summary: 勤怠詳細リストを省く"),
+    fields: Optional[str] = Query(None, description="返す項目（カンマ区切り、ネストはドット区切り 例: total_hours,attendance_list.date）"),
+    db: AsyncSession = Depends(get_read_db),
+    cache: Cache = Depends(get_cache)
 ):
     """
     月次レポートを取得
     """
+    summary = detail == "summary"
+    try:
+        field_tree = parse_fields(fields, MonthlyReport, exclude=["attendance_list"] if summary else [])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # キャッシュになければ集計する。同じ月の集計が実行中なら合流する（結果は共有されるため変更しない）
     service = ReportService(db)
-    report = await service.get_monthly_report(
-        user_id=user_id,
+    report = await cache.get_or_set(
+        reports_namespace(user_id),
+        f"monthly:{year}:{month}",
+        lambda: single_flight.do(
+            "reports.monthly",
+            (user_id, year, month, data_version(user_id)),
+            lambda: service.get_monthly_report_data(user_id, year, month)
+        )
+    )
+    
+    if summary or field_tree:
+        if summary:
+            report = {key: value for key, value in report.items() if key != "attendance_list"}
+        return shaped_response(project(report, field_tree))
+    
+    # 高速経路（アーカイブ済みの年は検証済みのモデルで読み込まれるため通常の経路）
+    if settings.FAST_JSON_RESPONSES and fast_json_available() and not archive_service.is_archived(year):
+        return FastJSONResponse(report)
+    
+    return MonthlyReport(**report)
+
+
+@router.get("/periods", response_model=PayPeriodList)
+async def get_pay_periods(year: int = Query(..., description="年")):
+    """
+    年の給与期間（締め日による1〜12月度）の一覧を取得
+    """
+    calendar = default_pay_periods()
+    return PayPeriodList(
         year=year,
-        month=month
+        closing_day=calendar.closing_day,
+        periods=[
+            PayPeriodRange(
+                period=pay_period.period,
+                start_date=pay_period.start_date,
+                end_date=pay_period.end_date,
+                days=pay_period.days
+            )
+            for pay_period in calendar.periods(year)
+        ]
     )
-    return report
+
+
+@router.get("/period", response_model=PeriodReport)
+async def get_period_report(
+    user_id: int = Query(default=1),
+    year: int = Query(..., description="年"),
+    period: int = Query(..., ge=1, le=12, description="月度（締め日のある月、20日締めの10月度は9/21〜10/20）"),
+    detail: Literal["full", "summary"] = Query("full", description="summary: 勤怠詳細リストを省く"),
+    fields: Optional[str] = Query(None, description="返す項目（カンマ区切り、ネストはドット区切り 例: total_hours,attendance_list.date）"),
+    db: AsyncSession = Depends(get_read_db),
+    cache: Cache = Depends(get_cache)
+):
+    """
+    給与期間（締め日による月度）のレポートを取得
+    """
+    summary = detail == "summary"
+    try:
+        field_tree = parse_fields(fields, PeriodReport, exclude=["attendance_list"] if summary else [])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # 締め日を変えた場合に古い期間の集計を返さないよう、キーに締め日を含める
+    calendar = default_pay_periods()
+    pay_period = calendar.resolve(year, period)
+    service = ReportService(db)
+    report = await cache.get_or_set(
+        reports_namespace(user_id),
+        f"period:{calendar.closing_day}:{year}:{period}",
+        lambda: single_flight.do(
+            "reports.period",
+            (user_id, calendar.closing_day, year, period, data_version(user_id)),
+            lambda: service.get_period_report_data(user_id, year, period)
+        )
+    )
+    
+    if summary or field_tree:
+        if summary:
+            report = {key: value for key, value in report.items() if key != "attendance_list"}
+        return shaped_response(project(report, field_tree))
+    
+    # 高速経路（期間がアーカイブ済みの年にかかる場合は通常の経路）
+    archived = any(
+        archive_service.is_archived(y)
+        for y in range(pay_period.start_date.year, pay_period.end_date.year + 1)
+    )
+    if settings.FAST_JSON_RESPONSES and fast_json_available() and not archived:
+        return FastJSONResponse(report)
+    
+    return PeriodReport(**report)
 
 
 @router.get("/yearly", response_model=YearlyReport)
 async def get_yearly_report(
     user_id: int = Query(default=1),
     year: int = Query(..., description="年"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    cache: Cache = Depends(get_cache)
 ):
     """
     年次レポートを取得
     """
     service = ReportService(db)
-    report = await service.get_yearly_report(
-        user_id=user_id,
-        year=year
+    report = await cache.get_or_set(
+        reports_namespace(user_id),
+        f"yearly:{year}",
+        lambda: single_flight.do(
+            "reports.yearly",
+            (user_id, year, data_version(user_id)),
+            lambda: service.get_yearly_report(user_id=user_id, year=year)
+        )
     )
-    return report
\ No newline at end of file
+    return report
+
+
+@router.get("/metrics")
+async def get_report_metrics(cache: Cache = Depends(get_cache)):
+    """
+    レポート集計の実行数・合流数とキャッシュの統計（ワーカーごと）
+    """
+    return {
+        "single_flight": single_flight.stats(),
+        "cache": cache.stats()
+    }
\ No newline at end of file
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.schemas.sync import SyncResponse
+from app.services.sync_service import SyncCursorExpired, SyncService
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/", response_model=SyncResponse)
+async def sync_changes(
+    user_id: int = Query(default=1),
+    since: Optional[str] = Query(None, description="前回のレスポンスのcursor（省略すると全件）"),
+    limit: int = Query(default=settings.SYNC_PAGE_SIZE, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db)  # レプリカの遅延で変更を取りこぼさないようプライマリを使う
+):
+    """
+    前回の同期以降に作成・更新・削除された勤怠と休憩を取得
+    has_moreがtrueの間はcursorをsinceに渡して続けて取得する
+    """
+    try:
+        return await SyncService(db).changes(user_id, since=since, limit=limit)
+    except SyncCursorExpired as e:
+        # 削除記録が残っていないため差分では同期できない
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Literal, Optional
+from decimal import Decimal
 import logging
 
+from app.core.cache import Cache, get_cache, user_namespace
 from app.core.database import get_db
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserSearchResponse
+from app.services.user_search_service import UserSearchService
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -15,13 +18,18 @@ logger = logging.getLogger(__name__)
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
     user_id: int = 4,  # Admin固定ログイン
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache)
 ):
     """
     現在のユーザー情報を取得
     """
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    async def load_user() -> Optional[UserResponse]:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        return UserResponse.model_validate(user) if user else None
+    
+    user = await cache.get_or_set(user_namespace(user_id), "profile", load_user)
     
     if not user:
         raise HTTPException(
@@ -36,7 +44,8 @@ async def get_current_user(
 async def update_current_user(
     user_update: UserUpdate,
     user_id: int = 4,  # Admin固定ログイン
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache)
 ):
     """
     現在のユーザー情報を更新
@@ -57,6 +66,7 @@ async def update_current_user(
     
     await db.commit()
     await db.refresh(user)
+    await cache.invalidate(user_namespace(user_id))
     
     logger.info(f"User {user_id} updated successfully")
     return user
@@ -66,7 +76,8 @@ async def update_current_user(
 async def update_hourly_rate(
     hourly_rate: float,
     user_id: int = 4,  # Admin固定ログイン
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache)
 ):
     """
     時給を更新
@@ -89,6 +100,7 @@ async def update_hourly_rate(
     user.hourly_rate = hourly_rate
     await db.commit()
     await db.refresh(user)
+    await cache.invalidate(user_namespace(user_id))
     
     logger.info(f"User {user_id} hourly rate updated to {hourly_rate}")
     return user
@@ -108,6 +120,32 @@ async def get_all_users(
     return users
 
 
+@router.get("/search", response_model=UserSearchResponse)
+async def search_users(
+    q: Optional[str] = Query(None, max_length=100, description="名前・メールアドレスの検索語"),
+    mode: Literal["substring", "prefix"] = Query("substring", description="substring: 部分一致 / prefix: 前方一致"),
+    min_hourly_rate: Optional[Decimal] = Query(None, ge=0, description="時給の下限"),
+    max_hourly_rate: Optional[Decimal] = Query(None, ge=0, description="時給の上限"),
+    cursor: Optional[str] = Query(None, description="前回のレスポンスのnext_cursor"),
+    limit: int = Query(default=50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ユーザーを検索（名前順、next_cursorで続きを取得）
+    """
+    try:
+        return await UserSearchService(db).search(
+            q=q,
+            mode=mode,
+            min_hourly_rate=min_hourly_rate,
+            max_hourly_rate=max_hourly_rate,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_create: UserCreate,
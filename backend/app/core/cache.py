@@ -0,0 +1,397 @@
+"""
+キャッシュ（インメモリLRU / Redis互換）
+
+値は名前空間ごとに保存し、無効化は名前空間単位で行う（例: reports:<user_id>）。
+名前空間には世代番号があり、無効化すると世代が進んで古い世代の値は読まれなくなる。
+計算中に無効化された場合も、計算開始時の世代で保存しようとするため古い値は残らない。
+
+CACHE_BACKEND:
+    memory: プロセス内のTTL付きLRU（既定）
+    redis:  Redisプロトコルのサーバー（redisパッケージが必要、値はpickleで保存）
+    none:   キャッシュしない
+
+値がNoneの場合はキャッシュされない。呼び出し側は取得した値を変更しないこと（インメモリでは共有される）。
+"""
+
+import logging
+import pickle
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple, TypeVar
+
+from app.core.cache_invalidation import InvalidationBus, create_invalidation_bus
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis未インストール時はインメモリのみ
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+USERS_NAMESPACE = "users"
+REPORTS_NAMESPACE = "reports"
+
+
+def user_namespace(user_id: int) -> str:
+    return f"{USERS_NAMESPACE}:{user_id}"
+
+
+def reports_namespace(user_id: int) -> str:
+    return f"{REPORTS_NAMESPACE}:{user_id}"
+
+
+class CacheBackend(ABC):
+    """
+    キャッシュの保存先の基底クラス
+    """
+    name = "base"
+    # ワーカー間で共有される保存先か（共有されない場合は無効化を他のワーカーに伝える）
+    shared = False
+
+    @abstractmethod
+    async def generation(self, namespace: str) -> int:
+        """
+        名前空間の現在の世代番号（無効化のたびに進む）
+        """
+
+    @abstractmethod
+    async def get(self, namespace: str, generation: int, key: str) -> Optional[Any]:
+        """
+        世代番号が一致する値を取得（なければNone）
+        """
+
+    @abstractmethod
+    async def set(self, namespace: str, generation: int, key: str, value: Any, ttl_seconds: int) -> None:
+        """
+        世代番号付きで値を保存
+        """
+
+    @abstractmethod
+    async def invalidate(self, namespace: str) -> None:
+        """
+        名前空間の世代番号を進めて、保存済みの値を無効にする
+        """
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """
+        すべての値を削除
+        """
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        pass
+
+
+class NullCacheBackend(CacheBackend):
+    """
+    何も保存しない（CACHE_BACKEND=none）
+    """
+    name = "none"
+    shared = True
+
+    async def generation(self, namespace: str) -> int:
+        return 0
+
+    async def get(self, namespace: str, generation: int, key: str) -> Optional[Any]:
+        return None
+
+    async def set(self, namespace: str, generation: int, key: str, value: Any, ttl_seconds: int) -> None:
+        pass
+
+    async def invalidate(self, namespace: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    TTL付きLRUのインメモリキャッシュ（ワーカーごと）
+    """
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, float, Any]]" = OrderedDict()
+        self._keys: Dict[str, Set[str]] = {}
+        # 世代は全名前空間で単調増加させる（無効化前の世代が再び使われないように）
+        # 無効化されていない名前空間は_base_generation（clearで全名前空間の世代が進む）
+        self._generations: Dict[str, int] = {}
+        self._counter = count(1)
+        self._base_generation = 0
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, self._base_generation)
+
+    async def get(self, namespace: str, generation: int, key: str) -> Optional[Any]:
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+
+        entry_generation, expires_at, value = entry
+        if entry_generation != generation or expires_at <= time.monotonic():
+            self._remove((namespace, key))
+            return None
+
+        self._entries.move_to_end((namespace, key))
+        return value
+
+    async def set(self, namespace: str, generation: int, key: str, value: Any, ttl_seconds: int) -> None:
+        if generation != self._generations.get(namespace, self._base_generation):
+            # 計算中に無効化された
+            return
+
+        self._entries[(namespace, key)] = (generation, time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end((namespace, key))
+        self._keys.setdefault(namespace, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self._discard_key(oldest)
+            self.evictions += 1
+
+    async def invalidate(self, namespace: str) -> None:
+        self._generations[namespace] = next(self._counter)
+        for key in self._keys.pop(namespace, ()):
+            self._entries.pop((namespace, key), None)
+
+    async def clear(self) -> None:
+        self._base_generation = next(self._counter)
+        self._generations.clear()
+        self._entries.clear()
+        self._keys.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions
+        }
+
+    def _remove(self, entry_key: Tuple[str, str]) -> None:
+        del self._entries[entry_key]
+        self._discard_key(entry_key)
+
+    def _discard_key(self, entry_key: Tuple[str, str]) -> None:
+        namespace, key = entry_key
+        keys = self._keys.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[namespace]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redisプロトコルのキャッシュ（ワーカー間で共有）
+
+    値のキーは <prefix><名前空間>:<世代>:<キー>。無効化は世代のINCRだけで行い、
+    古い世代の値はTTLで消える。LRUによる追い出しはサーバー側の maxmemory-policy に任せる。
+    clientには redis.asyncio.Redis 互換のオブジェクト（fakeredisなど）を渡せる。
+    """
+    name = "redis"
+    shared = True
+
+    def __init__(self, client: Any, prefix: str, generation_ttl_seconds: int):
+        self.client = client
+        self.prefix = prefix
+        self.generation_ttl_seconds = generation_ttl_seconds
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self.prefix}gen:{namespace}"
+
+    def _value_key(self, namespace: str, generation: int, key: str) -> str:
+        return f"{self.prefix}{namespace}:{generation}:{key}"
+
+    async def generation(self, namespace: str) -> int:
+        generation_key = self._generation_key(namespace)
+        value = await self.client.get(generation_key)
+        if value is None:
+            # 世代のキーが消えても以前の世代に戻らないよう現在時刻から始める
+            await self.client.set(generation_key, time.time_ns(), nx=True, ex=self.generation_ttl_seconds)
+            value = await self.client.get(generation_key)
+        return int(value)
+
+    async def get(self, namespace: str, generation: int, key: str) -> Optional[Any]:
+        value = await self.client.get(self._value_key(namespace, generation, key))
+        return pickle.loads(value) if value is not None else None
+
+    async def set(self, namespace: str, generation: int, key: str, value: Any, ttl_seconds: int) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self._value_key(namespace, generation, key), pickle.dumps(value), ex=ttl_seconds)
+            # 世代のキーは値より長く残す
+            pipe.expire(self._generation_key(namespace), max(self.generation_ttl_seconds, ttl_seconds * 2))
+            await pipe.execute()
+
+    async def invalidate(self, namespace: str) -> None:
+        generation_key = self._generation_key(namespace)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(generation_key, time.time_ns(), nx=True)
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, self.generation_ttl_seconds)
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(match=f"{self.prefix}*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class Cache:
+    """
+    名前空間付きのキャッシュ（統計を集計し、保存先のエラーはキャッシュなしとして扱う）
+    """
+
+    def __init__(self, backend: CacheBackend, default_ttl_seconds: int, bus: Optional[InvalidationBus] = None):
+        self.backend = backend
+        self.default_ttl_seconds = default_ttl_seconds
+        self.bus = bus
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+        self.resets = 0
+        self.errors = 0
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        ttl_seconds: Optional[int] = None
+    ) -> T:
+        """
+        キャッシュがあれば返し、なければfnの結果を保存して返す
+        """
+        try:
+            generation = await self.backend.generation(namespace)
+            value = await self.backend.get(namespace, generation, key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache read failed for {namespace}:{key}: {e}")
+            return await fn()
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await fn()
+        if value is not None:
+            try:
+                await self.backend.set(namespace, generation, key, value, ttl_seconds or self.default_ttl_seconds)
+                self.sets += 1
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Cache write failed for {namespace}:{key}: {e}")
+        return value
+
+    async def invalidate(self, namespace: str) -> None:
+        """
+        名前空間の値をすべて無効化し、他のワーカーにも伝える（書き込みのコミット後に呼び出すこと）
+        """
+        try:
+            await self.backend.invalidate(namespace)
+            self.invalidations += 1
+        except Exception as e:
+            # 他の値は残るがTTLで期限切れになる
+            self.errors += 1
+            logger.error(f"Cache invalidation failed for {namespace}: {e}")
+
+        if self.bus is not None:
+            try:
+                await self.bus.publish(namespace)
+            except Exception as e:
+                # 他のワーカーの値はTTLで期限切れになる
+                self.errors += 1
+                logger.warning(f"Failed to broadcast cache invalidation for {namespace}: {e}")
+
+    async def invalidate_local(self, namespace: str) -> None:
+        """
+        他のワーカーから届いた無効化を反映
+        """
+        await self.backend.invalidate(namespace)
+        self.remote_invalidations += 1
+
+    async def reset_local(self) -> None:
+        """
+        無効化を取りこぼした可能性がある場合にローカルの値をすべて消す
+        """
+        await self.backend.clear()
+        self.resets += 1
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.info(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "resets": self.resets,
+            "errors": self.errors,
+            **(self.bus.info() if self.bus is not None else {"bus": None})
+        }
+
+    async def start(self) -> None:
+        """
+        他のワーカーからの無効化の受信を開始
+        """
+        if self.bus is not None:
+            await self.bus.start(self)
+
+    async def close(self) -> None:
+        if self.bus is not None:
+            await self.bus.stop()
+        await self.backend.close()
+
+
+def _create_backend() -> CacheBackend:
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "none":
+        return NullCacheBackend()
+    if backend == "redis":
+        if aioredis is not None:
+            return RedisCacheBackend(
+                aioredis.from_url(settings.CACHE_REDIS_URL),
+                settings.CACHE_KEY_PREFIX,
+                settings.CACHE_GENERATION_TTL_SECONDS
+            )
+        logger.warning("CACHE_BACKEND=redis requires the redis package; falling back to in-memory cache")
+    return InMemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+def _create_cache() -> Cache:
+    backend = _create_backend()
+    bus = None if backend.shared else create_invalidation_bus()
+    return Cache(backend, settings.CACHE_DEFAULT_TTL_SECONDS, bus)
+
+
+# シングルトンインスタンス
+cache = _create_cache()
+
+
+def get_cache() -> Cache:
+    """
+    キャッシュを取得する依存性注入用関数
+    """
+    return cache
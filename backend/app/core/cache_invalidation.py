@@ -0,0 +1,197 @@
+"""
+ワーカー間のキャッシュ無効化
+
+インメモリのキャッシュはワーカーごとのため、あるワーカーで無効化した名前空間を他のワーカーにも伝える。
+    PostgreSQL: イベント中継（app/core/events.py）と同じLISTEN接続で、CACHE_INVALIDATION_CHANNEL に
+                {"namespace": "<名前空間>"}（例: reports:12）を送受信する（再接続も中継が行う）
+    SQLite:     追記専用のファイル（~/.attendance/cache_invalidation.log）に書き、各ワーカーが定期的に読む
+
+CLIなど中継を起動していないプロセスからの無効化も、都度の接続またはファイルへの追記で伝わる。
+受信できなかった無効化はTTLで期限切れになるのを待つ。取りこぼした可能性がある場合
+（再接続時・ファイルが切り詰められた場合）はローカルのキャッシュをすべて消す。
+"""
+
+import asyncio
+import logging
+import pathlib
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.events import WORKER_ID, event_broker
+
+if TYPE_CHECKING:
+    from app.core.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus(ABC):
+    """
+    無効化の中継の基底クラス
+    """
+    name = "base"
+
+    def __init__(self):
+        self._cache: Optional["Cache"] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    @abstractmethod
+    async def start(self, cache: "Cache") -> None:
+        """
+        他のワーカーからの無効化の受信を開始
+        """
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """
+        受信を停止
+        """
+
+    @abstractmethod
+    async def publish(self, namespace: str) -> None:
+        """
+        名前空間の無効化を他のワーカーに伝える（ローカルは呼び出し側で無効化済み）
+        """
+
+    def info(self) -> Dict[str, Any]:
+        return {"bus": self.name}
+
+    def _invalidate_local(self, namespace: str) -> None:
+        # 通知のコールバックは同期関数のためタスクとして実行する
+        task = asyncio.get_running_loop().create_task(self._cache.invalidate_local(namespace))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """
+    イベント中継のLISTEN接続による無効化の中継
+    """
+    name = "postgresql"
+
+    def __init__(self, channel: str):
+        super().__init__()
+        self.channel = channel
+        self._listening = False
+
+    async def start(self, cache: "Cache") -> None:
+        self._cache = cache
+        self._listening = await event_broker.listen(self.channel, self._on_message, on_connect=self._on_connect)
+        if not self._listening:
+            logger.warning("Event bridge is not running; cache invalidations from other workers are not received")
+
+    async def stop(self) -> None:
+        # 接続は中継と共有しているため、停止は中継側で行う
+        self._listening = False
+
+    async def publish(self, namespace: str) -> None:
+        if not await event_broker.send(self.channel, {"namespace": namespace}):
+            logger.warning(f"Cache invalidation for {namespace} not sent (listener disconnected)")
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        namespace = message.get("namespace")
+        if self._listening and namespace:
+            self._invalidate_local(namespace)
+
+    async def _on_connect(self) -> None:
+        # 切断中の無効化を取りこぼしている可能性があるため、ローカルのキャッシュを消す
+        if self._listening:
+            await self._cache.reset_local()
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "listening": self._listening, "connected": event_broker.connected}
+
+
+class FileInvalidationBus(InvalidationBus):
+    """
+    追記専用ファイルによる無効化の中継（SQLiteモード）
+    1行が「ワーカーID 名前空間」。max_bytesを超えたら書き込み側が切り詰める
+    """
+    name = "file"
+
+    def __init__(self, path: pathlib.Path, poll_seconds: float, max_bytes: int):
+        super().__init__()
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.max_bytes = max_bytes
+        self._offset = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, cache: "Cache") -> None:
+        self._cache = cache
+        # 起動前の無効化は不要（キャッシュは空）
+        self._offset = self._size()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, namespace: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        mode = "w" if self._size() > self.max_bytes else "a"
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(f"{WORKER_ID} {namespace}\n")
+
+    def _size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to read cache invalidation log: {e}")
+
+    async def _poll(self) -> None:
+        size = self._size()
+        if size < self._offset:
+            # 切り詰められた（間の無効化を読めていない可能性がある）
+            logger.info("Cache invalidation log was truncated; clearing local cache")
+            await self._cache.reset_local()
+            self._offset = 0
+        if size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+
+        # 書きかけの行は次回に読む
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.decode("utf-8", errors="replace").splitlines():
+            origin, _, namespace = line.partition(" ")
+            if origin != WORKER_ID and namespace:
+                await self._cache.invalidate_local(namespace)
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "listening": self._task is not None, "path": str(self.path)}
+
+
+def _log_path() -> pathlib.Path:
+    if settings.CACHE_INVALIDATION_LOG_PATH:
+        return pathlib.Path(settings.CACHE_INVALIDATION_LOG_PATH)
+    return pathlib.Path.home() / ".attendance" / "cache_invalidation.log"
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    if settings.DB_TYPE.lower() == "sqlite":
+        return FileInvalidationBus(
+            _log_path(),
+            settings.CACHE_INVALIDATION_POLL_SECONDS,
+            settings.CACHE_INVALIDATION_LOG_MAX_BYTES
+        )
+    return PostgresInvalidationBus(settings.CACHE_INVALIDATION_CHANNEL)
@@ -0,0 +1,139 @@
+"""
+レスポンス圧縮ミドルウェア（brotli / gzip）
+
+Accept-Encodingに応じてbrotli（インストール時のみ）またはgzipで圧縮する。
+一定サイズ未満のレスポンスと、SSEやParquetなどのストリーミングレスポンスはそのまま送る
+（ストリームを溜め込むと逐次配信ができなくなるため）。
+"""
+
+import gzip
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli未インストール時はgzipのみ
+    brotli = None
+
+# 圧縮しても小さくならない、または既に圧縮済みの形式
+SKIP_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/vnd.apache.parquet",
+    "application/zip",
+    "application/gzip",
+    "image/",
+)
+
+
+def _accepted_encodings(accept_encoding: str) -> List[Tuple[str, float]]:
+    encodings = []
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings.append((name.strip().lower(), quality))
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    クライアントが受け付ける中から使用する圧縮形式を選ぶ（同じ優先度ならbrotliを優先）
+    """
+    candidates = {"gzip": 1}
+    if brotli is not None:
+        candidates["br"] = 2
+
+    best = None
+    best_key = (0.0, 0)
+    for name, quality in _accepted_encodings(accept_encoding):
+        if name == "*":
+            for candidate, preference in candidates.items():
+                if (quality, preference) > best_key and quality > 0:
+                    best, best_key = candidate, (quality, preference)
+            continue
+        if name in candidates and quality > 0 and (quality, candidates[name]) > best_key:
+            best, best_key = name, (quality, candidates[name])
+    return best
+
+
+class CompressionMiddleware:
+    """
+    一括で送られるレスポンスを圧縮するASGIミドルウェア
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                # 本文を見てから圧縮するか決めるため、ヘッダーの送信を遅らせる
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            if start_message is None:  # pragma: no cover
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            content_type = headers.get("content-type", "")
+            compressible = (
+                not more_body
+                and len(body) >= self.minimum_size
+                and "content-encoding" not in headers
+                and not content_type.startswith(SKIP_CONTENT_TYPES)
+            )
+            if not compressible:
+                # ストリーミングや小さいレスポンスはそのまま流す
+                passthrough = True
+                if not content_type.startswith(SKIP_CONTENT_TYPES):
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
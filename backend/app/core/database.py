@@ -2,20 +2,23 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Generator, AsyncGenerator
+from fastapi import Request
+from typing import Dict, Generator, AsyncGenerator, Optional, Tuple
 import logging
+import time
 
 from app.core.config import settings
+from app.core.events import event_broker, AttendanceEvent
 
 logger = logging.getLogger(__name__)
 
-def _get_async_database_url() -> str:
+def _get_async_database_url(database_url: Optional[str] = None) -> str:
     """
     データベースタイプに応じた非同期データベースURLを生成
     """
-    database_url = settings.DATABASE_URL
+    database_url = database_url or settings.DATABASE_URL
     
-    if settings.DB_TYPE.lower() == "sqlite":
+    if database_url.startswith("sqlite:///"):
         # SQLite用の非同期ドライバを使用
         return database_url.replace("sqlite:///", "sqlite+aiosqlite:///")
     else:
@@ -48,6 +51,22 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+# 読み取り専用レプリカのエンジン（未設定の場合はプライマリと共有）
+if settings.DATABASE_READ_URL:
+    async_read_engine = create_async_engine(
+        _get_async_database_url(settings.DATABASE_READ_URL),
+        **engine_kwargs
+    )
+    AsyncReadSessionLocal = sessionmaker(
+        bind=async_read_engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False
+    )
+else:
+    async_read_engine = async_engine
+    AsyncReadSessionLocal = AsyncSessionLocal
+
 # 同期エンジンの作成（マイグレーション用）
 sync_engine_kwargs = {
     "echo": settings.DEBUG,
@@ -78,6 +97,59 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+# (種別, ID) -> 最終書き込み時刻（他ワーカーの書き込みもイベント経由で記録される）
+_recent_writes: Dict[Tuple[str, int], float] = {}
+
+
+def _record_write(event: AttendanceEvent) -> None:
+    now = time.monotonic()
+    _recent_writes[("user", event.user_id)] = now
+    
+    attendance_id = event.data.get("attendance_id") if event.type.startswith("break.") else event.data.get("id")
+    if attendance_id is not None:
+        _recent_writes[("attendance", attendance_id)] = now
+    
+    # 期限切れのエントリを掃除
+    if len(_recent_writes) > 10000:
+        cutoff = now - settings.READ_AFTER_WRITE_WINDOW_SECONDS
+        for key in [k for k, t in _recent_writes.items() if t < cutoff]:
+            del _recent_writes[key]
+
+
+event_broker.add_listener(_record_write)
+
+
+def _wrote_recently(kind: str, value: Optional[str]) -> bool:
+    if not value or not value.isdigit():
+        return False
+    
+    written_at = _recent_writes.get((kind, int(value)))
+    return (
+        written_at is not None
+        and time.monotonic() - written_at < settings.READ_AFTER_WRITE_WINDOW_SECONDS
+    )
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    読み取り専用ハンドラー用の非同期データベースセッション
+    レプリカ設定時はレプリカを使い、直前に書き込みがあったユーザー・勤怠はプライマリを使う
+    """
+    session_factory = AsyncReadSessionLocal
+    
+    if session_factory is not AsyncSessionLocal and (
+        _wrote_recently("user", request.query_params.get("user_id"))
+        or _wrote_recently("attendance", request.path_params.get("attendance_id"))
+    ):
+        session_factory = AsyncSessionLocal
+    
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 def get_sync_db() -> Generator:
     """
     同期データベースセッションの依存性注入用関数（マイグレーション用）
@@ -101,7 +173,7 @@ async def create_tables():
     """
     try:
         # モデルをインポートしてテーブル定義を読み込む
-        from app.models import user, attendance, break_time
+        from app.models import user, attendance, break_time, idempotency_key, overtime_accumulator, job, sync_tombstone
         
         logger.info(f"Creating tables for {settings.DB_TYPE} database...")
         
@@ -126,13 +198,29 @@ def initialize_database():
     """
     try:
         # モデルをインポートしてテーブル定義を読み込む
-        from app.models import user, attendance, break_time
+        from app.models import user, attendance, break_time, idempotency_key, overtime_accumulator, job, sync_tombstone
         
         logger.info(f"Initializing {settings.DB_TYPE} database...")
         
         # テーブルを作成
         Base.metadata.create_all(bind=sync_engine)
         
+        # 既存テーブルへのスキーマ追加分を反映
+        from app.core.migrations import upgrade_schema
+        upgrade_schema(sync_engine)
+        
+        # ユーザー検索用のインデックス（pg_trgm / FTS5）
+        from app.core.search_index import setup_user_search
+        setup_user_search(sync_engine)
+        
+        # PostgreSQLの場合は勤怠テーブルのパーティションを準備
+        from app.core.partitioning import setup_partitioning
+        setup_partitioning(sync_engine)
+        
+        # 差分同期用の変更の順序を振るトリガー（パーティション化でテーブルを作り直した後に作成する）
+        from app.core.sync_versioning import setup_sync_versioning
+        setup_sync_versioning(sync_engine)
+        
         logger.info("Database initialization completed successfully")
         
     except Exception as e:
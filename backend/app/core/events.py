@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ワーカー識別子（自分が送ったNOTIFYを二重配信しないために使用）
+WORKER_ID = uuid.uuid4().hex
+
+
+@dataclass
+class AttendanceEvent:
+    """
+    勤怠変更イベント
+    """
+    type: str
+    user_id: int
+    data: Dict[str, Any] = field(default_factory=dict)
+    id: int = 0
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "type": self.type,
+            "user_id": self.user_id,
+            "data": self.data
+        }
+
+
+class Subscription:
+    """
+    イベント購読（ユーザーIDで絞り込み可能）
+    """
+
+    def __init__(self, broker: "EventBroker", user_ids: Optional[Set[int]], max_queue_size: int):
+        self._broker = broker
+        self.user_ids = user_ids
+        self.queue: "asyncio.Queue[AttendanceEvent]" = asyncio.Queue(maxsize=max_queue_size)
+
+    def matches(self, event: AttendanceEvent) -> bool:
+        return self.user_ids is None or event.user_id in self.user_ids
+
+    def put(self, event: AttendanceEvent) -> None:
+        # 遅いクライアントで全体が詰まらないよう、溢れたら古いイベントを捨てる
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[AttendanceEvent]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._broker.unsubscribe(self)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+
+class EventBroker:
+    """
+    プロセス内Pub/Sub
+    PostgreSQLの場合はLISTEN/NOTIFYで他ワーカーにも配信する
+    """
+
+    def __init__(self, channel: str = "attendance_events", max_queue_size: int = 100):
+        self.channel = channel
+        self.max_queue_size = max_queue_size
+        self._subscriptions: Set[Subscription] = set()
+        self._listeners: List[Callable[[AttendanceEvent], None]] = []
+        self._sequence = 0
+        self._bridge: Optional[_PostgresBridge] = None
+
+    def subscribe(self, user_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """
+        購読を開始（user_idsがNoneの場合は全ユーザー）
+        """
+        subscription = Subscription(
+            self,
+            set(user_ids) if user_ids else None,
+            self.max_queue_size
+        )
+        self._subscriptions.add(subscription)
+        logger.debug(f"Event subscription added (total: {len(self._subscriptions)})")
+        return subscription
+
+    def add_listener(self, listener: Callable[[AttendanceEvent], None]) -> None:
+        """
+        アプリ内部向けの同期リスナーを登録（他ワーカーからのイベントも通知される）
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        logger.debug(f"Event subscription removed (total: {len(self._subscriptions)})")
+
+    async def publish(self, event_type: str, user_id: int, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        イベントを発行する（コミット後に呼び出すこと）
+        """
+        event = AttendanceEvent(type=event_type, user_id=user_id, data=data or {})
+        self._dispatch(event)
+
+        if self._bridge:
+            await self._bridge.notify(event)
+
+    def _dispatch(self, event: AttendanceEvent) -> None:
+        self._sequence += 1
+        event.id = self._sequence
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Event listener failed for {event.type}: {e}")
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription.put(event)
+
+    async def start(self) -> None:
+        """
+        PostgreSQLの場合はLISTEN/NOTIFYのブリッジを起動
+        """
+        if settings.DB_TYPE.lower() == "sqlite":
+            logger.info("Event broker running in in-process mode")
+            return
+
+        self._bridge = _PostgresBridge(
+            self, settings.DATABASE_URL, self.channel, settings.EVENT_LISTENER_RETRY_MAX_SECONDS
+        )
+        await self._bridge.start()
+
+    async def stop(self) -> None:
+        if self._bridge:
+            await self._bridge.stop()
+            self._bridge = None
+
+    @property
+    def connected(self) -> bool:
+        return self._bridge is not None and self._bridge.connected
+
+    async def listen(
+        self,
+        channel: str,
+        handler: Callable[[Dict[str, Any]], None],
+        on_connect: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> bool:
+        """
+        イベントと同じLISTEN接続で別のチャネルを受信する（他ワーカーからのメッセージのみ、中継がなければFalse）
+        on_connectは接続・再接続のたびに呼ばれる
+        """
+        if self._bridge is None:
+            return False
+        await self._bridge.listen(channel, handler, on_connect)
+        return True
+
+    async def send(self, channel: str, message: Dict[str, Any]) -> bool:
+        """
+        他ワーカーへメッセージを送る（中継を起動していないプロセスからは都度接続して送る）
+        """
+        if self._bridge is not None:
+            return await self._bridge.send(channel, message)
+        if settings.DB_TYPE.lower() == "sqlite":
+            return False
+        await _notify_once(settings.DATABASE_URL, channel, message)
+        return True
+
+
+class _PostgresBridge:
+    """
+    LISTEN/NOTIFYによるワーカー間のイベント中継
+    1本の接続でイベントのチャネルと、listen()で登録した他のチャネル（キャッシュの無効化など）を受信する
+    """
+
+    # 接続が生きているかを確認する間隔（秒）
+    HEALTH_CHECK_INTERVAL = 15.0
+
+    def __init__(self, broker: EventBroker, database_url: str, channel: str, retry_max_seconds: float = 30.0):
+        self.broker = broker
+        self.database_url = database_url
+        self.channel = channel
+        self.retry_max_seconds = retry_max_seconds
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {channel: self._on_event}
+        self._on_connect: List[Callable[[], Awaitable[None]]] = []
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    async def listen(
+        self,
+        channel: str,
+        handler: Callable[[Dict[str, Any]], None],
+        on_connect: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> None:
+        self._handlers[channel] = handler
+        if on_connect is not None:
+            self._on_connect.append(on_connect)
+        if self.connected:
+            await self._connection.add_listener(channel, self._on_notification)
+
+    async def send(self, channel: str, message: Dict[str, Any]) -> bool:
+        if not self.connected:
+            return False
+
+        payload = json.dumps({"origin": WORKER_ID, **message}, default=str)
+        try:
+            # 1つの接続で同時にクエリを実行できないため直列化する
+            async with self._lock:
+                await self._connection.execute("SELECT pg_notify($1, $2)", channel, payload)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to NOTIFY on {channel}: {e}")
+            return False
+
+    async def notify(self, event: AttendanceEvent) -> None:
+        await self.send(self.channel, event.to_payload())
+
+    def _on_event(self, message: Dict[str, Any]) -> None:
+        self.broker._dispatch(AttendanceEvent(
+            type=message["type"],
+            user_id=message["user_id"],
+            data=message.get("data") or {}
+        ))
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed payload on {channel}")
+            return
+
+        if message.get("origin") == WORKER_ID:
+            return
+
+        handler = self._handlers.get(channel)
+        if handler is not None:
+            handler(message)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            try:
+                self._connection = await asyncpg.connect(self.database_url)
+                for channel in list(self._handlers):
+                    await self._connection.add_listener(channel, self._on_notification)
+                logger.info(f"Listening on channels {', '.join(self._handlers)}")
+                delay = 1.0
+                # 切断中の通知を取りこぼしている可能性があるため、登録先に知らせる
+                for callback in self._on_connect:
+                    await callback()
+
+                while self.connected:
+                    await asyncio.sleep(self.HEALTH_CHECK_INTERVAL)
+                    async with self._lock:
+                        await asyncio.wait_for(self._connection.execute("SELECT 1"), timeout=5.0)
+
+                logger.warning("Event listener connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event listener connection failed (retrying in {delay:.0f}s): {e}")
+            finally:
+                await self._close()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_seconds)
+
+    async def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+async def _notify_once(database_url: str, channel: str, message: Dict[str, Any]) -> None:
+    """
+    中継を起動していないプロセス（CLIなど）から都度接続して通知を送る
+    """
+    import asyncpg
+
+    connection = await asyncpg.connect(database_url)
+    try:
+        payload = json.dumps({"origin": WORKER_ID, **message}, default=str)
+        await connection.execute("SELECT pg_notify($1, $2)", channel, payload)
+    finally:
+        await connection.close()
+
+
+# シングルトンインスタンス
+event_broker = EventBroker()
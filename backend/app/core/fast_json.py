@@ -0,0 +1,43 @@
+"""
+orjsonによる高速なJSONレスポンス
+
+Pydanticのモデル検証を経由せず、dict/listをそのままシリアライズする。
+出力はPydanticのJSON形式に合わせる（Decimalは文字列、UTCの日時は末尾Z）。
+"""
+
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson未インストール時は通常の経路のみ
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        # Pydanticモデル（アーカイブから読み込んだ勤怠など）
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def fast_json_available() -> bool:
+    return orjson is not None
+
+
+class FastJSONResponse(Response):
+    """
+    orjsonでシリアライズするJSONレスポンス
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
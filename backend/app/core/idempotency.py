@@ -0,0 +1,351 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.utils.timezone import now_jst
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+@dataclass
+class StoredResponse:
+    """
+    保存済みレスポンス
+    """
+    fingerprint: str
+    status_code: int
+    body: str
+
+
+class IdempotencyKeyInProgress(Exception):
+    """
+    同じキーのリクエストが処理中（待っても完了しなかった）
+    """
+    pass
+
+
+class IdempotencyStore(ABC):
+    """
+    冪等キーストアの基底クラス
+    キーは処理前に予約し、処理が成功したらレスポンスを保存、失敗したら予約を解放する
+    """
+
+    @abstractmethod
+    async def reserve(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        キーを処理中として予約（保存済みレスポンスがあればそれを返し、予約しない）
+        """
+
+    @abstractmethod
+    async def set(self, key: str, response: StoredResponse) -> None:
+        """
+        予約したキーにレスポンスを保存
+        """
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """
+        レスポンスを保存しなかった予約を解放（同じキーの再送で処理をやり直せる）
+        """
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """
+    TTL付きLRUのインメモリストア
+    プロセス内では同じキーのリクエストをIdempotencyContextのロックで直列化するため、予約は記録しない
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, StoredResponse]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return response
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        return await self.get(key)
+
+    async def set(self, key: str, response: StoredResponse) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def release(self, key: str) -> None:
+        pass
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """
+    DBテーブルを使うストア（インメモリLRUを前段キャッシュとして使用）
+    キーの予約はINSERTの成否で判定するため、複数のワーカーに同じキーが届いても処理は1回だけ実行される
+    """
+
+    # 期限切れレコードを掃除する間隔（保存回数）
+    PURGE_INTERVAL = 100
+    # 処理中の予約の完了を確認する間隔（秒）
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._local = InMemoryIdempotencyStore(max_entries, ttl_seconds)
+        self._writes = 0
+
+    async def _try_reserve(self, session, key: str, fingerprint: str) -> bool:
+        from app.models.idempotency_key import IdempotencyKey
+
+        if session.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        now = now_jst()
+        # 期限切れ（停止したワーカーの予約を含む）のレコードは予約し直せるように消しておく
+        await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+        )
+        result = await session.execute(
+            insert(IdempotencyKey).values(
+                key=key,
+                fingerprint=fingerprint,
+                status="pending",
+                status_code=0,
+                response_body="",
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_PENDING_SECONDS)
+            ).on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        response = await self._local.get(key)
+        if response is not None:
+            return response
+
+        from app.core.database import AsyncSessionLocal
+        from app.models.idempotency_key import IdempotencyKey
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        async with AsyncSessionLocal() as session:
+            while True:
+                if await self._try_reserve(session, key, fingerprint):
+                    return None
+
+                record = await session.scalar(
+                    select(IdempotencyKey).where(
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.expires_at > now_jst()
+                    )
+                )
+                if record is not None and record.status != "pending":
+                    response = StoredResponse(
+                        fingerprint=record.fingerprint,
+                        status_code=record.status_code,
+                        body=record.response_body
+                    )
+                    break
+                # 他のワーカーが処理中: 完了するまで待つ（期限切れなら次の周回で予約し直す）
+                await session.commit()
+                if time.monotonic() >= deadline:
+                    raise IdempotencyKeyInProgress(key)
+                await asyncio.sleep(self.POLL_INTERVAL)
+
+        await self._local.set(key, response)
+        return response
+
+    async def set(self, key: str, response: StoredResponse) -> None:
+        await self._local.set(key, response)
+
+        from app.core.database import AsyncSessionLocal
+        from app.models.idempotency_key import IdempotencyKey
+
+        now = now_jst()
+        self._writes += 1
+        try:
+            async with AsyncSessionLocal() as session:
+                if self._writes % self.PURGE_INTERVAL == 0:
+                    await session.execute(
+                        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now)
+                    )
+                await session.merge(IdempotencyKey(
+                    key=key,
+                    fingerprint=response.fingerprint,
+                    status="completed",
+                    status_code=response.status_code,
+                    response_body=response.body,
+                    expires_at=now + timedelta(seconds=self.ttl_seconds)
+                ))
+                await session.commit()
+        except Exception as e:
+            # 保存に失敗しても処理自体は成功しているため、ローカルのみで継続する
+            logger.warning(f"Failed to persist idempotency key: {e}")
+
+    async def release(self, key: str) -> None:
+        from app.core.database import AsyncSessionLocal
+        from app.models.idempotency_key import IdempotencyKey
+
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status == "pending")
+                )
+                await session.commit()
+        except Exception as e:
+            # 解放できなくても予約はIDEMPOTENCY_PENDING_SECONDSで期限切れになる
+            logger.warning(f"Failed to release idempotency key: {e}")
+
+
+def _create_store() -> IdempotencyStore:
+    if settings.IDEMPOTENCY_BACKEND.lower() == "database":
+        return DatabaseIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+    return InMemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+# シングルトンインスタンス
+idempotency_store = _create_store()
+
+# 同一キーの同時実行を直列化するためのロック（キー -> [ロック, 参照数]）
+_key_locks: Dict[str, list] = {}
+
+
+class IdempotencyContext:
+    """
+    リクエスト単位の冪等処理コンテキスト
+
+    使い方:
+        async with idempotency:
+            if idempotency.replay_response:
+                return idempotency.replay_response
+            ...
+            return await idempotency.save(result)
+    """
+
+    def __init__(self, store: IdempotencyStore, key: Optional[str], fingerprint: str):
+        self.store = store
+        self.key = key
+        self.fingerprint = fingerprint
+        self.replay_response: Optional[JSONResponse] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._reserved = False
+
+    async def __aenter__(self) -> "IdempotencyContext":
+        if self.key is None:
+            return self
+
+        entry = _key_locks.setdefault(self.key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self._lock = entry[0]
+        await self._lock.acquire()
+
+        try:
+            stored = await self.store.reserve(self.key, self.fingerprint)
+        except IdempotencyKeyInProgress:
+            await self.__aexit__(None, None, None)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with the same {IDEMPOTENCY_HEADER} is still being processed"
+            )
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+        self._reserved = stored is None
+        if stored is not None:
+            if stored.fingerprint != self.fingerprint:
+                await self.__aexit__(None, None, None)
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used with a different request body"
+                )
+            logger.info("Replaying stored response for idempotency key")
+            self.replay_response = JSONResponse(
+                content=json.loads(stored.body),
+                status_code=stored.status_code,
+                headers={REPLAYED_HEADER: "true"}
+            )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._lock is None:
+            return
+
+        # 失敗などでレスポンスを保存しなかった場合は予約を解放して再送で処理できるようにする
+        if self._reserved:
+            self._reserved = False
+            await self.store.release(self.key)
+
+        self._lock.release()
+        self._lock = None
+        entry = _key_locks[self.key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _key_locks[self.key]
+
+    async def save(self, result: Any, status_code: int = status.HTTP_200_OK) -> Any:
+        """
+        成功レスポンスを保存して、そのまま返す
+        """
+        if self.key is not None:
+            # response_modelと同じ形（Decimalは文字列）で保存する
+            if isinstance(result, BaseModel):
+                content = result.model_dump(mode="json")
+            else:
+                content = jsonable_encoder(result)
+            body = json.dumps(content, ensure_ascii=False)
+            await self.store.set(self.key, StoredResponse(
+                fingerprint=self.fingerprint,
+                status_code=status_code,
+                body=body
+            ))
+            self._reserved = False
+        return result
+
+
+async def get_idempotency_context(request: Request) -> IdempotencyContext:
+    """
+    Idempotency-Keyヘッダーから冪等処理コンテキストを生成する依存性注入用関数
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    body = await request.body()
+    fingerprint = hashlib.sha256(body).hexdigest()
+
+    if not key:
+        return IdempotencyContext(idempotency_store, None, fingerprint)
+
+    if len(key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be 255 characters or less"
+        )
+
+    # キーはエンドポイント単位でスコープする
+    scope = f"{request.method}:{request.url.path}:{key}"
+    scoped_key = hashlib.sha256(scope.encode("utf-8")).hexdigest()
+    return IdempotencyContext(idempotency_store, scoped_key, fingerprint)
@@ -0,0 +1,85 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+import logging
+
+from app.core.database import Base
+
+logger = logging.getLogger(__name__)
+
+# 追加カラムのバックフィル（何度実行しても結果が変わらないこと）
+BACKFILLS = [
+    # 休憩に勤怠の日付（パーティションキー）を複製
+    """
+    UPDATE break_times
+    SET attendance_date = (
+        SELECT attendance.date FROM attendance WHERE attendance.id = break_times.attendance_id
+    )
+    WHERE attendance_date IS NULL
+    """,
+    # 労働時間・支給額の整数カラムを小数のカラムから補完（小数点以下2桁の時間からは元の分に戻る）
+    """
+    UPDATE attendance
+    SET work_minutes = CAST(ROUND(total_hours * 60) AS INTEGER)
+    WHERE work_minutes = 0 AND total_hours <> 0
+    """,
+    """
+    UPDATE attendance
+    SET amount_sen = CAST(ROUND(total_amount * 100) AS BIGINT)
+    WHERE amount_sen = 0 AND total_amount <> 0
+    """,
+]
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    既存データベースに不足しているカラムとインデックスを作成する
+    （create_allは既存テーブルを変更しないため）
+    """
+    # モデルをインポートしてテーブル定義を読み込む
+    from app.models import user, attendance, break_time, idempotency_key, overtime_accumulator, job, sync_tombstone
+    
+    _add_missing_columns(engine)
+    
+    for statement in BACKFILLS:
+        with engine.begin() as conn:
+            result = conn.execute(text(statement))
+            if result.rowcount:
+                logger.info(f"Backfilled {result.rowcount} rows: {' '.join(statement.split())[:60]}...")
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    index.create(bind=conn, checkfirst=True)
+            except Exception as e:
+                # 既存データが制約に違反している場合などは起動を止めずに警告する
+                logger.warning(f"Failed to create index {index.name} on {table.name}: {e}")
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """
+    モデルに追加されたカラムをALTER TABLEで追加
+    """
+    inspector = inspect(engine)
+    
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            column_type = column.type.compile(dialect=engine.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                default_sql = default.text if hasattr(default, "text") else str(default.compile(dialect=engine.dialect))
+                ddl += f" DEFAULT {default_sql}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+            logger.info(f"Added column {table.name}.{column.name}")
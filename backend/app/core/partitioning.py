@@ -0,0 +1,306 @@
+"""
+PostgreSQL用の勤怠テーブルのレンジパーティション管理
+
+attendanceはdate、break_timesはattendance_dateでパーティション分割し、
+同じ期間の勤怠と休憩が同じ範囲のパーティションに配置されるようにする。
+作成済みの範囲外の日付の行はデフォルトパーティションに入り、その範囲のパーティションを作成するときに移す。
+パーティションの変更は勧告的ロックで直列化する（複数のワーカーが起動時に同時に実行しても1つずつ行う）。
+"""
+
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from typing import List, Optional, Tuple
+import logging
+
+from app.core.config import settings
+from app.utils.timezone import today_jst
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = ("monthly", "yearly")
+
+# パーティション分割するテーブルとパーティションキー
+PARTITIONED_TABLES = (
+    ("attendance", "date"),
+    ("break_times", "attendance_date"),
+)
+
+
+def partition_start(value: date, interval: str) -> date:
+    """
+    指定日を含むパーティションの開始日
+    """
+    if interval == "yearly":
+        return date(value.year, 1, 1)
+    return date(value.year, value.month, 1)
+
+
+def next_partition_start(start: date, interval: str) -> date:
+    if interval == "yearly":
+        return date(start.year + 1, 1, 1)
+    if start.month == 12:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 1, 1)
+
+
+def partition_name(table: str, start: date, interval: str) -> str:
+    """
+    パーティション名（例: attendance_p2024_04, attendance_p2024）
+    """
+    if interval == "yearly":
+        return f"{table}_p{start.year}"
+    return f"{table}_p{start.year}_{start.month:02d}"
+
+
+def lock_partition_maintenance(conn: Connection) -> None:
+    """
+    パーティションの変更用の勧告的ロック（トランザクションの終了で解放される）
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('attendance_partitioning'))"))
+
+
+def is_partitioned(conn: Connection, table: str = "attendance") -> bool:
+    return bool(conn.execute(
+        text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_partitioned_table pt
+                JOIN pg_class c ON c.oid = pt.partrelid
+                WHERE c.relname = :table
+            )
+        """),
+        {"table": table}
+    ).scalar())
+
+
+def _partition_exists(conn: Connection, name: str) -> bool:
+    return bool(conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar())
+
+
+def create_partition(conn: Connection, start: date, interval: str, parent_suffix: str = "") -> bool:
+    """
+    指定期間のパーティションをattendanceとbreak_timesの両方に作成
+    デフォルトパーティションにその期間の行があれば、一時テーブルへ退避してから作成し、新しいパーティションへ戻す
+    （デフォルトパーティションに該当する行があるとCREATE TABLE ... PARTITION OFが失敗するため）
+    作成した場合はTrueを返す
+    """
+    end = next_partition_start(start, interval)
+    missing = [
+        (table, key, partition_name(table, start, interval))
+        for table, key in PARTITIONED_TABLES
+        if not _partition_exists(conn, partition_name(table, start, interval))
+    ]
+    if not missing:
+        return False
+
+    bounds = {"start": start, "end": end}
+    moved = []
+    for table, key, _ in missing:
+        default_name = f"{table}_default{parent_suffix}"
+        if not _partition_exists(conn, default_name):
+            continue
+        conn.execute(text(
+            f"CREATE TEMP TABLE moving_{table} ON COMMIT DROP AS "
+            f"SELECT * FROM {default_name} WHERE {key} >= :start AND {key} < :end"
+        ), bounds)
+        moved.append(table)
+    # 休憩が勤怠を参照しているため、休憩から削除して勤怠から戻す
+    for table, key, _ in reversed(missing):
+        if table in moved:
+            conn.execute(text(f"DELETE FROM {table}_default{parent_suffix} WHERE {key} >= :start AND {key} < :end"), bounds)
+
+    for table, _, name in missing:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table}{parent_suffix} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        logger.info(f"Created partition {name} [{start}, {end})")
+
+    for table in moved:
+        rows = conn.execute(text(f"INSERT INTO {table}{parent_suffix} SELECT * FROM moving_{table}")).rowcount
+        conn.execute(text(f"DROP TABLE moving_{table}"))
+        if rows:
+            logger.info(f"Moved {rows} rows of {table} from the default partition to [{start}, {end})")
+
+    return True
+
+
+def ensure_partitions(conn: Connection, interval: str, months_ahead: int, from_date: Optional[date] = None) -> int:
+    """
+    現在（またはfrom_date）から指定月数先までのパーティションを作成
+    """
+    today = today_jst()
+    start = partition_start(from_date or today, interval)
+
+    horizon_month = today.month - 1 + months_ahead
+    horizon = date(today.year + horizon_month // 12, horizon_month % 12 + 1, 1)
+
+    created = 0
+    while start <= horizon:
+        if create_partition(conn, start, interval):
+            created += 1
+        start = next_partition_start(start, interval)
+
+    # 作成済みの範囲の外（先日付の登録や長期停止後）でデフォルトパーティションに入った行の期間も作成する
+    default_dates = conn.execute(text("SELECT DISTINCT date FROM attendance_default")).scalars().all()
+    for default_start in sorted({partition_start(value, interval) for value in default_dates}):
+        if create_partition(conn, default_start, interval):
+            created += 1
+    return created
+
+
+def list_partitions(conn: Connection, table: str = "attendance") -> List[Tuple[str, str]]:
+    """
+    パーティション名と範囲の一覧
+    """
+    rows = conn.execute(
+        text("""
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            ORDER BY child.relname
+        """),
+        {"table": table}
+    )
+    return [(name, bound) for name, bound in rows]
+
+
+def detach_partition(conn: Connection, start: date, interval: str) -> List[str]:
+    """
+    指定期間のパーティションを切り離す（アーカイブ用）
+    休憩が勤怠を参照しているため、休憩側から切り離す
+    """
+    detached = []
+    for table, _ in reversed(PARTITIONED_TABLES):
+        name = partition_name(table, start, interval)
+        attached = conn.execute(
+            text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_inherits
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    WHERE child.relname = :name
+                )
+            """),
+            {"name": name}
+        ).scalar()
+        if not attached:
+            continue
+
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        detached.append(name)
+        logger.info(f"Detached partition {name} from {table}")
+    return detached
+
+
+def convert_to_partitioned(conn: Connection, interval: str) -> None:
+    """
+    既存のattendance/break_timesをパーティションテーブルへ移行
+    （1トランザクションで実行する）
+    """
+    conn.execute(text("LOCK TABLE attendance, break_times IN ACCESS EXCLUSIVE MODE"))
+
+    # パーティションキーの補完（外部キーの整合性に必要）
+    conn.execute(text("""
+        UPDATE break_times SET attendance_date = attendance.date
+        FROM attendance
+        WHERE attendance.id = break_times.attendance_id AND break_times.attendance_date IS NULL
+    """))
+
+    for table, key in PARTITIONED_TABLES:
+        conn.execute(text(
+            f"CREATE TABLE {table}_new (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})"
+        ))
+        conn.execute(text(f"CREATE TABLE {table}_default_new PARTITION OF {table}_new DEFAULT"))
+
+    # 既存データの範囲のパーティションを作成
+    min_date, max_date = conn.execute(text("SELECT MIN(date), MAX(date) FROM attendance")).one()
+    start = partition_start(min_date or today_jst(), interval)
+    while max_date and start <= max_date:
+        create_partition(conn, start, interval, parent_suffix="_new")
+        start = next_partition_start(start, interval)
+
+    conn.execute(text("INSERT INTO attendance_new SELECT * FROM attendance"))
+    conn.execute(text("INSERT INTO break_times_new SELECT * FROM break_times"))
+
+    # シーケンスを新テーブルへ引き継ぐ
+    sequences = {}
+    for table, _ in PARTITIONED_TABLES:
+        sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+            sequences[table] = sequence
+
+    conn.execute(text("DROP TABLE break_times"))
+    conn.execute(text("DROP TABLE attendance"))
+    for table, _ in PARTITIONED_TABLES:
+        conn.execute(text(f"ALTER TABLE {table}_new RENAME TO {table}"))
+        conn.execute(text(f"ALTER TABLE {table}_default_new RENAME TO {table}_default"))
+        if table in sequences:
+            conn.execute(text(f"ALTER SEQUENCE {sequences[table]} OWNED BY {table}.id"))
+
+    # 制約とインデックス（一意制約にはパーティションキーを含める必要がある）
+    conn.execute(text("ALTER TABLE attendance ADD PRIMARY KEY (id, date)"))
+    conn.execute(text("ALTER TABLE attendance ADD CONSTRAINT _user_date_uc UNIQUE (user_id, date)"))
+    conn.execute(text(
+        "ALTER TABLE attendance ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attendance_id ON attendance (id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_attendance_open_shifts ON attendance (date) WHERE clock_out IS NULL"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_attendance_user_sync ON attendance (user_id, sync_xid, sync_seq)"
+    ))
+
+    conn.execute(text("ALTER TABLE break_times ALTER COLUMN attendance_date SET NOT NULL"))
+    conn.execute(text("ALTER TABLE break_times ADD PRIMARY KEY (id, attendance_date)"))
+    conn.execute(text(
+        "ALTER TABLE break_times ADD FOREIGN KEY (attendance_id, attendance_date) "
+        "REFERENCES attendance (id, date) ON DELETE CASCADE ON UPDATE CASCADE"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_break_times_id ON break_times (id)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_break_times_attendance_id ON break_times (attendance_id)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_break_times_sync ON break_times (sync_xid, sync_seq)"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_break_times_open_attendance "
+        "ON break_times (attendance_id, attendance_date) WHERE end_time IS NULL"
+    ))
+
+    # init.sqlの更新日時トリガーを再作成
+    has_trigger_function = conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_proc WHERE proname = 'update_updated_at_column')")
+    ).scalar()
+    if has_trigger_function:
+        for table, _ in PARTITIONED_TABLES:
+            conn.execute(text(
+                f"CREATE TRIGGER update_{table}_updated_at BEFORE UPDATE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()"
+            ))
+
+    logger.info(f"Converted attendance and break_times to {interval} range partitioning")
+
+
+def setup_partitioning(engine: Engine) -> None:
+    """
+    設定に応じてパーティション化と今後のパーティション作成を行う（起動時に実行）
+    """
+    interval = settings.ATTENDANCE_PARTITION_INTERVAL.lower()
+    if interval == "none" or settings.DB_TYPE.lower() == "sqlite":
+        return
+
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported ATTENDANCE_PARTITION_INTERVAL: {interval}")
+
+    with engine.begin() as conn:
+        # 複数のワーカーが同時に起動した場合も、移行とパーティション作成は1つずつ行う
+        lock_partition_maintenance(conn)
+        if not is_partitioned(conn):
+            convert_to_partitioned(conn, interval)
+        created = ensure_partitions(conn, interval, settings.ATTENDANCE_PARTITION_MONTHS_AHEAD)
+
+    logger.info(f"Attendance partitions are ready ({created} created)")
@@ -0,0 +1,83 @@
+"""
+ユーザー検索用のインデックス（部分一致検索を全件走査にしない）
+
+PostgreSQL: pg_trgm のGINインデックスで ILIKE '%...%' をインデックス検索にする
+SQLite: FTS5（trigramトークナイザ）の外部コンテンツテーブルをトリガーで users と同期する
+どちらも作成できない環境ではLIKEによる検索のまま動作する。
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+USERS_FTS_TABLE = "users_fts"
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO {USERS_FTS_TABLE}(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO {USERS_FTS_TABLE}({USERS_FTS_TABLE}, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN
+        INSERT INTO {USERS_FTS_TABLE}({USERS_FTS_TABLE}, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO {USERS_FTS_TABLE}(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    """,
+]
+
+
+def _setup_postgresql(conn: Connection) -> None:
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING gin (name gin_trgm_ops)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops)"
+    ))
+
+
+def _setup_sqlite(conn: Connection) -> None:
+    created = not inspect(conn).has_table(USERS_FTS_TABLE)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {USERS_FTS_TABLE} "
+        f"USING fts5(name, email, content='users', content_rowid='id', tokenize='trigram')"
+    ))
+    for statement in SQLITE_TRIGGERS:
+        conn.execute(text(statement))
+    if created:
+        # 既存のユーザーを取り込む
+        conn.execute(text(f"INSERT INTO {USERS_FTS_TABLE}({USERS_FTS_TABLE}) VALUES ('rebuild')"))
+        logger.info(f"Built {USERS_FTS_TABLE} full-text index")
+
+
+def setup_user_search(engine: Engine) -> None:
+    """
+    ユーザー検索用のインデックスを作成（起動時に実行、何度実行してもよい）
+    """
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                _setup_postgresql(conn)
+            elif engine.dialect.name == "sqlite":
+                _setup_sqlite(conn)
+    except Exception as e:
+        # 拡張機能の権限がない・FTS5が使えないなどの場合はLIKEによる検索で動作する
+        logger.warning(f"User search index is not available, falling back to LIKE: {e}")
+
+
+def user_search_index_available(conn: Connection) -> bool:
+    """
+    SQLiteでFTS5のインデックスが使えるか
+    """
+    return inspect(conn).has_table(USERS_FTS_TABLE)
@@ -0,0 +1,115 @@
+"""
+同一リクエストの合流（single-flight）
+
+同じキーの処理が実行中なら新たに実行せず、その結果を待って共有する。
+キーには (ルート, パラメータ, データのバージョン) を使う。バージョンはユーザーごとの書き込みイベントで
+進むため、書き込み後に来たリクエストが書き込み前に始まった処理に合流することはない。
+
+結果は複数のリクエストで共有されるため、呼び出し側で変更しないこと。
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.events import AttendanceEvent, event_broker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    """
+    ルートごとの実行数・合流数
+    """
+    executions: int = 0  # 実際に処理を実行した回数
+    coalesced: int = 0  # 実行中の処理に合流した回数
+    errors: int = 0
+    in_flight: int = 0
+
+
+class SingleFlight:
+    """
+    キーごとに実行中の処理を1つにまとめる
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, Hashable], "asyncio.Future[Any]"] = {}
+        self._stats: Dict[str, FlightStats] = defaultdict(FlightStats)
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        nameとkeyが同じ処理が実行中なら合流し、なければfnを実行する
+        """
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await fn()
+
+        flight_key = (name, key)
+        stats = self._stats[name]
+        while flight_key in self._in_flight:
+            future = self._in_flight[flight_key]
+            stats.coalesced += 1
+            try:
+                # 自分がキャンセルされても実行中の処理は止めない
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # 実行していたリクエストが切断された場合は実行し直す
+                stats.coalesced -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        stats.executions += 1
+        stats.in_flight += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            stats.errors += 1
+            future.set_exception(e)
+            future.exception()  # 合流したリクエストがなくても未取得の警告を出さない
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            stats.in_flight -= 1
+            if self._in_flight.get(flight_key) is future:
+                del self._in_flight[flight_key]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                **asdict(stats),
+                "coalesced_ratio": round(stats.coalesced / (stats.executions + stats.coalesced), 3)
+                if stats.executions + stats.coalesced else 0.0
+            }
+            for name, stats in sorted(self._stats.items())
+        }
+
+
+# ユーザーID -> データのバージョン（他ワーカーの書き込みもイベント経由で進む）
+_data_versions: Dict[int, int] = defaultdict(int)
+
+
+def _bump_data_version(event: AttendanceEvent) -> None:
+    _data_versions[event.user_id] += 1
+
+
+event_broker.add_listener(_bump_data_version)
+
+
+def data_version(user_id: int) -> int:
+    return _data_versions.get(user_id, 0)
+
+
+# シングルトンインスタンス
+single_flight = SingleFlight()
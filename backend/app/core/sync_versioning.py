@@ -0,0 +1,91 @@
+"""
+差分同期用の変更の順序（sync_xid, sync_seq）
+
+勤怠・休憩・削除記録の作成・更新のたびにトリガーで書き込み順の番号を振る。
+    PostgreSQL: sync_xid に書き込んだトランザクションのID、sync_seq に共通のシーケンスの値を設定する。
+                読み取り時は実行中の最も古いトランザクションID（pg_snapshot_xmin）より前の行だけを返すため、
+                後からコミットされたトランザクションの行がカーソルより前に現れることはない。
+    SQLite:     書き込みは1つずつ直列に実行されるため、sync_counter の連番を sync_seq に設定する（sync_xidは0）。
+トリガーを作成する前からある行は (0, 0) で、種別とIDの順に並ぶ。
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+SYNC_VERSIONED_TABLES = ("attendance", "break_times", "sync_tombstones")
+
+POSTGRESQL_FUNCTION = """
+CREATE OR REPLACE FUNCTION set_sync_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.sync_xid = pg_current_xact_id()::text::bigint;
+    NEW.sync_seq = nextval('sync_change_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _sqlite_triggers(table: str):
+    assign = f"""
+        UPDATE sync_counter SET value = value + 1 WHERE id = 1;
+        UPDATE {table} SET sync_seq = (SELECT value FROM sync_counter WHERE id = 1) WHERE id = NEW.id;
+    """
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON {table} BEGIN {assign} END",
+        # 自分で設定したsync_seqの更新では発火しない
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE ON {table}
+        WHEN NEW.sync_seq IS OLD.sync_seq BEGIN {assign} END
+        """,
+    ]
+
+
+def _setup_postgresql(conn: Connection) -> None:
+    # 複数のワーカーが同時に起動しても1つずつ作成する
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('sync_versioning'))"))
+    conn.execute(text("CREATE SEQUENCE IF NOT EXISTS sync_change_seq"))
+    conn.execute(text(POSTGRESQL_FUNCTION))
+    for table in SYNC_VERSIONED_TABLES:
+        name = f"set_sync_version_{table}"
+        exists = conn.execute(
+            text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_trigger t
+                    JOIN pg_class c ON c.oid = t.tgrelid
+                    WHERE c.relname = :table AND t.tgname = :name
+                )
+            """),
+            {"table": table, "name": name}
+        ).scalar()
+        if not exists:
+            conn.execute(text(
+                f"CREATE TRIGGER {name} BEFORE INSERT OR UPDATE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION set_sync_version()"
+            ))
+            logger.info(f"Created sync version trigger on {table}")
+
+
+def _setup_sqlite(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS sync_counter (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)"
+    ))
+    conn.execute(text("INSERT OR IGNORE INTO sync_counter (id, value) VALUES (1, 0)"))
+    for table in SYNC_VERSIONED_TABLES:
+        for statement in _sqlite_triggers(table):
+            conn.execute(text(statement))
+
+
+def setup_sync_versioning(engine: Engine) -> None:
+    """
+    変更の順序を振るトリガーを作成（起動時、パーティション化の後に実行、何度実行してもよい）
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            _setup_postgresql(conn)
+        elif engine.dialect.name == "sqlite":
+            _setup_sqlite(conn)
@@ -1,5 +1,9 @@
 from app.models.user import User
 from app.models.attendance import Attendance
 from app.models.break_time import BreakTime
+from app.models.idempotency_key import IdempotencyKey
+from app.models.overtime_accumulator import OvertimeAccumulator
+from app.models.job import Job
+from app.models.sync_tombstone import SyncTombstone
 
-__all__ = ["User", "Attendance", "BreakTime"]
\ No newline at end of file
+__all__ = ["User", "Attendance", "BreakTime", "IdempotencyKey", "OvertimeAccumulator", "Job", "SyncTombstone"]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Date, Time, Numeric, DateTime, UniqueConstraint
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey, Date, Time, Numeric, DateTime, UniqueConstraint, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -16,13 +16,36 @@ class Attendance(Base):
     date = Column(Date, nullable=False)
     clock_in = Column(Time, nullable=True)
     clock_out = Column(Time, nullable=True)
+    # 労働時間（分）と支給額（銭）。集計はこの整数のカラムで行う
+    work_minutes = Column(Integer, default=0, server_default=text("0"))
+    amount_sen = Column(BigInteger, default=0, server_default=text("0"))
+    # APIやアーカイブと互換の小数表記（work_minutes・amount_senから設定する）
     total_hours = Column(Numeric(5, 2), default=0)
     total_amount = Column(Numeric(10, 2), default=0)
+    # 割増区分ごとの労働時間（分単位）
+    regular_minutes = Column(Integer, default=0, server_default=text("0"))
+    overtime_minutes = Column(Integer, default=0, server_default=text("0"))
+    night_minutes = Column(Integer, default=0, server_default=text("0"))
+    holiday_minutes = Column(Integer, default=0, server_default=text("0"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 差分同期用の変更の順序（トリガーで設定、app/core/sync_versioning.py）
+    sync_xid = Column(BigInteger, nullable=False, server_default=text("0"))
+    sync_seq = Column(BigInteger, nullable=False, server_default=text("0"))
     
-    # ユニーク制約: 同じユーザーの同じ日付は1件のみ
-    __table_args__ = (UniqueConstraint('user_id', 'date', name='_user_date_uc'),)
+    __table_args__ = (
+        # ユニーク制約: 同じユーザーの同じ日付は1件のみ
+        UniqueConstraint('user_id', 'date', name='_user_date_uc'),
+        # 部分インデックス: 未退勤の勤怠（打刻忘れの自動締め用）
+        Index(
+            'idx_attendance_open_shifts',
+            'date',
+            postgresql_where=text('clock_out IS NULL'),
+            sqlite_where=text('clock_out IS NULL')
+        ),
+        # 差分同期: ユーザーごとの変更順
+        Index('idx_attendance_user_sync', 'user_id', 'sync_xid', 'sync_seq'),
+    )
     
     # リレーションシップ
     user = relationship("User", back_populates="attendances")
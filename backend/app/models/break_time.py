@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Time, DateTime
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey, Date, Time, DateTime, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -13,11 +13,29 @@ class BreakTime(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     attendance_id = Column(Integer, ForeignKey("attendance.id", ondelete="CASCADE"), nullable=False)
+    attendance_date = Column(Date, nullable=True)  # 勤怠の日付（パーティションキー）
     start_time = Column(Time, nullable=False)
     end_time = Column(Time, nullable=True)
     duration = Column(Integer, default=0)  # 分単位
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 差分同期用の変更の順序（トリガーで設定、app/core/sync_versioning.py）
+    sync_xid = Column(BigInteger, nullable=False, server_default=text("0"))
+    sync_seq = Column(BigInteger, nullable=False, server_default=text("0"))
+    
+    __table_args__ = (
+        Index('idx_break_times_attendance_id', 'attendance_id'),
+        # 部分ユニークインデックス: 1つの勤怠に未終了の休憩は1件のみ
+        Index(
+            'uq_break_times_open_attendance',
+            'attendance_id',
+            unique=True,
+            postgresql_where=text('end_time IS NULL'),
+            sqlite_where=text('end_time IS NULL')
+        ),
+        # 差分同期: 変更順
+        Index('idx_break_times_sync', 'sync_xid', 'sync_seq'),
+    )
     
     # リレーションシップ
     attendance = relationship("Attendance", back_populates="break_times")
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    冪等キーモデル（複数ワーカー構成でレスポンスを共有するため）
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)  # スコープとキーのハッシュ値
+    fingerprint = Column(String(64), nullable=False)  # リクエストボディのハッシュ値
+    status = Column(String(20), nullable=False, server_default=text("'completed'"))  # pending: 処理中として予約済み
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Job(Base):
+    """
+    バックグラウンドジョブモデル（DBをキューとして使用）
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(100), nullable=False)  # 登録済みハンドラー名
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="queued")  # queued / running / succeeded / failed / cancelled
+    priority = Column(Integer, nullable=False, default=0)  # 大きいほど先に実行
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False)  # この時刻以降に実行（リトライの待機にも使用）
+    locked_by = Column(String(64), nullable=True)  # 実行中のワーカー
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # 取得待ちのジョブを優先度・実行予定順に取り出すためのインデックス
+        Index('idx_jobs_queue', 'status', 'priority', 'run_after'),
+    )
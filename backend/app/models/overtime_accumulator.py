@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class OvertimeAccumulator(Base):
+    """
+    時間外・休日労働の累計モデル（36協定の上限管理用）
+    month=1〜12は暦月の累計、month=0は協定年度（yearは起算年）の累計
+    """
+    __tablename__ = "overtime_accumulators"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    overtime_minutes = Column(Integer, nullable=False, default=0)  # 時間外労働（分）
+    holiday_minutes = Column(Integer, nullable=False, default=0)  # 法定休日労働（分）
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # 期間ごとの上限チェック用
+        Index('idx_overtime_accumulators_period', 'year', 'month', 'overtime_minutes'),
+    )
@@ -0,0 +1,72 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Index, event, inspect, select, text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from app.core.database import Base
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+
+
+class SyncTombstone(Base):
+    """
+    削除の記録（差分同期で削除をクライアントに伝えるために使用）
+    """
+    __tablename__ = "sync_tombstones"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(20), nullable=False)  # attendance / break_time
+    entity_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    attendance_id = Column(Integer, nullable=True)  # 休憩の場合の勤怠ID
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 差分同期用の変更の順序（トリガーで設定、app/core/sync_versioning.py）
+    sync_xid = Column(BigInteger, nullable=False, server_default=text("0"))
+    sync_seq = Column(BigInteger, nullable=False, server_default=text("0"))
+    
+    __table_args__ = (
+        # ユーザーごとに変更順で取り出すためのインデックス
+        Index('idx_sync_tombstones_user_sync', 'user_id', 'sync_xid', 'sync_seq'),
+        # 保持期間を過ぎた削除記録の削除用
+        Index('idx_sync_tombstones_deleted_at', 'deleted_at'),
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session: Session, flush_context, instances) -> None:
+    """
+    ORMで削除される勤怠・休憩の削除記録を同じトランザクションで追加する
+    （勤怠の削除でカスケードされる休憩も含む）
+    """
+    deleted = [obj for obj in session.deleted if isinstance(obj, (Attendance, BreakTime))]
+    if not deleted:
+        return
+    
+    # 休憩のユーザーIDは勤怠から取る（読み込み済みでなければまとめて取得）
+    attendance_users = {obj.id: obj.user_id for obj in deleted if isinstance(obj, Attendance)}
+    for obj in deleted:
+        if isinstance(obj, BreakTime) and obj.attendance_id not in attendance_users:
+            attendance = inspect(obj).attrs.attendance.loaded_value
+            if attendance is not NO_VALUE and attendance is not None:
+                attendance_users[obj.attendance_id] = attendance.user_id
+    missing = {
+        obj.attendance_id for obj in deleted
+        if isinstance(obj, BreakTime) and obj.attendance_id not in attendance_users
+    }
+    if missing:
+        with session.no_autoflush:
+            result = session.execute(
+                select(Attendance.id, Attendance.user_id).where(Attendance.id.in_(missing))
+            )
+            attendance_users.update(result.all())
+    
+    for obj in deleted:
+        if isinstance(obj, Attendance):
+            session.add(SyncTombstone(entity="attendance", entity_id=obj.id, user_id=obj.user_id))
+        elif obj.attendance_id in attendance_users:
+            session.add(SyncTombstone(
+                entity="break_time",
+                entity_id=obj.id,
+                user_id=attendance_users[obj.attendance_id],
+                attendance_id=obj.attendance_id
+            ))
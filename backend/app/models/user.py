@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -18,5 +18,11 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
+    __table_args__ = (
+        # ユーザー検索: 名前順のキーセットページネーションと時給の範囲指定
+        Index('idx_users_name_id', 'name', 'id'),
+        Index('idx_users_hourly_rate', 'hourly_rate'),
+    )
+    
     # リレーションシップ
     attendances = relationship("Attendance", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
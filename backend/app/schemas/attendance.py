@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import date, time, datetime
 from decimal import Decimal
 
@@ -49,6 +49,10 @@ class AttendanceResponse(AttendanceBase):
     user_id: int
     total_hours: Decimal = Field(default=Decimal("0"), decimal_places=2)
     total_amount: Decimal = Field(default=Decimal("0"), decimal_places=2)
+    regular_minutes: int = Field(default=0, description="法定内労働（分）")
+    overtime_minutes: int = Field(default=0, description="時間外労働（分）")
+    night_minutes: int = Field(default=0, description="深夜労働（分）")
+    holiday_minutes: int = Field(default=0, description="法定休日労働（分）")
     created_at: datetime
     updated_at: datetime
     
@@ -79,6 +83,27 @@ class ClockOutRequest(BaseModel):
     time: Optional[time] = None  # Noneの場合は現在時刻
 
 
+class PunchRequest(BaseModel):
+    """
+    打刻リクエストスキーマ（打刻バッファ経由）
+    """
+    user_id: int
+    kind: Literal["clock_in", "clock_out"]
+    punch_time: Optional[time] = None  # Noneの場合は現在時刻
+
+
+class PunchAcceptedResponse(BaseModel):
+    """
+    打刻受付レスポンススキーマ
+    """
+    punch_id: str
+    user_id: int
+    kind: str
+    date: date
+    punch_time: time
+    status: str = Field(default="accepted", description="accepted: 受付済み（DB反映待ち）")
+
+
 class CalendarDay(BaseModel):
     """
     カレンダー表示用の日別データスキーマ
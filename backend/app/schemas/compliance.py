@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+
+class OvertimeAlert(BaseModel):
+    """
+    36協定の上限に対するアラート
+    """
+    rule: str = Field(description="monthly_overtime / yearly_overtime / special_monthly_total / special_average_total / special_yearly_overtime / special_months_over")
+    level: Literal["warning", "exceeded"]
+    value: float = Field(description="現在値（時間、special_months_overは回数）")
+    limit: float = Field(description="上限（時間、special_months_overは回数）")
+
+
+class OvertimeComplianceEntry(BaseModel):
+    """
+    ユーザーごとの時間外労働の状況
+    """
+    user_id: int
+    user_name: str
+    year: int
+    month: int
+    monthly_overtime_hours: float = Field(description="当月の時間外労働時間")
+    monthly_holiday_hours: float = Field(description="当月の法定休日労働時間")
+    yearly_overtime_hours: float = Field(description="協定年度の時間外労働時間")
+    months_over_monthly_limit: int = Field(description="協定年度内で月45時間を超えた回数")
+    max_average_hours: float = Field(description="2〜6ヶ月平均（時間外+休日）の最大値")
+    alerts: List[OvertimeAlert]
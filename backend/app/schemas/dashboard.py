@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+from app.schemas.attendance import AttendanceWithBreaks, MonthlyCalendarResponse
+from app.schemas.user import UserResponse
+
+
+class DashboardResponse(BaseModel):
+    """
+    ダッシュボード初期表示用スキーマ（ユーザー・今日の勤怠・月間カレンダーをまとめて返す）
+    """
+    user: UserResponse
+    today: Optional[AttendanceWithBreaks] = Field(default=None, description="今日の勤怠（未出勤ならnull）")
+    calendar: MonthlyCalendarResponse = Field(description="月間カレンダーと月の集計")
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+
+class JobCreate(BaseModel):
+    """
+    ジョブ登録用スキーマ
+    """
+    type: str = Field(description="ジョブの種類（GET /api/jobs/types で一覧を取得）")
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = Field(default=0, description="大きいほど先に実行")
+    max_attempts: Optional[int] = Field(default=None, ge=1, le=20, description="最大試行回数（未指定で設定値）")
+    run_after: Optional[datetime] = Field(default=None, description="この時刻以降に実行")
+
+
+class JobResponse(BaseModel):
+    """
+    ジョブレスポンススキーマ
+    """
+    id: int
+    type: str
+    payload: Dict[str, Any]
+    status: str = Field(description="queued / running / succeeded / failed / cancelled")
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
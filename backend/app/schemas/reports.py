@@ -16,9 +16,50 @@ class MonthlyReport(BaseModel):
     total_hours: Decimal = Field(decimal_places=2, description="総労働時間")
     total_amount: Decimal = Field(decimal_places=2, description="総支給額")
     average_daily_hours: Decimal = Field(decimal_places=2, description="平均日次労働時間")
+    overtime_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="時間外労働時間")
+    night_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="深夜労働時間")
+    holiday_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="法定休日労働時間")
     attendance_list: List[AttendanceWithBreaks] = Field(description="勤怠詳細リスト")
 
 
+class PeriodReport(BaseModel):
+    """
+    給与期間（締め日による月度）のレポートスキーマ
+    """
+    year: int
+    period: int = Field(description="月度（締め日のある月）")
+    closing_day: int = Field(description="締め日（0は月末締め）")
+    start_date: date = Field(description="期間の開始日")
+    end_date: date = Field(description="期間の終了日（締め日）")
+    total_days: int = Field(description="出勤日数")
+    total_hours: Decimal = Field(decimal_places=2, description="総労働時間")
+    total_amount: Decimal = Field(decimal_places=2, description="総支給額")
+    average_daily_hours: Decimal = Field(decimal_places=2, description="平均日次労働時間")
+    overtime_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="時間外労働時間")
+    night_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="深夜労働時間")
+    holiday_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="法定休日労働時間")
+    attendance_list: List[AttendanceWithBreaks] = Field(description="勤怠詳細リスト")
+
+
+class PayPeriodRange(BaseModel):
+    """
+    給与期間の範囲スキーマ
+    """
+    period: int
+    start_date: date
+    end_date: date
+    days: int = Field(description="期間の日数")
+
+
+class PayPeriodList(BaseModel):
+    """
+    年の給与期間一覧スキーマ
+    """
+    year: int
+    closing_day: int = Field(description="締め日（0は月末締め）")
+    periods: List[PayPeriodRange]
+
+
 class YearlyReport(BaseModel):
     """
     年次レポートスキーマ
@@ -27,6 +68,9 @@ class YearlyReport(BaseModel):
     total_days: int = Field(description="年間出勤日数")
     total_hours: Decimal = Field(decimal_places=2, description="年間総労働時間")
     total_amount: Decimal = Field(decimal_places=2, description="年間総支給額")
+    overtime_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="年間時間外労働時間")
+    night_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="年間深夜労働時間")
+    holiday_hours: Decimal = Field(default=Decimal("0"), decimal_places=2, description="年間法定休日労働時間")
     monthly_summary: List[dict] = Field(description="月別サマリー")
     
     class Config:
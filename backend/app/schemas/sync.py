@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
+from datetime import datetime
+
+from app.schemas.attendance import AttendanceResponse
+from app.schemas.break_time import BreakTimeResponse
+
+
+class SyncTombstoneResponse(BaseModel):
+    """
+    削除された勤怠・休憩
+    """
+    entity: Literal["attendance", "break_time"]
+    id: int
+    attendance_id: Optional[int] = Field(default=None, description="休憩の場合の勤怠ID")
+    deleted_at: datetime
+
+
+class SyncResponse(BaseModel):
+    """
+    差分同期レスポンススキーマ
+    """
+    attendance: List[AttendanceResponse] = Field(description="作成・更新された勤怠")
+    break_times: List[BreakTimeResponse] = Field(description="作成・更新された休憩")
+    deleted: List[SyncTombstoneResponse] = Field(description="削除された勤怠・休憩")
+    cursor: Optional[str] = Field(description="次回のsinceに渡す値（変更がなければ受け取った値のまま）")
+    has_more: bool = Field(description="trueなら続けてcursorで取得する")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -41,6 +41,14 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserSearchResponse(BaseModel):
+    """
+    ユーザー検索レスポンススキーマ
+    """
+    items: List[UserResponse]
+    next_cursor: Optional[str] = Field(default=None, description="続きを取得するときにcursorに渡す値（最後のページならnull）")
+
+
 class UserInDB(UserResponse):
     """
     データベース保存用ユーザースキーマ
@@ -0,0 +1,297 @@
+"""
+BI向けの勤怠データ列指向エクスポート（Parquet / Arrow IPCストリーム）
+
+DBカーソルからチャンク単位で行を受け取り、そのままレコードバッチへ変換して送出する。
+アーカイブ済みの年はDBではなくParquetのアーカイブから月ごとに読み込む（レポートと同じ）。
+"""
+
+import asyncio
+import logging
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, select
+
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+from app.models.user import User
+from app.services.archive_service import archive_service
+from app.utils.arrow import require_pyarrow, to_decimal
+
+logger = logging.getLogger(__name__)
+
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def attendance_export_schema():
+    """
+    エクスポートの列定義
+    """
+    pa = require_pyarrow()
+    return pa.schema([
+        ("attendance_id", pa.int32()),
+        ("user_id", pa.int32()),
+        ("user_name", pa.string()),
+        ("hourly_rate", pa.decimal128(10, 2)),
+        ("date", pa.date32()),
+        ("clock_in", pa.time64("us")),
+        ("clock_out", pa.time64("us")),
+        ("break_minutes", pa.int32()),
+        ("total_hours", pa.decimal128(5, 2)),
+        ("total_amount", pa.decimal128(10, 2)),
+        ("regular_minutes", pa.int32()),
+        ("overtime_minutes", pa.int32()),
+        ("night_minutes", pa.int32()),
+        ("holiday_minutes", pa.int32()),
+    ])
+
+
+class _ChunkSink:
+    """
+    書き込まれたバイト列を溜めておき、チャンクごとに取り出すための出力先
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class AnalyticsExportService:
+    """
+    勤怠データの列指向エクスポートサービス
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or settings.ANALYTICS_CHUNK_SIZE
+
+    def _query(self, start_date: date, end_date: date, user_ids: Optional[Sequence[int]]):
+        # 休憩の集計も期間内に絞る（break_timesのパーティションの絞り込みが効く）
+        break_minutes = (
+            select(
+                BreakTime.attendance_id,
+                func.sum(BreakTime.duration).label("minutes")
+            )
+            .where(BreakTime.attendance_date.between(start_date, end_date))
+            .group_by(BreakTime.attendance_id)
+            .subquery()
+        )
+
+        conditions = [Attendance.date >= start_date, Attendance.date <= end_date]
+        if user_ids:
+            conditions.append(Attendance.user_id.in_(user_ids))
+
+        return (
+            select(
+                Attendance.id,
+                Attendance.user_id,
+                User.name,
+                User.hourly_rate,
+                Attendance.date,
+                Attendance.clock_in,
+                Attendance.clock_out,
+                func.coalesce(break_minutes.c.minutes, 0),
+                Attendance.total_hours,
+                Attendance.total_amount,
+                Attendance.regular_minutes,
+                Attendance.overtime_minutes,
+                Attendance.night_minutes,
+                Attendance.holiday_minutes
+            )
+            .join(User, User.id == Attendance.user_id)
+            .outerjoin(break_minutes, break_minutes.c.attendance_id == Attendance.id)
+            .where(and_(*conditions))
+            .order_by(Attendance.date, Attendance.user_id)
+        )
+
+    @staticmethod
+    def _segments(start_date: date, end_date: date) -> List[Tuple[date, date, bool]]:
+        """
+        期間を年で区切り、アーカイブ済みかどうかを付ける（アーカイブされていない年は続けて1つの期間にする）
+        """
+        segments: List[Tuple[date, date, bool]] = []
+        for year in range(start_date.year, end_date.year + 1):
+            start = max(start_date, date(year, 1, 1))
+            end = min(end_date, date(year, 12, 31))
+            archived = archive_service.is_archived(year)
+            if segments and not archived and not segments[-1][2]:
+                segments[-1] = (segments[-1][0], end, False)
+            else:
+                segments.append((start, end, archived))
+        return segments
+
+    def _to_batch(self, rows: Sequence[Sequence[Any]]):
+        """
+        行（エクスポートの列の並び）を列ごとのArrow配列に変換
+        """
+        pa = require_pyarrow()
+        schema = attendance_export_schema()
+        decimal_columns = {3, 8, 9}
+
+        columns = list(zip(*rows))
+        arrays = [
+            pa.array(
+                [to_decimal(v) for v in column] if index in decimal_columns else column,
+                type=schema.field(index).type
+            )
+            for index, column in enumerate(columns)
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    @staticmethod
+    def _read_archived_month(
+        year: int,
+        month: int,
+        start_date: date,
+        end_date: date,
+        user_ids: Optional[Sequence[int]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[int, int]]:
+        """
+        アーカイブから月の勤怠（日付・ユーザー順）と勤怠ごとの休憩時間（分）を読み込む
+        """
+        filters = [("date", ">=", start_date), ("date", "<=", end_date)]
+        if user_ids:
+            filters.append(("user_id", "in", list(user_ids)))
+        table = archive_service.read_month_table("attendance", year, month, filters)
+        if table is None or table.num_rows == 0:
+            return [], {}
+        attendances = table.sort_by([("date", "ascending"), ("user_id", "ascending")]).to_pylist()
+
+        break_minutes: Dict[int, int] = {}
+        breaks = archive_service.read_month_table(
+            "break_times", year, month, [("attendance_id", "in", [a["id"] for a in attendances])]
+        )
+        if breaks is not None and breaks.num_rows:
+            grouped = breaks.group_by("attendance_id").aggregate([("duration", "sum")])
+            break_minutes = dict(zip(
+                grouped.column("attendance_id").to_pylist(),
+                grouped.column("duration_sum").to_pylist()
+            ))
+        return attendances, break_minutes
+
+    async def _archived_rows(
+        self,
+        session,
+        start_date: date,
+        end_date: date,
+        user_ids: Optional[Sequence[int]]
+    ) -> AsyncIterator[List[Tuple]]:
+        """
+        アーカイブ済みの年の行を月ごとに返す（ユーザー名・時給はDBから取得し、DBと同じくユーザーのいない勤怠は除く）
+        """
+        for month in range(start_date.month, end_date.month + 1):
+            attendances, break_minutes = await asyncio.to_thread(
+                self._read_archived_month, start_date.year, month, start_date, end_date, user_ids
+            )
+            if not attendances:
+                continue
+
+            result = await session.execute(
+                select(User.id, User.name, User.hourly_rate)
+                .where(User.id.in_({a["user_id"] for a in attendances}))
+            )
+            users = {user_id: (name, hourly_rate) for user_id, name, hourly_rate in result.all()}
+
+            yield [
+                (
+                    a["id"], a["user_id"], *users[a["user_id"]], a["date"], a["clock_in"], a["clock_out"],
+                    break_minutes.get(a["id"]) or 0, a["total_hours"], a["total_amount"],
+                    a.get("regular_minutes"), a.get("overtime_minutes"),
+                    a.get("night_minutes"), a.get("holiday_minutes")
+                )
+                for a in attendances
+                if a["user_id"] in users
+            ]
+
+    async def iter_record_batches(
+        self,
+        start_date: date,
+        end_date: date,
+        user_ids: Optional[Sequence[int]] = None
+    ) -> AsyncIterator:
+        """
+        カーソル（アーカイブ済みの年はアーカイブ）からチャンク単位で行を読み、列ごとのArrow配列に変換してバッチを返す
+        """
+        async with AsyncReadSessionLocal() as session:
+            for start, end, archived in self._segments(start_date, end_date):
+                if archived:
+                    async for rows in self._archived_rows(session, start, end, user_ids):
+                        for offset in range(0, len(rows), self.chunk_size):
+                            yield self._to_batch(rows[offset:offset + self.chunk_size])
+                    continue
+
+                result = await session.stream(
+                    self._query(start, end, user_ids).execution_options(yield_per=self.chunk_size)
+                )
+                async for rows in result.partitions(self.chunk_size):
+                    yield self._to_batch(rows)
+
+    async def stream_parquet(
+        self,
+        start_date: date,
+        end_date: date,
+        user_ids: Optional[Sequence[int]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Parquetファイルをチャンク（行グループ）ごとに送出
+        """
+        pa = require_pyarrow()
+        import pyarrow.parquet as pq
+
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(
+            pa.PythonFile(sink, mode="w"),
+            attendance_export_schema(),
+            compression=settings.ARCHIVE_COMPRESSION
+        )
+        rows = 0
+        try:
+            async for batch in self.iter_record_batches(start_date, end_date, user_ids):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                yield sink.take()
+        finally:
+            writer.close()
+        yield sink.take()
+        logger.info(f"Exported {rows} attendance rows as Parquet ({start_date} - {end_date})")
+
+    async def stream_arrow(
+        self,
+        start_date: date,
+        end_date: date,
+        user_ids: Optional[Sequence[int]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Arrow IPCストリーム形式でバッチごとに送出
+        """
+        pa = require_pyarrow()
+
+        sink = _ChunkSink()
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), attendance_export_schema())
+        rows = 0
+        try:
+            async for batch in self.iter_record_batches(start_date, end_date, user_ids):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                yield sink.take()
+        finally:
+            writer.close()
+        yield sink.take()
+        logger.info(f"Exported {rows} attendance rows as Arrow stream ({start_date} - {end_date})")
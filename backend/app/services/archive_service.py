@@ -0,0 +1,472 @@
+"""
+締め済みの年の勤怠データをParquetファイルへ退避するアーカイブサービス
+
+配置:
+    {ARCHIVE_DIR}/attendance/year=YYYY/month=MM/data.parquet
+    {ARCHIVE_DIR}/break_times/year=YYYY/month=MM/data.parquet
+    {ARCHIVE_DIR}/manifest.json  # アーカイブ済みの年と各ファイルの行数・ハッシュ
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+from calendar import monthrange
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, select, text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+from app.schemas.attendance import AttendanceWithBreaks
+from app.utils.arrow import require_pyarrow, to_decimal
+from app.utils.fixed_point import hours_to_minutes, yen_to_sen
+from app.utils.timezone import now_jst, today_jst
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_COLUMNS = [
+    "id", "user_id", "date", "clock_in", "clock_out",
+    "work_minutes", "amount_sen", "total_hours", "total_amount", "regular_minutes", "overtime_minutes",
+    "night_minutes", "holiday_minutes", "created_at", "updated_at"
+]
+PREMIUM_MINUTE_COLUMNS = ["overtime_minutes", "night_minutes", "holiday_minutes"]
+BREAK_TIME_COLUMNS = [
+    "id", "attendance_id", "attendance_date", "start_time", "end_time",
+    "duration", "created_at", "updated_at"
+]
+# 削除時に1回のDELETEで指定するIDの数
+DELETE_CHUNK_SIZE = 1000
+
+
+class ArchiveError(Exception):
+    """
+    アーカイブ処理のエラー
+    """
+    pass
+
+
+class ArchivedYearError(ArchiveError):
+    """
+    アーカイブ済みの年の勤怠への書き込み
+    """
+    pass
+
+
+def _attendance_schema(tz: Optional[str]):
+    pa = require_pyarrow()
+    return pa.schema([
+        ("id", pa.int32()),
+        ("user_id", pa.int32()),
+        ("date", pa.date32()),
+        ("clock_in", pa.time64("us")),
+        ("clock_out", pa.time64("us")),
+        ("work_minutes", pa.int32()),
+        ("amount_sen", pa.int64()),
+        ("total_hours", pa.decimal128(5, 2)),
+        ("total_amount", pa.decimal128(10, 2)),
+        ("regular_minutes", pa.int32()),
+        ("overtime_minutes", pa.int32()),
+        ("night_minutes", pa.int32()),
+        ("holiday_minutes", pa.int32()),
+        ("created_at", pa.timestamp("us", tz=tz)),
+        ("updated_at", pa.timestamp("us", tz=tz)),
+    ])
+
+
+def _break_time_schema(tz: Optional[str]):
+    pa = require_pyarrow()
+    return pa.schema([
+        ("id", pa.int32()),
+        ("attendance_id", pa.int32()),
+        ("attendance_date", pa.date32()),
+        ("start_time", pa.time64("us")),
+        ("end_time", pa.time64("us")),
+        ("duration", pa.int32()),
+        ("created_at", pa.timestamp("us", tz=tz)),
+        ("updated_at", pa.timestamp("us", tz=tz)),
+    ])
+
+
+def _sha256(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArchiveService:
+    """
+    勤怠アーカイブサービス
+    """
+
+    def __init__(self, archive_dir: Optional[pathlib.Path] = None):
+        self.archive_dir = archive_dir or _default_archive_dir()
+        self.manifest_path = self.archive_dir / "manifest.json"
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_mtime: Optional[float] = None
+
+    # ---- マニフェスト ----
+
+    def manifest(self) -> Dict[str, Any]:
+        """
+        マニフェストを読み込む（更新されていなければキャッシュを返す）
+        """
+        try:
+            mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            return {"years": {}}
+
+        if self._manifest is None or mtime != self._manifest_mtime:
+            self._manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    def archived_years(self) -> List[int]:
+        return sorted(int(year) for year in self.manifest()["years"])
+
+    def is_archived(self, year: int) -> bool:
+        return str(year) in self.manifest()["years"]
+
+    def ensure_writable(self, value: date) -> None:
+        """
+        アーカイブ済みの年の日付ならエラー（アーカイブ済みの年はParquetだけから読むため、DBへの書き込みは反映されない）
+        """
+        if self.is_archived(value.year):
+            raise ArchivedYearError(f"Attendance for {value.year} is archived and read-only")
+
+    def _path(self, table: str, year: int, month: int) -> pathlib.Path:
+        return self.archive_dir / table / f"year={year}" / f"month={month:02d}" / "data.parquet"
+
+    # ---- 書き出し ----
+
+    def archive_year(self, conn: Connection, year: int, delete_rows: bool = True) -> Dict[str, Any]:
+        """
+        指定年の勤怠と休憩をParquetへ書き出し、検証後に書き出した行だけをDBから削除する
+        書き出しと削除は同じトランザクション（connはトランザクション開始直後）で、同じ時点のデータに対して行う
+        """
+        if year >= today_jst().year:
+            raise ArchiveError(f"Year {year} is not closed yet")
+        self._lock_tables(conn)
+        rearchive = self.is_archived(year)
+        if rearchive:
+            self.verify_year(year)
+            if not self._has_rows(conn, year):
+                return self.manifest()["years"][str(year)]
+            # 行を残したアーカイブや、アーカイブ後に書き込まれた行がある場合:
+            # 以前のファイルの行にDBの行を重ねて書き出し直し、DBから読んだ行だけを削除する
+
+        pa = require_pyarrow()
+        import pyarrow.parquet as pq
+
+        # SQLiteの日時はタイムゾーンなし（UTC）のため、そのままの形で保存する
+        tz = "UTC" if conn.dialect.name == "postgresql" else None
+        files: Dict[str, Dict[str, Any]] = {}
+        attendance_ids: List[int] = []
+        break_ids: List[int] = []
+        attendance_rows = 0
+        break_rows = 0
+
+        for month in range(1, 13):
+            start, end = date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+            attendances = conn.execute(
+                select(*[Attendance.__table__.c[name] for name in ATTENDANCE_COLUMNS])
+                .where(and_(Attendance.date >= start, Attendance.date <= end))
+                .order_by(Attendance.user_id, Attendance.date)
+            ).mappings().all()
+            breaks = conn.execute(
+                select(*[BreakTime.__table__.c[name] for name in BREAK_TIME_COLUMNS])
+                .join(Attendance, Attendance.id == BreakTime.attendance_id)
+                .where(and_(Attendance.date >= start, Attendance.date <= end))
+                .order_by(BreakTime.attendance_id, BreakTime.start_time)
+            ).mappings().all()
+            attendance_ids.extend(row["id"] for row in attendances)
+            break_ids.extend(row["id"] for row in breaks)
+
+            if rearchive:
+                attendances = self._merge_archived(
+                    "attendance", year, month, attendances, lambda row: (row["user_id"], row["date"])
+                )
+                breaks = self._merge_archived(
+                    "break_times", year, month, breaks, lambda row: (row["attendance_id"], row["start_time"])
+                )
+            if not attendances:
+                continue
+
+            attendance_table = pa.Table.from_pylist([
+                {
+                    **row,
+                    "total_hours": to_decimal(row["total_hours"]),
+                    "total_amount": to_decimal(row["total_amount"]),
+                }
+                for row in attendances
+            ], schema=_attendance_schema(tz))
+            # attendance_date未設定の古い行は勤怠の日付で補う
+            date_by_attendance = {row["id"]: row["date"] for row in attendances}
+            break_table = pa.Table.from_pylist([
+                {**row, "attendance_date": row["attendance_date"] or date_by_attendance.get(row["attendance_id"])}
+                for row in breaks
+            ], schema=_break_time_schema(tz))
+
+            for table_name, table in (("attendance", attendance_table), ("break_times", break_table)):
+                path = self._path(table_name, year, month)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                pq.write_table(table, path, compression=settings.ARCHIVE_COMPRESSION)
+                files[str(path.relative_to(self.archive_dir))] = {
+                    "rows": table.num_rows,
+                    "sha256": _sha256(path),
+                }
+
+            self._verify_month(year, month, attendances, breaks)
+            attendance_rows += len(attendances)
+            break_rows += len(breaks)
+            logger.info(f"Archived {len(attendances)} attendance rows for {year}-{month:02d}")
+
+        manifest = self.manifest()
+        manifest["years"][str(year)] = {
+            "archived_at": now_jst().isoformat(),
+            "attendance_rows": attendance_rows,
+            "break_rows": break_rows,
+            "files": files,
+        }
+        # マニフェストに記録した時点でレポートはアーカイブから読まれる
+        self._write_manifest(manifest)
+
+        if delete_rows:
+            self._delete_year(conn, year, attendance_ids, break_ids)
+
+        return manifest["years"][str(year)]
+
+    def _merge_archived(self, table_name: str, year: int, month: int, rows, sort_key) -> List[Dict[str, Any]]:
+        """
+        アーカイブ済みの月の行にDBの行を重ねる（同じIDはDBの行を優先）
+        """
+        import pyarrow.parquet as pq
+
+        path = self._path(table_name, year, month)
+        merged = {}
+        if path.exists():
+            merged = {row["id"]: row for row in pq.read_table(path, memory_map=True).to_pylist()}
+        merged.update((row["id"], dict(row)) for row in rows)
+        return sorted(merged.values(), key=sort_key)
+
+    def _lock_tables(self, conn: Connection) -> None:
+        """
+        書き出しから削除まで勤怠・休憩への書き込みを止め、同じスナップショットで読み書きする（PostgreSQL）
+        SQLiteはトランザクション内の読み取りが1つのスナップショットで、書き込みは直列に実行される
+        """
+        if conn.dialect.name == "postgresql":
+            # いずれもトランザクションの最初のクエリより前に実行する必要がある
+            conn.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+            conn.execute(text("LOCK TABLE attendance, break_times IN SHARE MODE"))
+
+    def _has_rows(self, conn: Connection, year: int) -> bool:
+        return conn.execute(
+            select(Attendance.id)
+            .where(and_(Attendance.date >= date(year, 1, 1), Attendance.date <= date(year, 12, 31)))
+            .limit(1)
+        ).first() is not None
+
+    def _verify_month(self, year: int, month: int, attendances, breaks) -> None:
+        """
+        書き出したファイルを読み直し、行数とIDが一致することを確認
+        """
+        import pyarrow.parquet as pq
+
+        checks = (
+            ("attendance", attendances),
+            ("break_times", breaks),
+        )
+        for table_name, rows in checks:
+            table = pq.read_table(self._path(table_name, year, month), memory_map=True, columns=["id"])
+            if table.num_rows != len(rows):
+                raise ArchiveError(
+                    f"Row count mismatch for {table_name} {year}-{month:02d}: "
+                    f"{table.num_rows} != {len(rows)}"
+                )
+            if sorted(table.column("id").to_pylist()) != sorted(row["id"] for row in rows):
+                raise ArchiveError(f"Row ids mismatch for {table_name} {year}-{month:02d}")
+
+        table = pq.read_table(self._path("attendance", year, month), memory_map=True, columns=["total_amount"])
+        archived_amount = sum(value or Decimal("0") for value in table.column("total_amount").to_pylist())
+        expected_amount = sum(to_decimal(row["total_amount"]) or Decimal("0") for row in attendances)
+        if archived_amount != expected_amount:
+            raise ArchiveError(f"Amount mismatch for attendance {year}-{month:02d}")
+
+    def verify_year(self, year: int) -> None:
+        """
+        マニフェストのハッシュと行数でアーカイブファイルを検証
+        """
+        entry = self.manifest()["years"].get(str(year))
+        if entry is None:
+            raise ArchiveError(f"Year {year} is not archived")
+
+        import pyarrow.parquet as pq
+
+        for relative_path, expected in entry["files"].items():
+            path = self.archive_dir / relative_path
+            if not path.exists():
+                raise ArchiveError(f"Missing archive file: {relative_path}")
+            if _sha256(path) != expected["sha256"]:
+                raise ArchiveError(f"Checksum mismatch: {relative_path}")
+            if pq.ParquetFile(path, memory_map=True).metadata.num_rows != expected["rows"]:
+                raise ArchiveError(f"Row count mismatch: {relative_path}")
+
+    def _delete_year(self, conn: Connection, year: int, attendance_ids: List[int], break_ids: List[int]) -> None:
+        """
+        書き出した行だけをIDで削除し、空になったパーティションを切り離して削除
+        """
+        start, end = date(year, 1, 1), date(year, 12, 31)
+
+        breaks_deleted = 0
+        for offset in range(0, len(break_ids), DELETE_CHUNK_SIZE):
+            breaks_deleted += conn.execute(
+                delete(BreakTime).where(BreakTime.id.in_(break_ids[offset:offset + DELETE_CHUNK_SIZE]))
+            ).rowcount
+        attendance_deleted = 0
+        for offset in range(0, len(attendance_ids), DELETE_CHUNK_SIZE):
+            attendance_deleted += conn.execute(
+                delete(Attendance).where(and_(
+                    Attendance.date >= start,
+                    Attendance.date <= end,
+                    Attendance.id.in_(attendance_ids[offset:offset + DELETE_CHUNK_SIZE])
+                ))
+            ).rowcount
+        logger.info(
+            f"Deleted archived rows for {year} "
+            f"({attendance_deleted} attendance, {breaks_deleted} break_times)"
+        )
+
+        if conn.dialect.name == "postgresql":
+            from app.core.partitioning import detach_partition, is_partitioned, partition_start, next_partition_start
+
+            interval = settings.ATTENDANCE_PARTITION_INTERVAL.lower()
+            if interval != "none" and is_partitioned(conn):
+                current = partition_start(start, interval)
+                while current <= end:
+                    following = next_partition_start(current, interval)
+                    remaining = conn.execute(
+                        select(func.count())
+                        .select_from(Attendance)
+                        .where(and_(Attendance.date >= current, Attendance.date < following))
+                    ).scalar()
+                    if remaining:
+                        logger.warning(f"Keeping partition for {current}: {remaining} rows were not archived")
+                    else:
+                        for name in detach_partition(conn, current, interval):
+                            conn.execute(text(f"DROP TABLE {name}"))
+                    current = following
+
+    # ---- 読み込み ----
+
+    def read_monthly_attendances(self, user_id: int, year: int, month: int) -> List[AttendanceWithBreaks]:
+        """
+        アーカイブから月の勤怠を読み込む（ファイルはメモリマップで参照）
+        """
+        import pyarrow.parquet as pq
+
+        attendance_path = self._path("attendance", year, month)
+        if not attendance_path.exists():
+            return []
+
+        attendances = pq.read_table(
+            attendance_path,
+            memory_map=True,
+            filters=[("user_id", "=", user_id)]
+        ).sort_by("date").to_pylist()
+        if not attendances:
+            return []
+
+        breaks_by_attendance: Dict[int, List[Dict[str, Any]]] = {}
+        break_path = self._path("break_times", year, month)
+        if break_path.exists():
+            breaks = pq.read_table(
+                break_path,
+                memory_map=True,
+                filters=[("attendance_id", "in", [a["id"] for a in attendances])]
+            ).sort_by("start_time").to_pylist()
+            for break_time in breaks:
+                breaks_by_attendance.setdefault(break_time["attendance_id"], []).append(break_time)
+
+        return [
+            AttendanceWithBreaks(**attendance, break_times=breaks_by_attendance.get(attendance["id"], []))
+            for attendance in attendances
+        ]
+
+    def read_month_table(self, table: str, year: int, month: int, filters=None):
+        """
+        アーカイブの月のテーブルをそのまま読み込む（ファイルがなければNone）
+        """
+        import pyarrow.parquet as pq
+
+        path = self._path(table, year, month)
+        if not path.exists():
+            return None
+        return pq.read_table(path, memory_map=True, filters=filters)
+
+    def read_yearly_summary(self, user_id: int, year: int) -> Dict[int, Dict[str, Any]]:
+        """
+        アーカイブから月別の日数・労働時間（分）・金額（銭）を集計
+        """
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        summary = {}
+        for month in range(1, 13):
+            path = self._path("attendance", year, month)
+            if not path.exists():
+                continue
+
+            # 割増区分や分・銭のカラムがない古いアーカイブにも対応する
+            available = set(pq.read_schema(path, memory_map=True).names)
+            minute_columns = [name for name in PREMIUM_MINUTE_COLUMNS if name in available]
+            has_fixed_point = {"work_minutes", "amount_sen"} <= available
+            table = pq.read_table(
+                path,
+                memory_map=True,
+                columns=[
+                    *(["work_minutes", "amount_sen"] if has_fixed_point else ["total_hours", "total_amount"]),
+                    *minute_columns
+                ],
+                filters=[("user_id", "=", user_id)]
+            )
+            if table.num_rows == 0:
+                continue
+
+            if has_fixed_point:
+                work_minutes = pc.sum(table.column("work_minutes")).as_py() or 0
+                amount_sen = pc.sum(table.column("amount_sen")).as_py() or 0
+            else:
+                work_minutes = sum(hours_to_minutes(value) for value in table.column("total_hours").to_pylist())
+                amount_sen = sum(yen_to_sen(value) for value in table.column("total_amount").to_pylist())
+
+            summary[month] = {
+                "days": table.num_rows,
+                "work_minutes": work_minutes,
+                "amount_sen": amount_sen,
+                **{name: pc.sum(table.column(name)).as_py() or 0 for name in minute_columns},
+            }
+        return summary
+
+
+def _default_archive_dir() -> pathlib.Path:
+    if settings.ARCHIVE_DIR:
+        return pathlib.Path(settings.ARCHIVE_DIR)
+    return pathlib.Path.home() / ".attendance" / "archive"
+
+
+# シングルトンインスタンス
+archive_service = ArchiveService()
@@ -1,15 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, delete
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, or_
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Optional, List
+from typing import Optional, Iterable, List, Dict, Set, Tuple
 from calendar import monthrange
 import logging
 
 from app.models.attendance import Attendance
 from app.models.user import User
 from app.models.break_time import BreakTime
+from app.core.cache import cache, reports_namespace
+from app.core.events import event_broker
+from app.schemas.attendance import AttendanceResponse
+from app.services.overtime_service import AccumulatorDeltas, OvertimeService
+from app.services.pay_rules import PayBreakdown, ShiftInput, default_rules
+from app.services.read_repository import AttendanceReadRepository, MonthTotals
 from app.utils.timezone import today_jst, now_time_jst, combine_date_time_jst
 
 logger = logging.getLogger(__name__)
@@ -66,6 +71,7 @@ class AttendanceService:
         await self.db.refresh(attendance)
         
         logger.info(f"User {user_id} clocked in at {current_time}")
+        await self.publish_attendance_event("attendance.clock_in", attendance)
         return attendance
     
     async def clock_out(
@@ -103,54 +109,151 @@ class AttendanceService:
         await self.db.refresh(attendance)
         
         logger.info(f"User {user_id} clocked out at {current_time}")
+        await self.publish_attendance_event("attendance.clock_out", attendance)
         return attendance
     
+    async def publish_attendance_event(self, event_type: str, attendance: Attendance) -> None:
+        """
+        勤怠変更イベントを発行（コミット後に呼び出すこと）
+        """
+        await self.invalidate_cache(attendance.user_id)
+        await event_broker.publish(
+            event_type,
+            attendance.user_id,
+            AttendanceResponse.model_validate(attendance).model_dump(mode="json")
+        )
+    
+    async def invalidate_cache(self, user_id: int) -> None:
+        """
+        ユーザーのレポートのキャッシュを無効化（コミット後に呼び出すこと）
+        """
+        await cache.invalidate(reports_namespace(user_id))
+    
     async def calculate_totals(self, attendance: Attendance) -> None:
         """
         労働時間と金額を計算
         """
-        if not attendance.clock_in or not attendance.clock_out:
+        await self.calculate_totals_bulk([attendance])
+    
+    async def calculate_totals_bulk(self, attendances: List[Attendance]) -> None:
+        """
+        複数の勤怠の労働時間と金額をまとめて計算
+        週40時間の判定のため、対象勤怠を含む週の勤怠もまとめて再計算する
+        （勤怠・休憩・時給はそれぞれ1回のクエリで取得）
+        """
+        await self.recalculate_weeks({(a.user_id, a.date) for a in attendances})
+    
+    async def recalculate_weeks(self, keys: Iterable[Tuple[int, date]]) -> None:
+        """
+        (ユーザーID, 日付)を含む週の勤怠をまとめて再計算
+        """
+        keys = set(keys)
+        if not keys:
             return
         
-        # 基本労働時間の計算（分単位）
-        clock_in_dt = datetime.combine(attendance.date, attendance.clock_in)
-        clock_out_dt = datetime.combine(attendance.date, attendance.clock_out)
+        # 新規の勤怠・休憩をIDとともにクエリへ反映させる
+        await self.db.flush()
+        rules = default_rules()
         
-        # 日跨ぎ対応
-        if clock_out_dt < clock_in_dt:
-            clock_out_dt += timedelta(days=1)
-        
-        total_minutes = (clock_out_dt - clock_in_dt).total_seconds() / 60
-        
-        # 休憩時間の取得と差し引き
+        weeks = {(user_id, rules.week_start(work_date)) for user_id, work_date in keys}
         result = await self.db.execute(
-            select(BreakTime)
-            .where(BreakTime.attendance_id == attendance.id)
+            select(Attendance).where(or_(*[
+                and_(
+                    Attendance.user_id == user_id,
+                    Attendance.date >= week_start,
+                    Attendance.date < week_start + timedelta(days=7)
+                )
+                for user_id, week_start in weeks
+            ]))
         )
-        breaks = result.scalars().all()
-        
-        total_break_minutes = sum(
-            b.duration for b in breaks if b.duration
+        attendances = result.scalars().all()
+        if not attendances:
+            return
+        targets = [a for a in attendances if a.clock_in and a.clock_out]
+        
+        breaks: Dict[int, List[Tuple[time, time]]] = {}
+        hourly_rates: Dict[int, Decimal] = {}
+        if targets:
+            result = await self.db.execute(
+                select(BreakTime.attendance_id, BreakTime.start_time, BreakTime.end_time)
+                .where(and_(
+                    BreakTime.attendance_id.in_([a.id for a in targets]),
+                    BreakTime.end_time.isnot(None)
+                ))
+            )
+            for attendance_id, start_time, end_time in result.all():
+                breaks.setdefault(attendance_id, []).append((start_time, end_time))
+            
+            result = await self.db.execute(
+                select(User.id, User.hourly_rate)
+                .where(User.id.in_({a.user_id for a in targets}))
+            )
+            hourly_rates = {user_id: rate for user_id, rate in result.all()}
+        
+        breakdowns = rules.evaluate(
+            ShiftInput(
+                attendance_id=a.id,
+                user_id=a.user_id,
+                date=a.date,
+                clock_in=a.clock_in,
+                clock_out=a.clock_out,
+                hourly_rate=hourly_rates.get(a.user_id),
+                breaks=breaks.get(a.id, [])
+            )
+            for a in targets
         )
+        # 36協定の累計は変更前後の差分だけを加算する
+        # 退勤（出勤）が取り消された勤怠は区分の分数・金額を0に戻し、累計からも差し引く
+        deltas: AccumulatorDeltas = {}
+        for attendance in attendances:
+            previous_overtime = attendance.overtime_minutes or 0
+            previous_holiday = attendance.holiday_minutes or 0
+            self._apply_totals(attendance, breakdowns.get(attendance.id, PayBreakdown()))
+            OvertimeService.add_delta(
+                deltas,
+                attendance.user_id,
+                attendance.date,
+                attendance.overtime_minutes - previous_overtime,
+                attendance.holiday_minutes - previous_holiday
+            )
+        await OvertimeService(self.db).apply_deltas(deltas)
+    
+    async def delete_attendance(self, attendance: Attendance) -> None:
+        """
+        勤怠を削除し、同じ週の勤怠と36協定の累計を再計算（コミットは呼び出し側で行う）
+        """
+        deltas: AccumulatorDeltas = {}
+        OvertimeService.add_delta(
+            deltas,
+            attendance.user_id,
+            attendance.date,
+            -(attendance.overtime_minutes or 0),
+            -(attendance.holiday_minutes or 0)
+        )
+        await self.db.delete(attendance)
+        await OvertimeService(self.db).apply_deltas(deltas)
         
-        # 実労働時間（時間単位）
-        work_minutes = total_minutes - total_break_minutes
-        work_hours = Decimal(str(work_minutes / 60))
-        
-        # ユーザーの時給取得
-        user = await self.db.get(User, attendance.user_id)
-        if user:
-            total_amount = work_hours * user.hourly_rate
-        else:
-            total_amount = Decimal("0")
-        
-        # 更新
-        attendance.total_hours = work_hours
-        attendance.total_amount = total_amount
+        # 削除により週40時間の判定が変わる可能性があるため再計算
+        await self.calculate_totals_bulk([attendance])
+    
+    def _apply_totals(self, attendance: Attendance, breakdown: PayBreakdown) -> None:
+        """
+        計算結果（区分ごとの分数・労働時間・金額）を勤怠に設定
+        """
+        attendance.work_minutes = round(breakdown.work_minutes)
+        attendance.amount_sen = breakdown.amount_sen
+        attendance.total_hours = breakdown.total_hours
+        attendance.total_amount = breakdown.total_amount
+        attendance.regular_minutes = round(breakdown.regular_minutes)
+        attendance.overtime_minutes = round(breakdown.overtime_minutes)
+        attendance.night_minutes = round(breakdown.night_minutes)
+        attendance.holiday_minutes = round(breakdown.holiday_minutes)
         
         logger.info(
             f"Calculated totals for attendance {attendance.id}: "
-            f"{work_hours} hours, {total_amount} yen"
+            f"{breakdown.total_hours} hours, {breakdown.total_amount} yen "
+            f"(overtime {attendance.overtime_minutes} min, night {attendance.night_minutes} min, "
+            f"holiday {attendance.holiday_minutes} min)"
         )
     
     async def update_break_times(
@@ -165,20 +268,20 @@ class AttendanceService:
             attendance: 勤怠レコード
             break_times_data: 休憩時間データのリスト
         """
-        if not break_times_data:
-            # 休憩時間データがない場合は既存の休憩時間をすべて削除
-            await self.db.execute(
-                delete(BreakTime).where(BreakTime.attendance_id == attendance.id)
-            )
-            logger.info(f"All break times deleted for attendance {attendance.id}")
-            return
-        
         # 既存の休憩時間を取得
         result = await self.db.execute(
             select(BreakTime).where(BreakTime.attendance_id == attendance.id)
         )
         existing_breaks = {bt.id: bt for bt in result.scalars().all()}
         
+        if not break_times_data:
+            # 休憩時間データがない場合は既存の休憩時間をすべて削除
+            # （ORM経由で削除し、差分同期用の削除記録を残す）
+            for break_time in existing_breaks.values():
+                await self.db.delete(break_time)
+            logger.info(f"All break times deleted for attendance {attendance.id}")
+            return
+        
         # 更新・作成予定のIDセット
         updated_ids = set()
         
@@ -208,6 +311,7 @@ class AttendanceService:
                 # 新規休憩時間を作成
                 new_break = BreakTime(
                     attendance_id=attendance.id,
+                    attendance_date=attendance.date,
                     start_time=start_time,
                     end_time=end_time,
                     duration=duration
@@ -251,80 +355,132 @@ class AttendanceService:
     ) -> List[dict]:
         """
         月間カレンダー形式で勤怠データを取得
+        （読み取り専用のため、ORMを経由せずリポジトリの軽量な行で取得）
         """
-        from app.schemas.attendance import CalendarDay, AttendanceWithBreaks
-        
-        # 月の全日程を生成
-        _, last_day = monthrange(year, month)
-        all_dates = [date(year, month, day) for day in range(1, last_day + 1)]
-        
         # 該当月の勤怠データを一括取得
-        result = await self.db.execute(
-            select(Attendance)
-            .options(selectinload(Attendance.break_times))
-            .where(and_(
-                Attendance.user_id == user_id,
-                Attendance.date >= date(year, month, 1),
-                Attendance.date <= date(year, month, last_day)
-            ))
-        )
-        attendances = result.scalars().all()
+        attendances = await AttendanceReadRepository(self.db).for_month(user_id, year, month)
+        return self.build_calendar_days(year, month, attendances)
+    
+    @staticmethod
+    def _calendar_dates(year: int, month: int) -> List[Tuple[date, int, bool]]:
+        """
+        月の全日程の (日付, 曜日, 土日かどうか)
+        """
+        _, last_day = monthrange(year, month)
+        days = []
+        for day in range(1, last_day + 1):
+            current_date = date(year, month, day)
+            day_of_week = current_date.weekday()  # 0=月曜, 6=日曜
+            days.append((current_date, day_of_week, day_of_week >= 5))  # 土日
+        return days
+    
+    @staticmethod
+    def _day_status(is_weekend: bool, present: bool) -> str:
+        if is_weekend:
+            return "weekend"
+        return "present" if present else "absent"
+    
+    @staticmethod
+    def build_calendar_days(year: int, month: int, attendances: Iterable) -> List[dict]:
+        """
+        取得済みの勤怠から月の全日程のカレンダーを組み立てる（月外の勤怠は無視）
+        """
         attendance_dict = {a.date: a for a in attendances}
         
         # カレンダーデータを構築
         calendar_days = []
-        for current_date in all_dates:
-            day_of_week = current_date.weekday()  # 0=月曜, 6=日曜
-            is_weekend = day_of_week >= 5  # 土日
+        for current_date, day_of_week, is_weekend in AttendanceService._calendar_dates(year, month):
             attendance = attendance_dict.get(current_date)
-            
-            # ステータス判定
-            if is_weekend:
-                status = "weekend"
-            elif attendance and attendance.clock_in:
-                status = "present"
-            else:
-                status = "absent"
-            
-            calendar_day = {
+            calendar_days.append({
                 "date": current_date,
                 "day_of_week": day_of_week,
                 "is_weekend": is_weekend,
                 "is_holiday": False,  # 将来の祝日対応
                 "attendance": attendance,
-                "status": status
-            }
-            calendar_days.append(calendar_day)
+                "status": AttendanceService._day_status(is_weekend, bool(attendance and attendance.clock_in))
+            })
         
         return calendar_days
     
-    async def get_monthly_calendar_summary(
+    @staticmethod
+    def build_calendar_statuses(year: int, month: int, present_dates: Set[date]) -> List[dict]:
+        """
+        出勤日の集合から勤怠の詳細を含まないカレンダーを組み立てる
+        """
+        return [
+            {
+                "date": current_date,
+                "day_of_week": day_of_week,
+                "is_weekend": is_weekend,
+                "is_holiday": False,
+                "status": AttendanceService._day_status(is_weekend, current_date in present_dates)
+            }
+            for current_date, day_of_week, is_weekend in AttendanceService._calendar_dates(year, month)
+        ]
+    
+    @staticmethod
+    def _attendance_rate(total_present_days: int, total_working_days: int) -> Decimal:
+        if total_working_days <= 0:
+            return Decimal("0")
+        return Decimal(str(total_present_days / total_working_days * 100)).quantize(Decimal("0.01"))
+    
+    async def get_monthly_calendar_totals(
         self,
         user_id: int,
         year: int,
         month: int
     ) -> dict:
         """
-        月間カレンダーの集計データを取得
+        月間カレンダーの集計値だけを取得（1回の集計クエリ、日ごとのデータは取得しない）
         """
-        calendar_days = await self.get_monthly_calendar(user_id, year, month)
+        totals = await AttendanceReadRepository(self.db).month_totals(user_id, year, month)
+        total_working_days = sum(1 for _, _, is_weekend in self._calendar_dates(year, month) if not is_weekend)
         
-        # 集計計算
+        return {
+            "year": year,
+            "month": month,
+            "total_working_days": total_working_days,
+            "total_present_days": totals.present_days,
+            "attendance_rate": self._attendance_rate(totals.present_days, total_working_days),
+            "total_hours": totals.total_hours,
+            "total_amount": totals.total_amount
+        }
+    
+    async def get_monthly_calendar_summary(
+        self,
+        user_id: int,
+        year: int,
+        month: int,
+        include_attendance: bool = True
+    ) -> dict:
+        """
+        月間カレンダーの集計データを取得（集計値は日ごとのデータとは別に集計クエリで求める）
+        include_attendanceがFalseの場合は出勤日だけを取得し、勤怠の行を組み立てない
+        """
+        if include_attendance:
+            calendar_days = await self.get_monthly_calendar(user_id, year, month)
+        else:
+            present_dates = await AttendanceReadRepository(self.db).present_dates(user_id, year, month)
+            calendar_days = self.build_calendar_statuses(year, month, present_dates)
+        
+        totals = await self.get_monthly_calendar_totals(user_id, year, month)
+        return {
+            "year": year,
+            "month": month,
+            "calendar_days": calendar_days,
+            **{key: value for key, value in totals.items() if key not in ("year", "month")}
+        }
+    
+    @staticmethod
+    def summarize_calendar(year: int, month: int, calendar_days: List[dict]) -> dict:
+        """
+        取得済みのカレンダーの日程から出勤率・総労働時間・総支給額を集計
+        """
         total_working_days = sum(1 for day in calendar_days if not day["is_weekend"] and not day["is_holiday"])
         total_present_days = sum(1 for day in calendar_days if day["status"] == "present")
         
-        # 出勤率計算
-        attendance_rate = Decimal("0")
-        if total_working_days > 0:
-            attendance_rate = Decimal(str(total_present_days / total_working_days * 100)).quantize(Decimal("0.01"))
-        
-        # 総労働時間と総支給額
-        total_hours = Decimal("0")
-        total_amount = Decimal("0")
-        for day in calendar_days:
-            if day["attendance"]:
-                total_hours += day["attendance"].total_hours or Decimal("0")
-                total_amount += day["attendance"].total_amount or Decimal("0")
+        # 総労働時間と総支給額（分・銭の整数で合計）
+        totals = MonthTotals.from_rows(day["attendance"] for day in calendar_days if day["attendance"])
         
         return {
             "year": year,
@@ -332,7 +488,7 @@ class AttendanceService:
             "calendar_days": calendar_days,
             "total_working_days": total_working_days,
             "total_present_days": total_present_days,
-            "attendance_rate": attendance_rate,
-            "total_hours": total_hours,
-            "total_amount": total_amount
+            "attendance_rate": AttendanceService._attendance_rate(total_present_days, total_working_days),
+            "total_hours": totals.total_hours,
+            "total_amount": totals.total_amount
         }
\ No newline at end of file
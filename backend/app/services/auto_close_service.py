@@ -0,0 +1,293 @@
+"""
+打刻忘れの自動締め
+
+退勤の打刻がない勤怠と終了していない休憩を、締め基準時刻を過ぎたものだけ
+1回のクエリ（部分インデックスを使用）で抽出し、ポリシーに従って一括更新する。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, text, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+from app.services.pay_rules import default_rules
+from app.utils.timezone import now_jst
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("standard", "end_of_day", "clock_in")
+
+# 複数ワーカーが同時に実行しないためのアドバイザリロックのキー
+ADVISORY_LOCK_KEY = 36_0001
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _from_minutes(minutes: int) -> time:
+    minutes %= MINUTES_PER_DAY
+    return time(minutes // 60, minutes % 60)
+
+
+def _elapsed(value: time, base: time) -> int:
+    """
+    base からの経過分（日跨ぎ対応）
+    """
+    return (_to_minutes(value) - _to_minutes(base)) % MINUTES_PER_DAY
+
+
+def policy_clock_out(policy: str, clock_in: time) -> time:
+    """
+    ポリシーに従った退勤時刻
+    """
+    if policy == "standard":
+        return _from_minutes(_to_minutes(clock_in) + round(settings.AUTO_CLOSE_SHIFT_HOURS * 60))
+    if policy == "end_of_day":
+        return max(time(23, 59), clock_in.replace(second=0, microsecond=0))
+    if policy == "clock_in":
+        return clock_in
+    raise ValueError(f"Unknown auto-close policy: {policy}")
+
+
+@dataclass
+class AutoCloseReport:
+    """
+    自動締めの実行結果
+    """
+    cutoff: datetime
+    policy: str
+    dry_run: bool = False
+    skipped: bool = False  # 他のプロセスが実行中のため何もしなかった
+    closed_shifts: List[Dict[str, Any]] = field(default_factory=list)
+    closed_breaks: List[Dict[str, Any]] = field(default_factory=list)
+    recalculated_weeks: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["cutoff"] = self.cutoff.isoformat()
+        for item in data["closed_shifts"] + data["closed_breaks"]:
+            for key, value in item.items():
+                if isinstance(value, (date, time)):
+                    item[key] = value.isoformat()
+        return data
+
+    def summary(self) -> str:
+        prefix = "[dry run] " if self.dry_run else ""
+        return (
+            f"{prefix}Auto-closed {len(self.closed_shifts)} shifts and {len(self.closed_breaks)} breaks "
+            f"older than {self.cutoff.isoformat()} (policy: {self.policy})"
+        )
+
+
+class AutoCloseService:
+    """
+    打刻忘れの自動締めサービス
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _open_records_query(self, cutoff: datetime):
+        """
+        締め基準時刻より前に出勤した未退勤の勤怠と、締め済み勤怠の未終了の休憩
+        （どちらも部分インデックスで絞り込めるUNION ALLの1クエリ）
+        """
+        stale = or_(
+            Attendance.date < cutoff.date(),
+            and_(Attendance.date == cutoff.date(), Attendance.clock_in <= cutoff.time())
+        )
+        columns = (
+            Attendance.id,
+            Attendance.user_id,
+            Attendance.date,
+            Attendance.clock_in,
+            Attendance.clock_out,
+            BreakTime.id,
+            BreakTime.start_time
+        )
+        open_shifts = (
+            select(*columns)
+            .select_from(Attendance)
+            .outerjoin(BreakTime, and_(
+                BreakTime.attendance_id == Attendance.id,
+                BreakTime.end_time.is_(None)
+            ))
+            .where(and_(Attendance.clock_out.is_(None), Attendance.clock_in.isnot(None), stale))
+        )
+        open_breaks = (
+            select(*columns)
+            .select_from(BreakTime)
+            .join(Attendance, Attendance.id == BreakTime.attendance_id)
+            .where(and_(BreakTime.end_time.is_(None), Attendance.clock_out.isnot(None), stale))
+        )
+        return union_all(open_shifts, open_breaks)
+
+    async def _try_lock(self) -> bool:
+        if self.db.bind.dialect.name != "postgresql":
+            return True
+        result = await self.db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+        )
+        return bool(result.scalar())
+
+    async def run(
+        self,
+        cutoff: Optional[datetime] = None,
+        policy: Optional[str] = None,
+        dry_run: bool = False
+    ) -> AutoCloseReport:
+        """
+        締め基準時刻より古い未退勤・未終了の休憩を締めて合計を再計算
+        """
+        from app.services.attendance_service import AttendanceService
+
+        policy = (policy or settings.AUTO_CLOSE_POLICY).lower()
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown auto-close policy: {policy} (expected one of {', '.join(POLICIES)})")
+        if cutoff is None:
+            cutoff = now_jst().replace(tzinfo=None) - timedelta(hours=settings.AUTO_CLOSE_AFTER_HOURS)
+
+        report = AutoCloseReport(cutoff=cutoff, policy=policy, dry_run=dry_run)
+        if not await self._try_lock():
+            report.skipped = True
+            logger.info("Auto-close is already running in another process; skipped")
+            return report
+
+        result = await self.db.execute(self._open_records_query(cutoff))
+        rows = result.all()
+        if not rows:
+            logger.info(report.summary())
+            return report
+
+        # 勤怠ごとの退勤時刻を決め、休憩の終了時刻はその範囲に収める
+        shift_updates: Dict[int, Dict[str, Any]] = {}
+        break_updates: List[Dict[str, Any]] = []
+        keys: set = set()
+        for attendance_id, user_id, work_date, clock_in, clock_out, break_id, break_start in rows:
+            keys.add((user_id, work_date))
+            if clock_out is None:
+                clock_out = policy_clock_out(policy, clock_in)
+                shift_updates[attendance_id] = {"id": attendance_id, "clock_out": clock_out}
+                report.closed_shifts.append({
+                    "attendance_id": attendance_id,
+                    "user_id": user_id,
+                    "date": work_date,
+                    "clock_in": clock_in,
+                    "clock_out": clock_out
+                })
+            if break_id is None:
+                continue
+
+            duration = settings.AUTO_CLOSE_BREAK_MINUTES
+            start_offset = _elapsed(break_start, clock_in)
+            shift_length = _elapsed(clock_out, clock_in)
+            if start_offset <= shift_length:
+                duration = max(min(duration, shift_length - start_offset), 0)
+            end_time = _from_minutes(_to_minutes(break_start) + duration)
+            break_updates.append({"id": break_id, "end_time": end_time, "duration": duration})
+            report.closed_breaks.append({
+                "break_id": break_id,
+                "attendance_id": attendance_id,
+                "user_id": user_id,
+                "date": work_date,
+                "start_time": break_start,
+                "end_time": end_time
+            })
+
+        if dry_run:
+            logger.info(report.summary())
+            return report
+
+        # 主キー指定の一括UPDATE（対象行のみ）
+        if shift_updates:
+            await self.db.execute(
+                update(Attendance),
+                list(shift_updates.values())
+            )
+        if break_updates:
+            await self.db.execute(
+                update(BreakTime),
+                break_updates
+            )
+
+        # 影響のある週だけ合計（と36協定の累計）をまとめて再計算
+        service = AttendanceService(self.db)
+        await service.recalculate_weeks(keys)
+        rules = default_rules()
+        report.recalculated_weeks = len({(user_id, rules.week_start(work_date)) for user_id, work_date in keys})
+        await self.db.commit()
+
+        # 締めた勤怠を1回のクエリで読み直してイベントを発行
+        result = await self.db.execute(
+            select(Attendance)
+            .where(Attendance.id.in_({item["attendance_id"] for item in report.closed_shifts + report.closed_breaks}))
+            .execution_options(populate_existing=True)
+        )
+        for attendance in result.scalars().all():
+            await service.publish_attendance_event("attendance.auto_closed", attendance)
+
+        logger.info(report.summary())
+        return report
+
+
+def _seconds_until(run_at: time) -> float:
+    now = now_jst()
+    target = now.replace(hour=run_at.hour, minute=run_at.minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class AutoCloseScheduler:
+    """
+    毎日決まった時刻（JST）に自動締めを実行するスケジューラ
+    """
+
+    def __init__(self, run_at: str):
+        hour, minute = run_at.split(":")
+        self.run_at = time(int(hour), int(minute))
+        self._task: Optional[asyncio.Task] = None
+        self.last_report: Optional[AutoCloseReport] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Auto-close scheduler started (daily at {self.run_at.strftime('%H:%M')} JST)")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> AutoCloseReport:
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            self.last_report = await AutoCloseService(db).run()
+        return self.last_report
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(_seconds_until(self.run_at))
+            try:
+                await self.run_once()
+            except Exception as e:
+                # 失敗しても翌日の実行は続ける
+                logger.error(f"Auto-close run failed: {e}")
+
+
+# シングルトンインスタンス
+auto_close_scheduler = AutoCloseScheduler(settings.AUTO_CLOSE_RUN_AT)
@@ -1,11 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, literal, literal_column, Integer, Time
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, time, timedelta
 from typing import Optional
 import logging
 
 from app.models.break_time import BreakTime
 from app.models.attendance import Attendance
+from app.core.cache import cache, reports_namespace
+from app.core.events import event_broker
+from app.schemas.break_time import BreakTimeResponse
 from app.utils.timezone import now_time_jst
 
 
@@ -37,65 +41,39 @@ class BreakService:
         """
         休憩開始処理
         """
+        current_time = start_time or now_time_jst()
+        
         try:
-            # 勤怠記録の存在確認
-            attendance = await self.db.get(Attendance, attendance_id)
-            if not attendance:
-                logger.warning(f"Attendance record {attendance_id} not found")
-                raise BreakServiceError(
-                    f"勤怠記録が見つかりません（ID: {attendance_id}）",
-                    "ATTENDANCE_NOT_FOUND"
-                )
-            
-            if not attendance.clock_in:
-                logger.warning(f"Cannot start break for attendance {attendance_id}: not clocked in")
-                raise BreakServiceError(
-                    "出勤してから休憩を開始してください",
-                    "NOT_CLOCKED_IN"
-                )
-            
-            current_time = start_time or now_time_jst()
-            
-            # 未終了の休憩がないか確認
-            result = await self.db.execute(
-                select(BreakTime).where(
-                    BreakTime.attendance_id == attendance_id,
-                    BreakTime.end_time.is_(None)
-                )
+            # 出勤中（退勤前）の勤怠にのみ挿入する
+            # 未終了の休憩の重複は部分ユニークインデックスで検出する
+            # イベントに使うユーザーIDもRETURNINGで受け取り、1回の往復で済ませる
+            # （RETURNINGの列はテーブル名なしで出力されるため、副問い合わせはSQLで書く）
+            user_id_column = literal_column(
+                "(SELECT attendance.user_id FROM attendance WHERE attendance.id = break_times.attendance_id)",
+                Integer
             )
-            unfinished_break = result.scalar_one_or_none()
-            
-            if unfinished_break:
-                logger.warning(f"Attempted to start break for attendance {attendance_id} with unfinished break {unfinished_break.id}")
-                raise BreakServiceError(
-                    "進行中の休憩があります。先に休憩を終了してください",
-                    "BREAK_NOT_ENDED"
-                )
-            
-            # 退勤後の休憩開始を防ぐ
-            if attendance.clock_out:
-                logger.warning(f"Cannot start break for attendance {attendance_id}: already clocked out")
-                raise BreakServiceError(
-                    "退勤後は休憩を開始できません",
-                    "ALREADY_CLOCKED_OUT"
+            result = await self.db.execute(
+                insert(BreakTime)
+                .from_select(
+                    ["attendance_id", "attendance_date", "start_time"],
+                    select(Attendance.id, Attendance.date, literal(current_time, Time))
+                    .where(
+                        Attendance.id == attendance_id,
+                        Attendance.clock_in.isnot(None),
+                        Attendance.clock_out.is_(None)
+                    ),
+                    include_defaults=True
                 )
-            
-            # 休憩開始
-            break_time = BreakTime(
-                attendance_id=attendance_id,
-                start_time=current_time
+                .returning(BreakTime, user_id_column)
             )
-            self.db.add(break_time)
-            
-            await self.db.commit()
-            await self.db.refresh(break_time)
-            
-            logger.info(f"Break started for attendance {attendance_id} at {current_time}")
-            return break_time
-            
-        except BreakServiceError:
+            row = result.one_or_none()
+        except IntegrityError:
             await self.db.rollback()
-            raise
+            logger.warning(f"Attempted to start break for attendance {attendance_id} with unfinished break")
+            raise BreakServiceError(
+                "進行中の休憩があります。先に休憩を終了してください",
+                "BREAK_NOT_ENDED"
+            )
         except Exception as e:
             await self.db.rollback()
             logger.error(f"Unexpected error starting break for attendance {attendance_id}: {e}")
@@ -103,6 +81,45 @@ class BreakService:
                 "休憩開始処理中にエラーが発生しました",
                 "INTERNAL_ERROR"
             )
+        
+        if row is None:
+            await self.db.rollback()
+            await self._raise_start_break_error(attendance_id)
+        break_time, user_id = row
+        
+        # RETURNINGで取得済みの値をコミット後も保持する
+        self.db.expunge(break_time)
+        await self.db.commit()
+        
+        logger.info(f"Break started for attendance {attendance_id} at {current_time}")
+        await self.publish_break_event("break.started", break_time, user_id)
+        return break_time
+    
+    async def _raise_start_break_error(self, attendance_id: int) -> None:
+        """
+        休憩を開始できなかった理由を特定してエラーを送出
+        """
+        attendance = await self.db.get(Attendance, attendance_id)
+        if not attendance:
+            logger.warning(f"Attendance record {attendance_id} not found")
+            raise BreakServiceError(
+                f"勤怠記録が見つかりません（ID: {attendance_id}）",
+                "ATTENDANCE_NOT_FOUND"
+            )
+        
+        if not attendance.clock_in:
+            logger.warning(f"Cannot start break for attendance {attendance_id}: not clocked in")
+            raise BreakServiceError(
+                "出勤してから休憩を開始してください",
+                "NOT_CLOCKED_IN"
+            )
+        
+        # 退勤後の休憩開始を防ぐ
+        logger.warning(f"Cannot start break for attendance {attendance_id}: already clocked out")
+        raise BreakServiceError(
+            "退勤後は休憩を開始できません",
+            "ALREADY_CLOCKED_OUT"
+        )
     
     async def end_break(
         self,
@@ -148,19 +165,24 @@ class BreakService:
             if break_time.duration and break_time.duration > 1440:  # 24時間 = 1440分
                 logger.warning(f"Unusually long break duration for break {break_id}: {break_time.duration} minutes")
             
-            await self.db.commit()
-            await self.db.refresh(break_time)
-            
-            # 勤怠の合計時間も更新
+            # 勤怠の合計時間も同じトランザクションで更新
+            await self.db.flush()
             from app.services.attendance_service import AttendanceService
             attendance_service = AttendanceService(self.db)
             attendance = await self.db.get(Attendance, break_time.attendance_id)
             if attendance:
                 await attendance_service.calculate_totals(attendance)
-                await self.db.commit()
+            
+            await self.db.commit()
+            await self.db.refresh(break_time)
+            if attendance:
+                await self.db.refresh(attendance)
                 logger.info(f"Attendance totals recalculated for attendance {break_time.attendance_id}")
             
             logger.info(f"Break {break_id} ended at {current_time} (duration: {break_time.duration} minutes)")
+            if attendance:
+                await self.publish_break_event("break.ended", break_time, attendance.user_id)
+                await attendance_service.publish_attendance_event("attendance.updated", attendance)
             return break_time
             
         except BreakServiceError:
@@ -174,6 +196,17 @@ class BreakService:
                 "INTERNAL_ERROR"
             )
     
+    async def publish_break_event(self, event_type: str, break_time: BreakTime, user_id: int) -> None:
+        """
+        休憩変更イベントを発行（コミット後に呼び出すこと）
+        """
+        await cache.invalidate(reports_namespace(user_id))
+        await event_broker.publish(
+            event_type,
+            user_id,
+            BreakTimeResponse.model_validate(break_time).model_dump(mode="json")
+        )
+    
     async def calculate_duration(self, break_time: BreakTime) -> None:
         """
         休憩時間を計算（分単位）
@@ -0,0 +1,207 @@
+"""
+組み込みのバックグラウンドジョブ
+"""
+
+import asyncio
+import logging
+from calendar import monthrange
+from datetime import date
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache, reports_namespace
+from app.core.events import event_broker
+from app.models.attendance import Attendance
+from app.models.user import User
+from app.services.job_service import job_handler
+from app.services.pay_period import default_pay_periods
+from app.utils.fixed_point import minutes_to_hours
+
+logger = logging.getLogger(__name__)
+
+
+def _month_range(payload: Dict[str, Any]):
+    year, month = int(payload["year"]), int(payload["month"])
+    _, last_day = monthrange(year, month)
+    return date(year, month, 1), date(year, month, last_day)
+
+
+async def _notify_changed(user_ids: Iterable[int], event_type: str, data: Dict[str, Any]) -> None:
+    """
+    まとめて変更したユーザーのレポートのキャッシュを無効化し、イベントを発行（コミット後に呼び出すこと）
+    イベントで同一リクエストの合流のデータのバージョンも進む
+    """
+    for user_id in sorted(set(user_ids)):
+        await cache.invalidate(reports_namespace(user_id))
+        await event_broker.publish(event_type, user_id, data)
+
+
+@job_handler("overtime.rebuild")
+async def rebuild_overtime(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    36協定の累計を作り直す
+    """
+    from app.services.overtime_service import OvertimeService
+
+    count = await OvertimeService(db).rebuild()
+    await db.commit()
+    result = await db.execute(select(Attendance.user_id).distinct())
+    await _notify_changed(result.scalars().all(), "overtime.rebuilt", {})
+    return {"accumulators": count}
+
+
+@job_handler("attendance.recalculate")
+async def recalculate_attendance(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    指定月の勤怠の合計を再計算（payload: year, month, user_id（省略可））
+    """
+    from app.services.attendance_service import AttendanceService
+
+    start_date, end_date = _month_range(payload)
+    conditions = [Attendance.date >= start_date, Attendance.date <= end_date]
+    if payload.get("user_id") is not None:
+        conditions.append(Attendance.user_id == int(payload["user_id"]))
+
+    result = await db.execute(select(Attendance.user_id, Attendance.date).where(and_(*conditions)))
+    keys = set(result.all())
+    await AttendanceService(db).recalculate_weeks(keys)
+    await db.commit()
+    await _notify_changed(
+        (user_id for user_id, _ in keys),
+        "attendance.recalculated",
+        {"year": int(payload["year"]), "month": int(payload["month"])}
+    )
+    return {"attendances": len(keys)}
+
+
+@job_handler("attendance.auto_close")
+async def auto_close(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    打刻忘れの自動締め（payload: policy, dry_run（省略可））
+    """
+    from app.services.auto_close_service import AutoCloseService
+
+    report = await AutoCloseService(db).run(
+        policy=payload.get("policy"),
+        dry_run=bool(payload.get("dry_run", False))
+    )
+    return report.to_dict()
+
+
+@job_handler("archive.year")
+async def archive_year(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    締め済みの年をアーカイブ（payload: year, delete_rows（省略時はtrue））
+    """
+    from app.core.database import sync_engine
+    from app.services.archive_service import archive_service
+
+    year = int(payload["year"])
+    result = await db.execute(
+        select(Attendance.user_id)
+        .where(and_(Attendance.date >= date(year, 1, 1), Attendance.date <= date(year, 12, 31)))
+        .distinct()
+    )
+    user_ids = result.scalars().all()
+    await db.rollback()
+
+    def run() -> Dict[str, Any]:
+        with sync_engine.begin() as conn:
+            return archive_service.archive_year(
+                conn, int(payload["year"]), delete_rows=bool(payload.get("delete_rows", True))
+            )
+
+    entry = await asyncio.to_thread(run)
+    # アーカイブ済みの年はファイルから読むため、DBから作ったレポートのキャッシュを捨てる
+    await _notify_changed(user_ids, "attendance.archived", {"year": year})
+    return {
+        "year": int(payload["year"]),
+        "attendance_rows": entry["attendance_rows"],
+        "break_rows": entry["break_rows"],
+        "files": len(entry["files"])
+    }
+
+
+@job_handler("payroll.payslips")
+async def generate_payslips(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    給与明細書を一括作成（payload: year, month, output・user_ids・workers（省略可））
+    outputはPAYSLIP_OUTPUT_DIRからの相対パス
+    """
+    from app.services.payslip_service import PayslipService, confined_output
+
+    output = payload.get("output")
+    report = await PayslipService(db).generate(
+        int(payload["year"]),
+        int(payload["month"]),
+        output=str(confined_output(output)) if output else None,
+        user_ids=payload.get("user_ids"),
+        workers=payload.get("workers")
+    )
+    return report.to_dict()
+
+
+@job_handler("sync.purge_tombstones")
+async def purge_sync_tombstones(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    保持期間を過ぎた差分同期の削除記録を削除
+    """
+    from app.services.sync_service import SyncService
+
+    count = await SyncService(db).purge_tombstones()
+    await db.commit()
+    return {"purged": count}
+
+
+@job_handler("payroll.monthly")
+async def monthly_payroll(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    給与期間の給与集計（全ユーザー分を1回の集計クエリで作成、payload: year, month）
+    monthは締め日（PAY_CLOSING_DAY）による月度で、月末締めなら暦月と同じ
+    """
+    pay_period = default_pay_periods().resolve(int(payload["year"]), int(payload["month"]))
+    start_date, end_date = pay_period.start_date, pay_period.end_date
+    result = await db.execute(
+        select(
+            User.id,
+            User.name,
+            func.count(Attendance.id),
+            func.coalesce(func.sum(Attendance.work_minutes), 0),
+            func.coalesce(func.sum(Attendance.amount_sen), 0),
+            func.coalesce(func.sum(Attendance.overtime_minutes), 0),
+            func.coalesce(func.sum(Attendance.night_minutes), 0),
+            func.coalesce(func.sum(Attendance.holiday_minutes), 0)
+        )
+        .join(Attendance, Attendance.user_id == User.id)
+        .where(and_(Attendance.date >= start_date, Attendance.date <= end_date))
+        .group_by(User.id, User.name)
+        .order_by(User.id)
+    )
+
+    entries = []
+    grand_total_sen = 0
+    for user_id, name, days, work_minutes, amount_sen, overtime, night, holiday in result.all():
+        entries.append({
+            "user_id": user_id,
+            "name": name,
+            "total_days": days,
+            "total_hours": float(minutes_to_hours(work_minutes)),
+            "total_amount": amount_sen / 100,
+            "overtime_minutes": int(overtime),
+            "night_minutes": int(night),
+            "holiday_minutes": int(holiday)
+        })
+        grand_total_sen += amount_sen
+
+    logger.info(f"Generated payroll for {len(entries)} users ({start_date} - {end_date})")
+    return {
+        "year": pay_period.year,
+        "month": pay_period.period,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "users": len(entries),
+        "total_amount": grand_total_sen / 100,
+        "entries": entries
+    }
@@ -0,0 +1,410 @@
+"""
+DBをキューとして使うバックグラウンドジョブ
+
+ジョブはjobsテーブルに登録し、ワーカーが取り出して実行する。
+PostgreSQLでは SELECT ... FOR UPDATE SKIP LOCKED で複数ワーカーが同じジョブを取らないようにし、
+SQLiteでは状態を条件にしたUPDATEの成否で取得を判定する。
+実行中はlocked_atを定期的に更新し、更新が途絶えたジョブだけを回収する。
+結果の記録は取得したワーカー（locked_by）が持っている間だけ行う。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+# ハンドラーは自分のセッションで処理し、必要ならコミットする
+JobHandler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(name: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    ジョブの種類にハンドラーを登録するデコレータ
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+def registered_job_types() -> List[str]:
+    return sorted(_handlers)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobService:
+    """
+    ジョブの登録・取得・状態更新サービス
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        max_attempts: Optional[int] = None,
+        run_after: Optional[datetime] = None
+    ) -> Job:
+        """
+        ジョブを登録（コミット後にワーカーを起こす）
+        """
+        if job_type not in _handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = Job(
+            type=job_type,
+            payload=payload or {},
+            priority=priority,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            run_after=run_after or _utcnow()
+        )
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+
+        logger.info(f"Enqueued job {job.id} ({job_type})")
+        job_worker.notify()
+        return job
+
+    async def get(self, job_id: int) -> Optional[Job]:
+        return await self.db.get(Job, job_id)
+
+    async def list_jobs(
+        self,
+        status: Optional[str] = None,
+        job_type: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Job]:
+        conditions = []
+        if status:
+            conditions.append(Job.status == status)
+        if job_type:
+            conditions.append(Job.type == job_type)
+
+        result = await self.db.execute(
+            select(Job).where(and_(*conditions)).order_by(Job.id.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def cancel(self, job: Job) -> Job:
+        """
+        実行待ちのジョブを取り消す
+        """
+        if job.status != "queued":
+            raise ValueError(f"Job {job.id} is {job.status} and cannot be cancelled")
+        job.status = "cancelled"
+        job.finished_at = _utcnow()
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def retry(self, job: Job) -> Job:
+        """
+        失敗・取り消したジョブを再実行待ちに戻す
+        """
+        if job.status not in ("failed", "cancelled"):
+            raise ValueError(f"Job {job.id} is {job.status} and cannot be retried")
+        job.status = "queued"
+        job.attempts = 0
+        job.error = None
+        job.finished_at = None
+        job.run_after = _utcnow()
+        await self.db.commit()
+        await self.db.refresh(job)
+        job_worker.notify()
+        return job
+
+    async def claim(self, worker_id: str, limit: int) -> List[int]:
+        """
+        実行可能なジョブを最大limit件取得して実行中にする
+        """
+        now = _utcnow()
+        ready = (
+            select(Job.id)
+            .where(and_(Job.status == "queued", Job.run_after <= now))
+            .order_by(Job.priority.desc(), Job.run_after, Job.id)
+            .limit(limit)
+        )
+        claim_values = {
+            "status": "running",
+            "locked_by": worker_id,
+            "locked_at": now,
+            "attempts": Job.attempts + 1
+        }
+
+        if self.db.bind.dialect.name == "postgresql":
+            # 他のワーカーがロック中の行は飛ばす
+            result = await self.db.execute(ready.with_for_update(skip_locked=True))
+            claimed = list(result.scalars().all())
+            if claimed:
+                await self.db.execute(
+                    update(Job).where(Job.id.in_(claimed)).values(**claim_values)
+                    .execution_options(synchronize_session=False)
+                )
+        else:
+            # SQLiteは書き込みが直列化されるため、状態を条件にしたUPDATEの成否で判定する
+            result = await self.db.execute(ready)
+            claimed = []
+            for job_id in result.scalars().all():
+                updated = await self.db.execute(
+                    update(Job).where(and_(Job.id == job_id, Job.status == "queued")).values(**claim_values)
+                    .execution_options(synchronize_session=False)
+                )
+                if updated.rowcount:
+                    claimed.append(job_id)
+
+        await self.db.commit()
+        return claimed
+
+    @staticmethod
+    def _owned(job_id: int, worker_id: str) -> Any:
+        return and_(Job.id == job_id, Job.status == "running", Job.locked_by == worker_id)
+
+    async def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """
+        実行中のジョブのlocked_atを更新（他のワーカーに回収されていればFalse）
+        """
+        updated = await self.db.execute(
+            update(Job).where(self._owned(job_id, worker_id)).values(locked_at=_utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return updated.rowcount > 0
+
+    async def complete(self, job_id: int, worker_id: str, result: Optional[Dict[str, Any]]) -> bool:
+        """
+        成功を記録（回収されて自分のジョブでなくなっていれば記録せずFalse）
+        """
+        updated = await self.db.execute(
+            update(Job).where(self._owned(job_id, worker_id)).values(
+                status="succeeded",
+                result=result,
+                error=None,
+                locked_by=None,
+                finished_at=_utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        if not updated.rowcount:
+            logger.warning(f"Job {job_id} is no longer owned by {worker_id}; result discarded")
+        return updated.rowcount > 0
+
+    async def fail(self, job: Job, worker_id: str, error: str) -> bool:
+        """
+        失敗を記録（試行回数が残っていれば指数バックオフで再実行待ちに戻す）
+        回収されて自分のジョブでなくなっていれば記録せずFalse
+        """
+        values: Dict[str, Any] = {"error": error, "locked_by": None}
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            values.update(status="queued", run_after=_utcnow() + timedelta(seconds=delay))
+            logger.warning(f"Job {job.id} ({job.type}) failed on attempt {job.attempts}; retrying in {delay}s")
+        else:
+            values.update(status="failed", finished_at=_utcnow())
+            logger.error(f"Job {job.id} ({job.type}) failed after {job.attempts} attempts")
+
+        updated = await self.db.execute(
+            update(Job).where(self._owned(job.id, worker_id)).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        if not updated.rowcount:
+            logger.warning(f"Job {job.id} is no longer owned by {worker_id}; failure discarded")
+        return updated.rowcount > 0
+
+    async def requeue_stale(self, timeout_seconds: int) -> int:
+        """
+        ワーカーの停止などで実行中のまま残ったジョブを戻す
+        """
+        stale = and_(
+            Job.status == "running",
+            Job.locked_at < _utcnow() - timedelta(seconds=timeout_seconds)
+        )
+        requeued = await self.db.execute(
+            update(Job).where(and_(stale, Job.attempts < Job.max_attempts))
+            .values(status="queued", locked_by=None, run_after=_utcnow(), error="Worker lock timed out")
+            .execution_options(synchronize_session=False)
+        )
+        failed = await self.db.execute(
+            update(Job).where(and_(stale, Job.attempts >= Job.max_attempts))
+            .values(status="failed", locked_by=None, finished_at=_utcnow(), error="Worker lock timed out")
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+        count = requeued.rowcount + failed.rowcount
+        if count:
+            logger.warning(f"Recovered {count} stale jobs")
+        return count
+
+
+class JobWorker:
+    """
+    ジョブを取り出して並行実行するワーカー（同時実行数に上限あり）
+    """
+
+    # 実行中のまま残ったジョブを確認する間隔（秒）
+    STALE_CHECK_INTERVAL = 60
+
+    def __init__(self, concurrency: int, poll_interval_ms: int):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval_ms / 1000
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def notify(self) -> None:
+        """
+        同じプロセスで登録されたジョブをすぐに取りに行く
+        """
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        取得を止め、実行中のジョブの完了を待つ（時間切れのジョブは次回起動時に回収される）
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    async def _run(self) -> None:
+        from app.core.database import AsyncSessionLocal
+
+        last_stale_check = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            claimed: List[int] = []
+            free = self.concurrency - len(self._running)
+            try:
+                async with AsyncSessionLocal() as db:
+                    service = JobService(db)
+                    if loop.time() - last_stale_check > self.STALE_CHECK_INTERVAL:
+                        last_stale_check = loop.time()
+                        await service.requeue_stale(settings.JOB_LOCK_TIMEOUT_SECONDS)
+                    if free > 0:
+                        claimed = await service.claim(self.worker_id, free)
+            except Exception as e:
+                logger.error(f"Failed to claim jobs: {e}")
+
+            for job_id in claimed:
+                task = asyncio.create_task(self._execute(job_id))
+                self._running.add(task)
+                task.add_done_callback(self._on_done)
+
+            # 空きがあり取り切れていない可能性がある場合はすぐに次を取りに行く
+            if claimed and len(claimed) == free:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        # 空いた枠で次のジョブを取りに行く
+        self._wakeup.set()
+
+    async def _execute(self, job_id: int) -> None:
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Job, job_id)
+            service = JobService(db)
+            handler = _handlers.get(job.type)
+            if handler is None:
+                job.attempts = job.max_attempts
+                await service.fail(job, self.worker_id, f"No handler registered for job type {job.type}")
+                return
+
+            # コミットで属性が失効するため先に取り出しておく
+            job_type = job.type
+            started = asyncio.get_running_loop().time()
+            work = asyncio.create_task(self._run_handler(handler, dict(job.payload or {})))
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, work))
+            try:
+                result = await work
+            except asyncio.CancelledError:
+                # 回収されたため中断した場合は結果を記録しない（停止時の取り消しはそのまま伝える）
+                if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result():
+                    return
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} ({job_type}) raised: {e}")
+                await service.fail(job, self.worker_id, "".join(traceback.format_exception_only(type(e), e)).strip())
+                return
+            finally:
+                heartbeat.cancel()
+
+            if await service.complete(job_id, self.worker_id, result):
+                elapsed = asyncio.get_running_loop().time() - started
+                logger.info(f"Job {job_id} ({job_type}) succeeded in {elapsed:.2f}s")
+
+    async def _run_handler(self, handler: JobHandler, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as work_db:
+            return await handler(work_db, payload)
+
+    async def _heartbeat(self, job_id: int, work: asyncio.Task) -> bool:
+        """
+        実行中はlocked_atを更新し続ける（回収されていたら実行を中断してTrue）
+        """
+        from app.core.database import AsyncSessionLocal
+
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    owned = await JobService(db).heartbeat(job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"Failed to refresh lock for job {job_id}: {e}")
+                continue
+            if not owned:
+                logger.warning(f"Job {job_id} was recovered by another worker; cancelling")
+                work.cancel()
+                return True
+
+
+# シングルトンインスタンス
+job_worker = JobWorker(settings.JOB_WORKER_CONCURRENCY, settings.JOB_POLL_INTERVAL_MS)
@@ -0,0 +1,308 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_, delete, func, case, extract, literal
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import logging
+import math
+
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.overtime_accumulator import OvertimeAccumulator
+from app.models.user import User
+from app.schemas.compliance import OvertimeAlert, OvertimeComplianceEntry
+
+logger = logging.getLogger(__name__)
+
+# 年間累計の行（monthの値）
+YEARLY = 0
+
+# (ユーザーID, 年, 月) -> (時間外の差分, 休日の差分)
+AccumulatorDeltas = Dict[Tuple[int, int, int], Tuple[int, int]]
+
+
+def agreement_year(value: date) -> int:
+    """
+    日付が属する協定年度（起算年）
+    """
+    if value.month >= settings.OVERTIME_AGREEMENT_START_MONTH:
+        return value.year
+    return value.year - 1
+
+
+def _agreement_months(year: int) -> List[Tuple[int, int]]:
+    """
+    協定年度に含まれる(年, 月)の一覧
+    """
+    start = settings.OVERTIME_AGREEMENT_START_MONTH
+    return [
+        (year + (start - 1 + i) // 12, (start - 1 + i) % 12 + 1)
+        for i in range(12)
+    ]
+
+
+def _previous_months(year: int, month: int, count: int) -> List[Tuple[int, int]]:
+    """
+    指定月を含む直近count ヶ月の(年, 月)（新しい順）
+    """
+    months = []
+    for i in range(count):
+        index = year * 12 + (month - 1) - i
+        months.append((index // 12, index % 12 + 1))
+    return months
+
+
+class OvertimeService:
+    """
+    36協定の時間外労働累計サービス
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def add_delta(deltas: AccumulatorDeltas, user_id: int, work_date: date, overtime: int, holiday: int) -> None:
+        """
+        勤怠1件分の差分を月次・年間の累計キーに加算
+        """
+        if not overtime and not holiday:
+            return
+        for key in (
+            (user_id, work_date.year, work_date.month),
+            (user_id, agreement_year(work_date), YEARLY),
+        ):
+            current = deltas.get(key, (0, 0))
+            deltas[key] = (current[0] + overtime, current[1] + holiday)
+
+    async def apply_deltas(self, deltas: AccumulatorDeltas) -> None:
+        """
+        累計に差分を加算（UPSERTで1文にまとめ、同時更新でも取りこぼさない）
+        """
+        rows = [
+            {
+                "user_id": user_id,
+                "year": year,
+                "month": month,
+                "overtime_minutes": overtime,
+                "holiday_minutes": holiday
+            }
+            for (user_id, year, month), (overtime, holiday) in deltas.items()
+            if overtime or holiday
+        ]
+        if not rows:
+            return
+
+        if self.db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(OvertimeAccumulator).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                OvertimeAccumulator.user_id,
+                OvertimeAccumulator.year,
+                OvertimeAccumulator.month
+            ],
+            set_={
+                "overtime_minutes": OvertimeAccumulator.overtime_minutes + statement.excluded.overtime_minutes,
+                "holiday_minutes": OvertimeAccumulator.holiday_minutes + statement.excluded.holiday_minutes,
+                "updated_at": func.now()
+            }
+        )
+        await self.db.execute(statement)
+        logger.debug(f"Applied {len(rows)} overtime accumulator deltas")
+
+    async def rebuild(self) -> int:
+        """
+        勤怠の区分別分数から累計を作り直す（不整合の修復用）
+        """
+        await self.db.execute(delete(OvertimeAccumulator))
+
+        year_column = extract('year', Attendance.date)
+        month_column = extract('month', Attendance.date)
+        agreement_year_column = case(
+            (month_column >= settings.OVERTIME_AGREEMENT_START_MONTH, year_column),
+            else_=year_column - 1
+        )
+
+        deltas: AccumulatorDeltas = {}
+        for period_year, period_month in (
+            (year_column, month_column),
+            (agreement_year_column, literal(YEARLY)),
+        ):
+            result = await self.db.execute(
+                select(
+                    Attendance.user_id,
+                    period_year,
+                    period_month,
+                    func.coalesce(func.sum(Attendance.overtime_minutes), 0),
+                    func.coalesce(func.sum(Attendance.holiday_minutes), 0)
+                )
+                .group_by(Attendance.user_id, period_year, period_month)
+            )
+            for user_id, year, month, overtime, holiday in result.all():
+                if overtime or holiday:
+                    deltas[(user_id, int(year), int(month))] = (int(overtime), int(holiday))
+
+        await self.apply_deltas(deltas)
+        logger.info(f"Rebuilt {len(deltas)} overtime accumulators")
+        return len(deltas)
+
+    async def get_compliance(
+        self,
+        year: int,
+        month: int,
+        warning_ratio: Optional[float] = None
+    ) -> List[OvertimeComplianceEntry]:
+        """
+        指定月時点で上限に近い・超えているユーザーを累計から抽出
+        """
+        ratio = settings.OVERTIME_WARNING_RATIO if warning_ratio is None else warning_ratio
+        base_year = agreement_year(date(year, month, 1))
+        agreement_months = _agreement_months(base_year)
+        window = _previous_months(year, month, 6)
+
+        monthly_limit = settings.OVERTIME_MONTHLY_LIMIT_HOURS * 60
+        yearly_limit = settings.OVERTIME_YEARLY_LIMIT_HOURS * 60
+        special_monthly_limit = settings.OVERTIME_SPECIAL_MONTHLY_LIMIT_HOURS * 60
+        average_limit = settings.OVERTIME_SPECIAL_AVERAGE_LIMIT_HOURS * 60
+
+        def period_in(months):
+            return or_(*[
+                and_(OvertimeAccumulator.year == y, OvertimeAccumulator.month == m)
+                for y, m in months
+            ])
+
+        combined = OvertimeAccumulator.overtime_minutes + OvertimeAccumulator.holiday_minutes
+
+        # 候補ユーザーの抽出（平均がしきい値を超えるなら、いずれかの月もしきい値を超えている）
+        candidates = select(OvertimeAccumulator.user_id).where(or_(
+            and_(
+                OvertimeAccumulator.year == year,
+                OvertimeAccumulator.month == month,
+                or_(
+                    OvertimeAccumulator.overtime_minutes >= monthly_limit * ratio,
+                    combined >= special_monthly_limit * ratio
+                )
+            ),
+            and_(period_in(window), combined >= average_limit * ratio),
+            and_(
+                OvertimeAccumulator.year == base_year,
+                OvertimeAccumulator.month == YEARLY,
+                OvertimeAccumulator.overtime_minutes >= yearly_limit * ratio
+            )
+        ))
+        months_over_candidates = (
+            select(OvertimeAccumulator.user_id)
+            .where(and_(period_in(agreement_months), OvertimeAccumulator.overtime_minutes > monthly_limit))
+            .group_by(OvertimeAccumulator.user_id)
+            .having(func.count() >= math.ceil(settings.OVERTIME_SPECIAL_MAX_MONTHS * ratio))
+        )
+        result = await self.db.execute(candidates.union(months_over_candidates))
+        user_ids = set(result.scalars().all())
+        if not user_ids:
+            return []
+
+        # 候補ユーザーの累計をまとめて取得
+        result = await self.db.execute(
+            select(
+                OvertimeAccumulator.user_id,
+                OvertimeAccumulator.year,
+                OvertimeAccumulator.month,
+                OvertimeAccumulator.overtime_minutes,
+                OvertimeAccumulator.holiday_minutes
+            )
+            .where(and_(
+                OvertimeAccumulator.user_id.in_(user_ids),
+                or_(
+                    period_in(set(window) | set(agreement_months)),
+                    and_(OvertimeAccumulator.year == base_year, OvertimeAccumulator.month == YEARLY)
+                )
+            ))
+        )
+        accumulators: Dict[int, Dict[Tuple[int, int], Tuple[int, int]]] = {}
+        for user_id, acc_year, acc_month, overtime, holiday in result.all():
+            accumulators.setdefault(user_id, {})[(acc_year, acc_month)] = (overtime, holiday)
+
+        result = await self.db.execute(select(User.id, User.name).where(User.id.in_(user_ids)))
+        names = dict(result.all())
+
+        entries = []
+        for user_id in sorted(user_ids):
+            if user_id not in names:
+                continue
+            periods = accumulators.get(user_id, {})
+            entry = self._evaluate(
+                user_id, names.get(user_id, ""), year, month, base_year,
+                periods, window, agreement_months, ratio
+            )
+            if entry.alerts:
+                entries.append(entry)
+        return entries
+
+    def _evaluate(
+        self,
+        user_id: int,
+        user_name: str,
+        year: int,
+        month: int,
+        base_year: int,
+        periods: Dict[Tuple[int, int], Tuple[int, int]],
+        window: List[Tuple[int, int]],
+        agreement_months: List[Tuple[int, int]],
+        ratio: float
+    ) -> OvertimeComplianceEntry:
+        monthly_overtime, monthly_holiday = periods.get((year, month), (0, 0))
+        yearly_overtime, _ = periods.get((base_year, YEARLY), (0, 0))
+        months_over = sum(
+            1 for key in agreement_months
+            if periods.get(key, (0, 0))[0] > settings.OVERTIME_MONTHLY_LIMIT_HOURS * 60
+        )
+
+        # 2〜6ヶ月平均（時間外+休日）の最大値
+        combined = [sum(periods.get(key, (0, 0))) for key in window]
+        max_average = max(
+            (sum(combined[:n]) / n for n in range(2, 7)),
+            default=0
+        )
+
+        checks = [
+            ("monthly_overtime", monthly_overtime, settings.OVERTIME_MONTHLY_LIMIT_HOURS * 60, False),
+            ("yearly_overtime", yearly_overtime, settings.OVERTIME_YEARLY_LIMIT_HOURS * 60, False),
+            ("special_monthly_total", monthly_overtime + monthly_holiday,
+             settings.OVERTIME_SPECIAL_MONTHLY_LIMIT_HOURS * 60, True),
+            ("special_average_total", max_average, settings.OVERTIME_SPECIAL_AVERAGE_LIMIT_HOURS * 60, False),
+            ("special_yearly_overtime", yearly_overtime, settings.OVERTIME_SPECIAL_YEARLY_LIMIT_HOURS * 60, False),
+        ]
+        alerts = []
+        for rule, value, limit, limit_exclusive in checks:
+            exceeded = value >= limit if limit_exclusive else value > limit
+            if exceeded or value >= limit * ratio:
+                alerts.append(OvertimeAlert(
+                    rule=rule,
+                    level="exceeded" if exceeded else "warning",
+                    value=round(value / 60, 2),
+                    limit=limit / 60
+                ))
+
+        max_months = settings.OVERTIME_SPECIAL_MAX_MONTHS
+        if months_over > max_months or months_over >= math.ceil(max_months * ratio):
+            alerts.append(OvertimeAlert(
+                rule="special_months_over",
+                level="exceeded" if months_over > max_months else "warning",
+                value=months_over,
+                limit=max_months
+            ))
+
+        return OvertimeComplianceEntry(
+            user_id=user_id,
+            user_name=user_name,
+            year=year,
+            month=month,
+            monthly_overtime_hours=round(monthly_overtime / 60, 2),
+            monthly_holiday_hours=round(monthly_holiday / 60, 2),
+            yearly_overtime_hours=round(yearly_overtime / 60, 2),
+            months_over_monthly_limit=months_over,
+            max_average_hours=round(max_average / 60, 2),
+            alerts=alerts
+        )
@@ -0,0 +1,95 @@
+"""
+給与の締め日による集計期間（給与期間）
+
+給与期間は締め日のある月で呼ぶ（20日締めの10月度は 9/21〜10/20）。
+締め日が0または月末以降の日付なら月末締め（暦月と同じ）。
+期間は年ごとにまとめて計算して保持し、(年, 月度) や日付から引けるようにする。
+"""
+
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class PayPeriod:
+    """
+    給与期間（開始日・終了日を含む）
+    """
+    year: int
+    period: int  # 月度（締め日のある月）
+    start_date: date
+    end_date: date
+
+    @property
+    def days(self) -> int:
+        return (self.end_date - self.start_date).days + 1
+
+
+class PayPeriodCalendar:
+    """
+    締め日ごとの給与期間の一覧（年ごとに計算して保持）
+    """
+
+    def __init__(self, closing_day: int):
+        if not 0 <= closing_day <= 31:
+            raise ValueError(f"Closing day must be between 0 and 31: {closing_day}")
+        self.closing_day = closing_day
+        self._periods: Dict[int, Tuple[PayPeriod, ...]] = {}
+
+    def _closing_date(self, year: int, month: int) -> date:
+        _, last_day = monthrange(year, month)
+        day = last_day if self.closing_day == 0 else min(self.closing_day, last_day)
+        return date(year, month, day)
+
+    def periods(self, year: int) -> Tuple[PayPeriod, ...]:
+        """
+        年の1〜12月度の給与期間
+        """
+        periods = self._periods.get(year)
+        if periods is None:
+            previous_close = self._closing_date(year - 1, 12)
+            built = []
+            for month in range(1, 13):
+                closing_date = self._closing_date(year, month)
+                built.append(PayPeriod(year, month, previous_close + timedelta(days=1), closing_date))
+                previous_close = closing_date
+            periods = self._periods[year] = tuple(built)
+        return periods
+
+    def resolve(self, year: int, period: int) -> PayPeriod:
+        """
+        (年, 月度) の給与期間
+        """
+        if not 1 <= period <= 12:
+            raise ValueError(f"Pay period must be between 1 and 12: {period}")
+        return self.periods(year)[period - 1]
+
+    def period_for(self, value: date) -> PayPeriod:
+        """
+        指定日を含む給与期間
+        """
+        if value <= self._closing_date(value.year, value.month):
+            return self.resolve(value.year, value.month)
+        if value.month == 12:
+            return self.resolve(value.year + 1, 1)
+        return self.resolve(value.year, value.month + 1)
+
+
+@lru_cache(maxsize=None)
+def pay_period_calendar(closing_day: int) -> PayPeriodCalendar:
+    """
+    締め日ごとの給与期間の一覧（同じ締め日は再利用する）
+    """
+    return PayPeriodCalendar(closing_day)
+
+
+def default_pay_periods() -> PayPeriodCalendar:
+    """
+    設定値（PAY_CLOSING_DAY）の締め日による給与期間
+    """
+    return pay_period_calendar(settings.PAY_CLOSING_DAY)
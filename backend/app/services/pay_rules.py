@@ -0,0 +1,262 @@
+"""
+労働基準法に基づく割増賃金の計算エンジン
+
+各勤務を「勤怠日の0時からの経過分」の区間で表し、区間演算で
+通常・時間外・深夜・休日の各区分の分数に分割する。
+ルールセットは一度だけコンパイルし、週単位の時間外判定はユーザーごとに1パスで行う。
+金額は分単位に丸めた各区分の分数から整数（銭）で計算する。
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.utils.fixed_point import (
+    BASIS_POINTS, divide_half_up, minutes_to_hours, sen_to_yen, to_basis_points, yen_to_sen
+)
+
+MINUTES_PER_DAY = 24 * 60
+
+# 区間（開始分, 終了分）
+Interval = Tuple[float, float]
+
+
+@dataclass(frozen=True)
+class PayRuleSet:
+    """
+    割増賃金のルールセット
+    """
+    daily_overtime_minutes: int = 8 * 60  # 1日の法定労働時間
+    weekly_overtime_minutes: int = 40 * 60  # 1週の法定労働時間
+    week_start_weekday: int = 6  # 週の起算曜日（date.weekday()、6=日曜）
+    night_start: time = time(22, 0)
+    night_end: time = time(5, 0)
+    legal_holiday_weekdays: Tuple[int, ...] = (6,)  # 法定休日の曜日
+    overtime_premium: Decimal = Decimal("0.25")
+    night_premium: Decimal = Decimal("0.25")
+    holiday_premium: Decimal = Decimal("0.35")
+
+
+@dataclass
+class ShiftInput:
+    """
+    計算対象の勤務
+    """
+    attendance_id: int
+    user_id: int
+    date: date
+    clock_in: time
+    clock_out: time
+    hourly_rate: Optional[Decimal]
+    breaks: List[Tuple[time, time]] = field(default_factory=list)
+
+
+@dataclass
+class PayBreakdown:
+    """
+    区分ごとの分数と金額
+    """
+    work_minutes: float = 0.0
+    regular_minutes: float = 0.0  # 法定内の通常労働
+    overtime_minutes: float = 0.0  # 1日8時間・週40時間を超える労働（法定休日を除く）
+    night_minutes: float = 0.0  # 22:00〜5:00の労働（他の区分と重複して加算）
+    holiday_minutes: float = 0.0  # 法定休日の労働
+    amount_sen: int = 0  # 支給額（銭）
+
+    @property
+    def total_hours(self) -> Decimal:
+        return minutes_to_hours(round(self.work_minutes))
+
+    @property
+    def total_amount(self) -> Decimal:
+        return sen_to_yen(self.amount_sen)
+
+
+def _to_minutes(value: time) -> float:
+    return value.hour * 60 + value.minute + value.second / 60 + value.microsecond / 60_000_000
+
+
+def _subtract(intervals: List[Interval], removals: Iterable[Interval]) -> List[Interval]:
+    """
+    区間の集合から別の区間を取り除く
+    """
+    for r_start, r_end in removals:
+        remaining = []
+        for start, end in intervals:
+            if r_end <= start or r_start >= end:
+                remaining.append((start, end))
+                continue
+            if start < r_start:
+                remaining.append((start, r_start))
+            if r_end < end:
+                remaining.append((r_end, end))
+        intervals = remaining
+    return intervals
+
+
+def _overlap(intervals: Sequence[Interval], windows: Sequence[Interval]) -> float:
+    """
+    区間の集合と窓の重なりの合計（分）
+    """
+    total = 0.0
+    for start, end in intervals:
+        for w_start, w_end in windows:
+            if w_end <= start:
+                continue
+            if w_start >= end:
+                break
+            total += min(end, w_end) - max(start, w_start)
+    return total
+
+
+class CompiledPayRules:
+    """
+    コンパイル済みのルールセット（深夜帯の区間や割増率を事前計算）
+    """
+
+    def __init__(self, rules: PayRuleSet):
+        self.rules = rules
+
+        # 勤怠日の0時から翌日24時までの深夜帯
+        night_start = _to_minutes(rules.night_start)
+        night_end = _to_minutes(rules.night_end)
+        windows: List[Interval] = []
+        for day in range(-1, 2):
+            offset = day * MINUTES_PER_DAY
+            if night_start > night_end:
+                windows.append((offset + night_start, offset + MINUTES_PER_DAY + night_end))
+            else:
+                windows.append((offset + night_start, offset + night_end))
+        self.night_windows = sorted(
+            (max(start, 0), min(end, 2 * MINUTES_PER_DAY))
+            for start, end in windows
+            if end > 0 and start < 2 * MINUTES_PER_DAY
+        )
+        self.holiday_weekdays = frozenset(rules.legal_holiday_weekdays)
+        # 割増率（1万分率）
+        self.overtime_bp = to_basis_points(rules.overtime_premium)
+        self.night_bp = to_basis_points(rules.night_premium)
+        self.holiday_bp = to_basis_points(rules.holiday_premium)
+
+    def week_start(self, value: date) -> date:
+        """
+        指定日を含む週の起算日
+        """
+        return value - timedelta(days=(value.weekday() - self.rules.week_start_weekday) % 7)
+
+    def _worked_intervals(self, shift: ShiftInput) -> List[Interval]:
+        start = _to_minutes(shift.clock_in)
+        end = _to_minutes(shift.clock_out)
+        # 日跨ぎ対応
+        if end < start:
+            end += MINUTES_PER_DAY
+
+        breaks = []
+        for break_start, break_end in shift.breaks:
+            b_start, b_end = _to_minutes(break_start), _to_minutes(break_end)
+            if b_start < start:
+                b_start += MINUTES_PER_DAY
+            if b_end < b_start:
+                b_end += MINUTES_PER_DAY
+            breaks.append((b_start, b_end))
+        return _subtract([(start, end)], sorted(breaks))
+
+    def _holiday_windows(self, shift_date: date) -> List[Interval]:
+        windows = []
+        for day in range(2):
+            if (shift_date + timedelta(days=day)).weekday() in self.holiday_weekdays:
+                windows.append((day * MINUTES_PER_DAY, (day + 1) * MINUTES_PER_DAY))
+        return windows
+
+    def evaluate(self, shifts: Iterable[ShiftInput]) -> Dict[int, PayBreakdown]:
+        """
+        勤務をまとめて計算（週の時間外判定のため、同じ週の勤務はすべて渡すこと）
+        """
+        by_user: Dict[int, List[ShiftInput]] = {}
+        for shift in shifts:
+            by_user.setdefault(shift.user_id, []).append(shift)
+
+        results: Dict[int, PayBreakdown] = {}
+        for user_shifts in by_user.values():
+            user_shifts.sort(key=lambda s: (s.date, _to_minutes(s.clock_in)))
+
+            # ユーザーごとに日付順の1パスで週の累計を追跡
+            current_week: Optional[date] = None
+            weekly_regular = 0.0
+            for shift in user_shifts:
+                week = self.week_start(shift.date)
+                if week != current_week:
+                    current_week = week
+                    weekly_regular = 0.0
+
+                breakdown = self._evaluate_day(shift)
+
+                # 週40時間を超えた分は時間外に振り替える
+                allowance = max(self.rules.weekly_overtime_minutes - weekly_regular, 0.0)
+                if breakdown.regular_minutes > allowance:
+                    excess = breakdown.regular_minutes - allowance
+                    breakdown.regular_minutes -= excess
+                    breakdown.overtime_minutes += excess
+                weekly_regular += breakdown.regular_minutes
+
+                self._price(breakdown, shift.hourly_rate)
+                results[shift.attendance_id] = breakdown
+        return results
+
+    def _evaluate_day(self, shift: ShiftInput) -> PayBreakdown:
+        worked = self._worked_intervals(shift)
+        work_minutes = sum(end - start for start, end in worked)
+        holiday_minutes = _overlap(worked, self._holiday_windows(shift.date))
+        night_minutes = _overlap(worked, self.night_windows)
+
+        # 法定休日の労働は1日・週の法定労働時間の計算から除く
+        statutory_minutes = work_minutes - holiday_minutes
+        overtime_minutes = max(statutory_minutes - self.rules.daily_overtime_minutes, 0.0)
+
+        return PayBreakdown(
+            work_minutes=work_minutes,
+            regular_minutes=statutory_minutes - overtime_minutes,
+            overtime_minutes=overtime_minutes,
+            night_minutes=night_minutes,
+            holiday_minutes=holiday_minutes
+        )
+
+    def _price(self, breakdown: PayBreakdown, hourly_rate: Optional[Decimal]) -> None:
+        if hourly_rate is None:
+            breakdown.amount_sen = 0
+            return
+
+        # 時給 × (労働分 + 割増の分数) / 60 を整数で計算し、最後に1回だけ四捨五入する
+        weighted_minutes = (
+            round(breakdown.work_minutes) * BASIS_POINTS
+            + round(breakdown.overtime_minutes) * self.overtime_bp
+            + round(breakdown.holiday_minutes) * self.holiday_bp
+            + round(breakdown.night_minutes) * self.night_bp
+        )
+        breakdown.amount_sen = divide_half_up(weighted_minutes * yen_to_sen(hourly_rate), 60 * BASIS_POINTS)
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules: PayRuleSet) -> CompiledPayRules:
+    """
+    ルールセットをコンパイル（同じルールセットは再利用する）
+    """
+    return CompiledPayRules(rules)
+
+
+def default_rules() -> CompiledPayRules:
+    """
+    設定値から組み立てたルールセット
+    """
+    return compile_rules(PayRuleSet(
+        daily_overtime_minutes=settings.PAY_DAILY_OVERTIME_MINUTES,
+        weekly_overtime_minutes=settings.PAY_WEEKLY_OVERTIME_MINUTES,
+        week_start_weekday=settings.PAY_WEEK_START_WEEKDAY,
+        legal_holiday_weekdays=tuple(settings.PAY_LEGAL_HOLIDAY_WEEKDAYS),
+        overtime_premium=Decimal(str(settings.PAY_OVERTIME_PREMIUM)),
+        night_premium=Decimal(str(settings.PAY_NIGHT_PREMIUM)),
+        holiday_premium=Decimal(str(settings.PAY_HOLIDAY_PREMIUM)),
+    ))
@@ -0,0 +1,104 @@
+"""
+給与明細書（HTML）の描画
+
+プロセスプールのワーカーで実行するため、標準ライブラリだけに依存する
+（ワーカーの起動時にDBやWebフレームワークのモジュールを読み込まない）。
+入力は pickle できる dict / tuple / Decimal / date のみ。
+"""
+
+import html
+from datetime import date, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+WEEKDAYS = "月火水木金土日"
+
+STYLE = """
+@page { size: A4; margin: 15mm; }
+body { font-family: "Noto Sans JP", "Hiragino Sans", sans-serif; font-size: 10pt; color: #222; }
+h1 { font-size: 16pt; margin: 0 0 4mm; }
+.meta { display: flex; justify-content: space-between; margin-bottom: 6mm; }
+table { width: 100%; border-collapse: collapse; margin-bottom: 6mm; }
+th, td { border: 1px solid #999; padding: 1.5mm 2mm; }
+th { background: #eee; text-align: left; }
+td.num { text-align: right; font-variant-numeric: tabular-nums; }
+.total td { font-weight: bold; }
+"""
+
+
+def _yen(value: Decimal) -> str:
+    return f"¥{value:,.0f}"
+
+
+def _hours(value: Decimal) -> str:
+    return f"{value:.2f}"
+
+
+def _time(value: Optional[time]) -> str:
+    return value.strftime("%H:%M") if value else "--:--"
+
+
+def payslip_filename(payload: Dict[str, Any]) -> str:
+    return f"payslip_{payload['year']:04d}{payload['month']:02d}_{payload['user']['id']:06d}.html"
+
+
+def render_payslip(payload: Dict[str, Any]) -> str:
+    """
+    1人分の給与明細書
+    """
+    user = payload["user"]
+    summary = payload["summary"]
+    e = html.escape
+
+    rows = []
+    for work_date, clock_in, clock_out, break_minutes, total_hours, total_amount in payload["days"]:
+        rows.append(
+            f"<tr><td>{work_date:%m/%d}（{WEEKDAYS[work_date.weekday()]}）</td>"
+            f"<td>{_time(clock_in)}</td><td>{_time(clock_out)}</td>"
+            f"<td class=\"num\">{break_minutes}分</td>"
+            f"<td class=\"num\">{_hours(total_hours)}</td>"
+            f"<td class=\"num\">{_yen(total_amount)}</td></tr>"
+        )
+    if not rows:
+        rows.append("<tr><td colspan=\"6\">勤怠記録はありません</td></tr>")
+
+    issued_on: date = payload["issued_on"]
+    return f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="utf-8">
+<title>給与明細書 {payload['year']}年{payload['month']}月 {e(user['name'])}</title>
+<style>{STYLE}</style>
+</head>
+<body>
+<h1>給与明細書（{payload['year']}年{payload['month']}月分）</h1>
+<div class="meta">
+<div>{e(user['name'])} 様<br>社員番号: {user['id']}<br>{e(user['email'])}</div>
+<div>発行日: {issued_on:%Y年%m月%d日}<br>時給: {_yen(user['hourly_rate'])}</div>
+</div>
+<table>
+<tr><th>出勤日数</th><th>総労働時間</th><th>平均労働時間</th><th>時間外</th><th>深夜</th><th>法定休日</th><th>総支給額</th></tr>
+<tr class="total">
+<td class="num">{summary['total_days']}日</td>
+<td class="num">{_hours(summary['total_hours'])}</td>
+<td class="num">{_hours(summary['average_daily_hours'])}</td>
+<td class="num">{_hours(summary['overtime_hours'])}</td>
+<td class="num">{_hours(summary['night_hours'])}</td>
+<td class="num">{_hours(summary['holiday_hours'])}</td>
+<td class="num">{_yen(summary['total_amount'])}</td>
+</tr>
+</table>
+<table>
+<tr><th>日付</th><th>出勤</th><th>退勤</th><th>休憩</th><th>労働時間</th><th>支給額</th></tr>
+{''.join(rows)}
+</table>
+</body>
+</html>
+"""
+
+
+def render_chunk(payloads: List[Dict[str, Any]]) -> List[Tuple[str, bytes]]:
+    """
+    複数人分をまとめて描画（ワーカーへの受け渡し回数を減らすためチャンク単位で呼ぶ）
+    """
+    return [(payslip_filename(payload), render_payslip(payload).encode("utf-8")) for payload in payloads]
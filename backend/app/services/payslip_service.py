@@ -0,0 +1,234 @@
+"""
+給与明細書の一括作成
+
+月次レポートと同じ集計（ReportService.summarize_month）を全ユーザー分まとめて取得し、
+HTMLの描画はプロセスプールでチャンクごとに並列実行する。
+描画済みのチャンクから順にzipファイルまたはディレクトリへ書き出す。
+
+イベントループを止めないよう、描画と書き出しはスレッドから実行する
+（プロセスはspawnで起動し、親のスレッドやDB接続を引き継がない）。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import pathlib
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.payslip_render import render_chunk
+from app.services.read_repository import UserRow
+from app.services.report_service import ReportService
+from app.utils.timezone import today_jst
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = (
+    "total_days", "total_hours", "total_amount", "average_daily_hours",
+    "overtime_hours", "night_hours", "holiday_hours"
+)
+
+
+@dataclass
+class PayslipReport:
+    """
+    給与明細書の作成結果
+    """
+    year: int
+    month: int
+    output: str
+    documents: int = 0
+    bytes_written: int = 0
+    workers: int = 1
+    chunk_size: int = 0
+    fetch_seconds: float = 0.0
+    render_seconds: float = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.render_seconds if self.render_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["documents_per_second"] = round(self.documents_per_second, 1)
+        return data
+
+    def summary(self) -> str:
+        return (
+            f"{self.documents} payslips for {self.year}-{self.month:02d} -> {self.output} "
+            f"({self.bytes_written / 1024:.0f} KiB, fetch {self.fetch_seconds:.2f}s, "
+            f"render {self.render_seconds:.2f}s, {self.documents_per_second:.0f} docs/s "
+            f"with {self.workers} workers)"
+        )
+
+
+def _payload(user: UserRow, data: Dict[str, Any], issued_on) -> Dict[str, Any]:
+    """
+    ワーカーに渡す1人分のデータ（pickleできる値だけにする）
+    """
+    return {
+        "user": {"id": user.id, "name": user.name, "email": user.email, "hourly_rate": user.hourly_rate},
+        "year": data["year"],
+        "month": data["month"],
+        "issued_on": issued_on,
+        "summary": {name: data[name] for name in SUMMARY_FIELDS},
+        "days": [
+            (
+                a.date, a.clock_in, a.clock_out,
+                sum(b.duration or 0 for b in a.break_times),
+                a.total_hours, a.total_amount
+            )
+            for a in data["attendance_list"]
+        ]
+    }
+
+
+def output_dir() -> pathlib.Path:
+    return pathlib.Path(settings.PAYSLIP_OUTPUT_DIR) if settings.PAYSLIP_OUTPUT_DIR else (
+        pathlib.Path.home() / ".attendance" / "payslips"
+    )
+
+
+def default_output(year: int, month: int) -> pathlib.Path:
+    return output_dir() / f"payslips_{year:04d}{month:02d}.zip"
+
+
+def confined_output(output: str) -> pathlib.Path:
+    """
+    APIから指定された出力先をPAYSLIP_OUTPUT_DIR配下の相対パスとして解決（絶対パス・".."は不可）
+    """
+    relative = pathlib.PurePath(output)
+    if relative.is_absolute() or relative.anchor or ".." in relative.parts:
+        raise ValueError(f"Payslip output must be a relative path under the output directory: {output}")
+    base = output_dir().resolve()
+    path = (base / relative).resolve()
+    # シンボリックリンクで外に出る場合も拒否する
+    if path != base and base not in path.parents:
+        raise ValueError(f"Payslip output must be a relative path under the output directory: {output}")
+    return path
+
+
+def default_workers() -> int:
+    return settings.PAYSLIP_WORKERS or os.cpu_count() or 1
+
+
+class _DocumentWriter:
+    """
+    .zipで終わる出力先はzipファイル、それ以外はディレクトリに書き出す
+    """
+
+    def __init__(self, output: pathlib.Path):
+        self.output = output
+        self.bytes_written = 0
+        self._zip: Optional[zipfile.ZipFile] = None
+        if output.suffix == ".zip":
+            output.parent.mkdir(parents=True, exist_ok=True)
+            self._zip = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            output.mkdir(parents=True, exist_ok=True)
+
+    def write(self, documents: Iterable[Tuple[str, bytes]]) -> int:
+        count = 0
+        for name, content in documents:
+            if self._zip is not None:
+                self._zip.writestr(name, content)
+            else:
+                (self.output / name).write_bytes(content)
+            self.bytes_written += len(content)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+
+
+def render_documents(
+    payloads: List[Dict[str, Any]],
+    output: pathlib.Path,
+    workers: int,
+    chunk_size: int
+) -> Tuple[int, int]:
+    """
+    描画と書き出し（ブロッキング処理、戻り値は件数とバイト数）
+    workersが1ならプロセスを使わずに描画する
+    """
+    chunks = [payloads[i:i + chunk_size] for i in range(0, len(payloads), chunk_size)]
+    writer = _DocumentWriter(output)
+    documents = 0
+    try:
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                documents += writer.write(render_chunk(chunk))
+        else:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+                futures = [pool.submit(render_chunk, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    documents += writer.write(future.result())
+    finally:
+        writer.close()
+    return documents, writer.bytes_written
+
+
+class PayslipService:
+    """
+    給与明細書の作成サービス
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def collect(
+        self,
+        year: int,
+        month: int,
+        user_ids: Optional[Iterable[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        全ユーザー（またはuser_ids）の月のデータをまとめて取得
+        """
+        issued_on = today_jst()
+        reports = await ReportService(self.db).get_monthly_report_data_bulk(year, month, user_ids)
+        return [_payload(user, data, issued_on) for user, data in reports]
+
+    async def generate(
+        self,
+        year: int,
+        month: int,
+        output: Optional[str] = None,
+        user_ids: Optional[Iterable[int]] = None,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> PayslipReport:
+        """
+        給与明細書を作成してzipファイルまたはディレクトリに書き出す
+        """
+        output_path = pathlib.Path(output) if output else default_output(year, month)
+        report = PayslipReport(
+            year=year,
+            month=month,
+            output=str(output_path),
+            workers=workers or default_workers(),
+            chunk_size=chunk_size or settings.PAYSLIP_CHUNK_SIZE
+        )
+
+        started = time.perf_counter()
+        payloads = await self.collect(year, month, user_ids)
+        report.fetch_seconds = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        report.documents, report.bytes_written = await asyncio.to_thread(
+            render_documents, payloads, output_path, report.workers, report.chunk_size
+        )
+        report.render_seconds = round(time.perf_counter() - started, 3)
+
+        logger.info(f"Generated {report.summary()}")
+        return report
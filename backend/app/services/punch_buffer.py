@@ -0,0 +1,528 @@
+"""
+打刻の書き込み集約バッファ
+
+打刻はワーカーごとの追記ログ（{PUNCH_LOG_PATH}.<スロット番号>）へのfsyncで受付完了とし、
+バックグラウンドでまとめてDBへ反映する。各ワーカーは空いているスロットのログをファイルロックで占有するため、
+ログの追記・切り詰めとシーケンス番号は1プロセスだけが扱う。
+停止したワーカーのログ（ロックが取れるスロット）は、起動したワーカーが未反映の打刻を自分のログへ移してから空にする。
+未反映の打刻の読み取りでは、他のワーカーのログも反映済み位置より後ろを読むため、どのワーカーが受け付けた打刻も見える。
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import pathlib
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.user import User
+from app.utils.timezone import today_jst, now_time_jst
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Punch:
+    """
+    打刻イベント（追記ログの1行）
+    """
+    seq: int
+    punch_id: str
+    user_id: int
+    kind: str  # clock_in または clock_out
+    date: date
+    time: time
+
+    def to_line(self) -> str:
+        data = asdict(self)
+        data["date"] = self.date.isoformat()
+        data["time"] = self.time.isoformat()
+        return json.dumps(data) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> "Punch":
+        data = json.loads(line)
+        data["date"] = date.fromisoformat(data["date"])
+        data["time"] = time.fromisoformat(data["time"])
+        return cls(**data)
+
+
+def _is_data_error(error: Exception) -> bool:
+    """
+    打刻そのものが原因のエラーか（再試行しても反映できない）
+    DB障害・接続切れ・タイムアウトなどそれ以外のエラーでは打刻を破棄しない
+    """
+    return isinstance(error, (IntegrityError, DataError))
+
+
+def _try_lock(path: pathlib.Path) -> Optional[int]:
+    """
+    ログのロックファイルを排他ロック（他のプロセスが使用中ならNone、ロックはプロセスの終了で外れる）
+    """
+    fd = os.open(path.with_name(path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class PunchLog:
+    """
+    打刻の永続追記ログ（1つのログに書き込むのはロックを持つ1プロセスだけ）
+    同時に届いた打刻はまとめて書き込み、1回のfsyncで永続化する（グループコミット）
+    """
+
+    def __init__(self, path: pathlib.Path, lock_fd: Optional[int] = None):
+        self.path = path
+        self.checkpoint_path = path.with_name(path.name + ".checkpoint")
+        self.lock_fd = lock_fd
+        self._pending: List[Tuple[Punch, asyncio.Future]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # ログに書き込み済みの最大シーケンス番号
+        self.last_written_seq = 0
+
+    async def append(self, punch: Punch) -> None:
+        """
+        ログに追記し、fsync完了まで待機
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((punch, future))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_pending())
+        await future
+
+    async def _write_pending(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                async with self._lock:
+                    await asyncio.to_thread(self._write_lines, [punch.to_line() for punch, _ in batch])
+                    self.last_written_seq = max(punch.seq for punch, _ in batch)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def _write_lines(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_checkpoint(self) -> int:
+        try:
+            return int(self.checkpoint_path.read_text().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    async def checkpoint(self, seq: int, compact: bool) -> None:
+        """
+        DBへの反映済み位置を記録（未反映の打刻がなければログを切り詰める）
+        """
+        async with self._lock:
+            await asyncio.to_thread(self._write_checkpoint, seq, compact)
+
+    def _write_checkpoint(self, seq: int, compact: bool) -> None:
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(str(seq))
+        os.replace(tmp_path, self.checkpoint_path)
+        # 書き込み済みの打刻がすべて反映済みの場合のみ切り詰める
+        if compact and seq >= self.last_written_seq:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def release(self) -> None:
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    def discard(self) -> None:
+        """
+        移し終えたログを空にする（ロックを持っている間に呼ぶこと）
+        """
+        self._write_checkpoint(0, compact=False)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self, quiet: bool = False) -> List[Punch]:
+        """
+        未反映の打刻をログから読み出す（起動時と、他のワーカーのログの読み取りに使用）
+        quiet: 書き込み中の行を警告なしで読み飛ばす
+        """
+        if not self.path.exists():
+            return []
+
+        applied_seq = self.read_checkpoint()
+        punches = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    punch = Punch.from_line(line)
+                except (ValueError, TypeError, KeyError):
+                    # クラッシュ時の書きかけ行は無視する
+                    if not quiet:
+                        logger.warning("Skipping malformed punch log line")
+                    continue
+                if punch.seq > applied_seq:
+                    punches.append(punch)
+        return punches
+
+
+class PunchBuffer:
+    """
+    打刻の書き込み集約バッファ
+    打刻は追記ログへの永続化で受付完了とし、バックグラウンドでまとめてDBへ反映する
+    """
+
+    # この回数連続でバッチ反映がデータのエラーで失敗したら1件ずつの反映に切り替える
+    MAX_BATCH_FAILURES = 3
+
+    def __init__(self, log_path: pathlib.Path, flush_interval_ms: int, max_batch_size: int):
+        self.log_path = log_path
+        self.log: Optional[PunchLog] = None
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: List[Punch] = []
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._flusher: Optional[asyncio.Task] = None
+        self._failures = 0
+        # DB障害時の再試行の待ち時間（0なら通常の周期）
+        self._retry_delay = 0.0
+        # 在席インデックス: ユーザーID -> DB未反映の打刻
+        self.presence: Dict[int, List[Punch]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    async def start(self) -> None:
+        """
+        自分のログを確保し、未反映の打刻を復元してフラッシャーを起動
+        """
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.log = self._claim_log()
+        self._seq = self.log.read_checkpoint()
+        self.log.last_written_seq = self._seq
+
+        for punch in self.log.replay():
+            self._enqueue(punch)
+            self._seq = max(self._seq, punch.seq)
+        self.log.last_written_seq = self._seq
+        if self._queue:
+            logger.info(f"Recovered {len(self._queue)} unapplied punches from {self.log.path}")
+
+        await self._adopt_orphaned_logs()
+        self._flusher = asyncio.create_task(self._run())
+        logger.info(f"Punch buffer started (log: {self.log.path})")
+
+    async def stop(self) -> None:
+        """
+        残りの打刻を反映してフラッシャーを停止
+        """
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        while self._queue:
+            if not await self._flush_once():
+                logger.warning(f"{len(self._queue)} punches left in log for next startup")
+                break
+
+        if self.log is not None:
+            self.log.release()
+
+    def _slot_path(self, slot: int) -> pathlib.Path:
+        return self.log_path.with_name(f"{self.log_path.name}.{slot}")
+
+    def _claim_log(self) -> PunchLog:
+        """
+        ロックが取れた最初のスロットのログを自分のログにする
+        """
+        slot = 0
+        while True:
+            path = self._slot_path(slot)
+            lock_fd = _try_lock(path)
+            if lock_fd is not None:
+                return PunchLog(path, lock_fd)
+            slot += 1
+
+    async def _adopt_orphaned_logs(self) -> None:
+        """
+        どのプロセスも使っていないログ（停止したワーカーや旧形式の共有ログ）の未反映の打刻を引き継ぐ
+        """
+        candidates = [self.log_path, *self.log_path.parent.glob(f"{self.log_path.name}.*[0-9]")]
+        for path in candidates:
+            if path == self.log.path or not path.exists():
+                continue
+            lock_fd = _try_lock(path)
+            if lock_fd is None:
+                continue
+            orphan = PunchLog(path, lock_fd)
+            try:
+                punches = orphan.replay()
+                for punch in punches:
+                    # 自分のログに書き直してから元のログを空にする
+                    self._seq += 1
+                    punch.seq = self._seq
+                    await self.log.append(punch)
+                    self._enqueue(punch)
+                if punches or path.stat().st_size:
+                    await asyncio.to_thread(orphan.discard)
+                if punches:
+                    logger.info(f"Adopted {len(punches)} unapplied punches from {path}")
+            finally:
+                orphan.release()
+
+    async def submit(self, user_id: int, kind: str, punch_time: Optional[time] = None) -> Punch:
+        """
+        打刻を受け付ける（追記ログへのfsync完了後に戻る）
+        """
+        self._seq += 1
+        punch = Punch(
+            seq=self._seq,
+            punch_id=uuid.uuid4().hex,
+            user_id=user_id,
+            kind=kind,
+            date=today_jst(),
+            time=punch_time or now_time_jst()
+        )
+        await self.log.append(punch)
+        self._enqueue(punch)
+        return punch
+
+    def _shared_pending(self, user_id: int) -> List[Punch]:
+        """
+        他のワーカーのログにあるユーザーの未反映打刻（ログは読むだけでロックしない）
+        """
+        punches = []
+        for path in self.log_path.parent.glob(f"{self.log_path.name}.*[0-9]"):
+            if path == self.log.path:
+                continue
+            try:
+                if not path.stat().st_size:
+                    continue
+            except FileNotFoundError:
+                continue
+            punches.extend(p for p in PunchLog(path).replay(quiet=True) if p.user_id == user_id)
+        return punches
+
+    async def pending_for(self, user_id: int) -> List[Punch]:
+        """
+        ユーザーのDB未反映の打刻（他のワーカーが受け付けた打刻を含む）
+        """
+        punches = list(self.presence.get(user_id, []))
+        punches += await asyncio.to_thread(self._shared_pending, user_id)
+        return sorted(punches, key=lambda punch: (punch.date, punch.time))
+
+    async def wait_for_user(self, user_id: int, timeout: float) -> bool:
+        """
+        ユーザーの未反映打刻がDBに反映されるまで待機（上限あり）
+        他のワーカーが受け付けた打刻は、そのワーカーのログの反映済み位置が進むまで周期ごとに確認する
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        if user_id in self.presence:
+            async with self._flushed:
+                try:
+                    await asyncio.wait_for(
+                        self._flushed.wait_for(lambda: user_id not in self.presence),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    return False
+
+        while await asyncio.to_thread(self._shared_pending, user_id):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(self.flush_interval, remaining))
+        return True
+
+    def _enqueue(self, punch: Punch) -> None:
+        self._queue.append(punch)
+        self.presence.setdefault(punch.user_id, []).append(punch)
+        if len(self._queue) >= self.max_batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            if self._retry_delay:
+                # DB障害中はバッチが溜まっても待ち時間を空けて再試行する
+                await asyncio.sleep(self._retry_delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            while self._queue:
+                if not await self._flush_once():
+                    break
+
+    async def _flush_once(self) -> bool:
+        batch = self._queue[:self.max_batch_size]
+        try:
+            await self._apply(batch)
+        except Exception as e:
+            if not _is_data_error(e):
+                # DB障害などではキューとログに残したまま、間隔を空けて再試行する
+                self._back_off(len(batch), e)
+                return False
+            self._failures += 1
+            logger.error(f"Failed to apply {len(batch)} punches (attempt {self._failures}): {e}")
+            if self._failures < self.MAX_BATCH_FAILURES:
+                return False
+            # 同じバッチが失敗し続ける場合は1件ずつ反映し、データのエラーになる打刻だけ破棄する
+            done = await self._apply_individually(batch)
+            self._failures = 0
+            if done < len(batch):
+                await self._complete(batch[:done])
+                return False
+
+        self._failures = 0
+        self._retry_delay = 0.0
+        await self._complete(batch)
+        return True
+
+    def _back_off(self, count: int, error: Exception) -> None:
+        self._retry_delay = min(
+            self._retry_delay * 2 if self._retry_delay else self.flush_interval,
+            settings.PUNCH_RETRY_MAX_SECONDS
+        )
+        logger.error(f"Failed to apply {count} punches, keeping them queued (retrying in {self._retry_delay:.1f}s): {error}")
+
+    async def _complete(self, batch: List[Punch]) -> None:
+        """
+        反映（または破棄）した先頭の打刻をキューから外し、ログに反映済み位置を記録
+        """
+        if not batch:
+            return
+        del self._queue[:len(batch)]
+        for punch in batch:
+            pending = self.presence.get(punch.user_id)
+            if pending:
+                pending.remove(punch)
+                if not pending:
+                    del self.presence[punch.user_id]
+
+        await self.log.checkpoint(batch[-1].seq, compact=not self._queue)
+        async with self._flushed:
+            self._flushed.notify_all()
+
+    async def _apply_individually(self, batch: List[Punch]) -> int:
+        """
+        1件ずつ反映する（データのエラー以外で失敗したらそこで止め、反映または破棄した件数を返す）
+        """
+        for index, punch in enumerate(batch):
+            try:
+                await self._apply([punch])
+            except Exception as e:
+                if not _is_data_error(e):
+                    self._back_off(len(batch) - index, e)
+                    return index
+                logger.error(f"Dropping punch {punch.punch_id} for user {punch.user_id}: {e}")
+        return len(batch)
+
+    async def _apply(self, batch: List[Punch]) -> None:
+        """
+        打刻をまとめて1トランザクションでDBへ反映
+        """
+        from app.core.database import AsyncSessionLocal
+        from app.services.attendance_service import AttendanceService
+
+        async with AsyncSessionLocal() as db:
+            # 対象ユーザーと勤怠を一括取得
+            user_ids = {p.user_id for p in batch}
+            result = await db.execute(select(User.id).where(User.id.in_(user_ids)))
+            existing_users = set(result.scalars().all())
+
+            keys = {(p.user_id, p.date) for p in batch if p.user_id in existing_users}
+            attendances: Dict[Tuple[int, date], Attendance] = {}
+            if keys:
+                result = await db.execute(
+                    select(Attendance).where(tuple_(Attendance.user_id, Attendance.date).in_(keys))
+                )
+                attendances = {(a.user_id, a.date): a for a in result.scalars().all()}
+
+            changed: Dict[Tuple[int, date], Attendance] = {}
+            for punch in batch:
+                key = (punch.user_id, punch.date)
+                if punch.user_id not in existing_users:
+                    logger.warning(f"Dropping punch {punch.punch_id}: user {punch.user_id} not found")
+                    continue
+
+                attendance = attendances.get(key)
+                if punch.kind == "clock_in":
+                    if attendance is None:
+                        attendance = Attendance(user_id=punch.user_id, date=punch.date)
+                        db.add(attendance)
+                        attendances[key] = attendance
+                    elif attendance.clock_in:
+                        logger.warning(f"User {punch.user_id} already clocked in on {punch.date}")
+                    attendance.clock_in = punch.time
+                else:
+                    if attendance is None or not attendance.clock_in:
+                        logger.warning(f"Dropping punch {punch.punch_id}: no clock-in for user {punch.user_id} on {punch.date}")
+                        continue
+                    attendance.clock_out = punch.time
+                changed[key] = attendance
+
+            # 新規行のIDを確定させてから合計をまとめて再計算
+            await db.flush()
+            service = AttendanceService(db)
+            await service.calculate_totals_bulk(list(changed.values()))
+            changed_ids = [a.id for a in changed.values()]
+            await db.commit()
+
+            # コミット後の値を1回のクエリで読み直してイベントを発行
+            if changed_ids:
+                result = await db.execute(
+                    select(Attendance)
+                    .where(Attendance.id.in_(changed_ids))
+                    .execution_options(populate_existing=True)
+                )
+                for attendance in result.scalars().all():
+                    await service.publish_attendance_event("attendance.updated", attendance)
+
+        logger.info(f"Applied {len(batch)} punches to {len(changed)} attendance records")
+
+
+def _default_log_path() -> pathlib.Path:
+    if settings.PUNCH_LOG_PATH:
+        return pathlib.Path(settings.PUNCH_LOG_PATH)
+    return pathlib.Path.home() / ".attendance" / "punches.log"
+
+
+# シングルトンインスタンス
+punch_buffer = PunchBuffer(
+    _default_log_path(),
+    settings.PUNCH_FLUSH_INTERVAL_MS,
+    settings.PUNCH_FLUSH_MAX_EVENTS
+)
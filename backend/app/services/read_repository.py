@@ -0,0 +1,346 @@
+"""
+読み取り専用の勤怠リポジトリ
+
+ORMのIDマップや属性の計装を経由せず、Coreのselectで必要なカラムだけを取得し
+__slots__付きのdataclassで返す。フィールドの並びはレスポンスのスキーマと同じにしてあり、
+Pydanticの検証（from_attributes）にもorjsonの直接シリアライズにもそのまま渡せる。
+"""
+
+from calendar import monthrange
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+from app.models.user import User
+from app.utils.fixed_point import hours_to_minutes, minutes_to_hours, sen_to_yen, yen_to_sen
+
+ZERO = Decimal("0")
+
+# 勤怠IDをIN句で渡す上限（これを超える場合は勤怠の条件で休憩を結合して取得する、asyncpgの引数は32767個まで）
+MAX_IN_IDS = 5000
+
+
+@dataclass(slots=True)
+class BreakRow:
+    """
+    休憩（BreakTimeResponseと同じフィールド順）
+    """
+    start_time: time
+    end_time: Optional[time]
+    id: int
+    attendance_id: int
+    duration: int
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass(slots=True)
+class AttendanceRow:
+    """
+    休憩を含む勤怠（AttendanceWithBreaksと同じフィールド順）
+    """
+    date: date
+    clock_in: Optional[time]
+    clock_out: Optional[time]
+    id: int
+    user_id: int
+    total_hours: Decimal
+    total_amount: Decimal
+    regular_minutes: int
+    overtime_minutes: int
+    night_minutes: int
+    holiday_minutes: int
+    created_at: datetime
+    updated_at: datetime
+    break_times: List[BreakRow] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class UserRow:
+    """
+    ユーザー（UserResponseと同じフィールド順）
+    """
+    name: str
+    email: str
+    hourly_rate: Decimal
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass(slots=True)
+class MonthTotals:
+    """
+    勤怠の集計（労働時間は分、金額は銭の整数で合計し、時間・円には表示時に変換する）
+    """
+    records: int = 0
+    present_days: int = 0  # 平日に出勤した日数（カレンダーのstatusがpresentの日）
+    work_minutes: int = 0
+    amount_sen: int = 0
+    overtime_minutes: int = 0
+    night_minutes: int = 0
+    holiday_minutes: int = 0
+
+    @property
+    def total_hours(self) -> Decimal:
+        return minutes_to_hours(self.work_minutes)
+
+    @property
+    def total_amount(self) -> Decimal:
+        return sen_to_yen(self.amount_sen)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> "MonthTotals":
+        """
+        取得済みの勤怠（AttendanceRow・アーカイブの勤怠）から集計
+        行の時間・円は小数点以下2桁のため、分・銭に戻してから合計する
+        """
+        totals = cls()
+        for row in rows:
+            totals.records += 1
+            totals.work_minutes += hours_to_minutes(row.total_hours)
+            totals.amount_sen += yen_to_sen(row.total_amount)
+            totals.overtime_minutes += row.overtime_minutes or 0
+            totals.night_minutes += row.night_minutes or 0
+            totals.holiday_minutes += row.holiday_minutes or 0
+        return totals
+
+
+USER_COLUMNS = (
+    User.name,
+    User.email,
+    User.hourly_rate,
+    User.id,
+    User.created_at,
+    User.updated_at,
+)
+ATTENDANCE_COLUMNS = (
+    Attendance.date,
+    Attendance.clock_in,
+    Attendance.clock_out,
+    Attendance.id,
+    Attendance.user_id,
+    Attendance.total_hours,
+    Attendance.total_amount,
+    Attendance.regular_minutes,
+    Attendance.overtime_minutes,
+    Attendance.night_minutes,
+    Attendance.holiday_minutes,
+    Attendance.created_at,
+    Attendance.updated_at,
+)
+BREAK_COLUMNS = (
+    BreakTime.start_time,
+    BreakTime.end_time,
+    BreakTime.id,
+    BreakTime.attendance_id,
+    BreakTime.duration,
+    BreakTime.created_at,
+    BreakTime.updated_at,
+)
+
+
+def attendance_row(row: Sequence[Any]) -> AttendanceRow:
+    return AttendanceRow(
+        row[0], row[1], row[2], row[3], row[4],
+        row[5] if row[5] is not None else ZERO,
+        row[6] if row[6] is not None else ZERO,
+        row[7] or 0, row[8] or 0, row[9] or 0, row[10] or 0,
+        row[11], row[12], []
+    )
+
+
+def break_row(row: Sequence[Any]) -> BreakRow:
+    return BreakRow(row[0], row[1], row[2], row[3], row[4] or 0, row[5], row[6])
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    _, last_day = monthrange(year, month)
+    return date(year, month, 1), date(year, month, last_day)
+
+
+class AttendanceReadRepository:
+    """
+    勤怠の読み取りリポジトリ（勤怠と休憩をそれぞれ1回のクエリで取得）
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _attach_breaks(
+        self,
+        attendances: List[AttendanceRow],
+        conditions: Optional[Sequence[Any]] = None
+    ) -> None:
+        """
+        勤怠に休憩を1回のクエリでまとめて付ける
+        conditionsを渡すと、勤怠が多い場合にIDを列挙せず同じ条件で結合して取得する
+        """
+        if not attendances:
+            return
+        by_id = {a.id: a for a in attendances}
+        query = select(*BREAK_COLUMNS).order_by(BreakTime.attendance_id, BreakTime.id)
+        if conditions is not None and len(by_id) > MAX_IN_IDS:
+            query = query.join(Attendance, Attendance.id == BreakTime.attendance_id).where(and_(*conditions))
+        else:
+            query = query.where(BreakTime.attendance_id.in_(by_id.keys()))
+        result = await self.db.execute(query)
+        for row in result.all():
+            attendance = by_id.get(row[3])
+            if attendance is not None:  # 結合で取得した場合、勤怠の取得後に追加された勤怠の休憩は除く
+                attendance.break_times.append(break_row(row))
+
+    async def fetch(
+        self,
+        conditions: Sequence[Any],
+        order_by: Any = Attendance.date,
+        skip: int = 0,
+        limit: Optional[int] = None
+    ) -> List[AttendanceRow]:
+        """
+        条件に合う勤怠を休憩付きで取得（order_byはタプルで複数指定できる）
+        """
+        order_by = order_by if isinstance(order_by, (tuple, list)) else (order_by,)
+        query = select(*ATTENDANCE_COLUMNS).where(and_(*conditions)).order_by(*order_by)
+        if skip:
+            query = query.offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+
+        result = await self.db.execute(query)
+        attendances = [attendance_row(row) for row in result.all()]
+        # ページ指定がなければ条件に合う勤怠はすべて取得済みのため、同じ条件で休憩を結合できる
+        await self._attach_breaks(attendances, conditions if not skip and limit is None else None)
+        return attendances
+
+    async def for_range(self, user_id: int, start_date: date, end_date: date) -> List[AttendanceRow]:
+        """
+        ユーザーの期間（開始日・終了日を含む）の勤怠（日付順、(user_id, date)のインデックスで範囲を絞る）
+        """
+        return await self.fetch([
+            Attendance.user_id == user_id,
+            Attendance.date >= start_date,
+            Attendance.date <= end_date
+        ])
+
+    async def for_month(self, user_id: int, year: int, month: int) -> List[AttendanceRow]:
+        """
+        ユーザーの月の勤怠（日付順）
+        """
+        return await self.for_range(user_id, *_month_range(year, month))
+
+    def _is_weekday(self, column: Any) -> Any:
+        """
+        土日以外の日付の条件（曜日の関数はDBごとに異なる）
+        """
+        if self.db.bind.dialect.name == "sqlite":
+            return func.strftime("%w", column).notin_(("0", "6"))
+        return func.extract("isodow", column) < 6
+
+    async def totals_by_user(self, conditions: Sequence[Any]) -> Dict[int, MonthTotals]:
+        """
+        条件に合う勤怠をユーザーごとに集計（1回の集計クエリ、整数のカラムだけを合計する）
+        """
+        present = and_(Attendance.clock_in.isnot(None), self._is_weekday(Attendance.date))
+        result = await self.db.execute(
+            select(
+                Attendance.user_id,
+                func.count(Attendance.id),
+                func.sum(case((present, 1), else_=0)),
+                func.sum(Attendance.work_minutes),
+                func.sum(Attendance.amount_sen),
+                func.sum(Attendance.overtime_minutes),
+                func.sum(Attendance.night_minutes),
+                func.sum(Attendance.holiday_minutes)
+            )
+            .where(and_(*conditions))
+            .group_by(Attendance.user_id)
+        )
+        return {
+            row[0]: MonthTotals(*(int(value or 0) for value in row[1:]))
+            for row in result.all()
+        }
+
+    async def range_totals(self, user_id: int, start_date: date, end_date: date) -> MonthTotals:
+        """
+        ユーザーの期間の出勤日数・総労働時間・総支給額（1回の集計クエリ）
+        """
+        totals = await self.totals_by_user([
+            Attendance.user_id == user_id,
+            Attendance.date >= start_date,
+            Attendance.date <= end_date
+        ])
+        return totals.get(user_id, MonthTotals())
+
+    async def month_totals(self, user_id: int, year: int, month: int) -> MonthTotals:
+        """
+        ユーザーの月の出勤日数・総労働時間・総支給額（1回の集計クエリ）
+        """
+        return await self.range_totals(user_id, *_month_range(year, month))
+
+    async def present_dates(self, user_id: int, year: int, month: int) -> Set[date]:
+        """
+        ユーザーの月の出勤（clock_inあり）の日付（勤怠の行は組み立てない）
+        """
+        first_day, last_day = _month_range(year, month)
+        result = await self.db.execute(
+            select(Attendance.date).where(
+                Attendance.user_id == user_id,
+                Attendance.date >= first_day,
+                Attendance.date <= last_day,
+                Attendance.clock_in.isnot(None)
+            )
+        )
+        return set(result.scalars().all())
+
+    async def for_date(self, user_id: int, work_date: date) -> Optional[AttendanceRow]:
+        """
+        ユーザーの指定日の勤怠
+        """
+        rows = await self.fetch([Attendance.user_id == user_id, Attendance.date == work_date])
+        return rows[0] if rows else None
+
+    async def user_with_month(
+        self,
+        user_id: int,
+        year: int,
+        month: int,
+        include_date: Optional[date] = None
+    ) -> Tuple[Optional[UserRow], List[AttendanceRow]]:
+        """
+        ユーザーと月の勤怠（日付順）を取得（ユーザーと勤怠で1回、休憩で1回のクエリ）
+        include_dateが月の外にあればその日の勤怠も含める（当日が別の月の場合など）
+        """
+        first_day, last_day = _month_range(year, month)
+        in_range = and_(Attendance.date >= first_day, Attendance.date <= last_day)
+        if include_date is not None and not first_day <= include_date <= last_day:
+            in_range = or_(in_range, Attendance.date == include_date)
+
+        # ユーザーに勤怠を外部結合し、勤怠がない月でもユーザーの行は返す
+        result = await self.db.execute(
+            select(*USER_COLUMNS, *ATTENDANCE_COLUMNS)
+            .select_from(User)
+            .outerjoin(Attendance, and_(Attendance.user_id == User.id, in_range))
+            .where(User.id == user_id)
+            .order_by(Attendance.date)
+        )
+        rows = result.all()
+        if not rows:
+            return None, []
+
+        user_width = len(USER_COLUMNS)
+        first = rows[0]
+        user = UserRow(*first[:user_width])
+        attendances = [
+            attendance_row(row[user_width:])
+            for row in rows
+            if row[user_width + 3] is not None  # 勤怠のない外部結合の行
+        ]
+        await self._attach_breaks(attendances)
+        return user, attendances
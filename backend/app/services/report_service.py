@@ -1,17 +1,29 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, extract, and_, func
-from sqlalchemy.orm import selectinload
+from calendar import monthrange
+from datetime import date
 from decimal import Decimal
-from typing import List, Dict
+from typing import Any, Iterable, List, Dict, Optional, Tuple
+import asyncio
 import logging
-from calendar import monthrange
 
 from app.models.attendance import Attendance
 from app.models.user import User
 from app.schemas.reports import MonthlyReport, YearlyReport
+from app.services.archive_service import archive_service
+from app.services.pay_period import default_pay_periods
+from app.services.read_repository import USER_COLUMNS, AttendanceReadRepository, MonthTotals, UserRow
+from app.utils.fixed_point import minutes_to_hours, sen_to_yen
 
 logger = logging.getLogger(__name__)
 
+# 割増区分のカラム（分単位）とレポートの項目名（時間単位）
+PREMIUM_BUCKETS = (
+    ("overtime_minutes", "overtime_hours"),
+    ("night_minutes", "night_hours"),
+    ("holiday_minutes", "holiday_hours"),
+)
+
 
 class ReportService:
     """
@@ -30,39 +42,178 @@ class ReportService:
         """
         月次レポートを生成
         """
-        # 月の勤怠データを取得
-        result = await self.db.execute(
-            select(Attendance)
-            .where(and_(
-                Attendance.user_id == user_id,
-                extract('year', Attendance.date) == year,
-                extract('month', Attendance.date) == month
-            ))
-            .options(selectinload(Attendance.break_times))
-            .order_by(Attendance.date)
-        )
-        attendances = result.scalars().all()
+        return MonthlyReport(**await self.get_monthly_report_data(user_id, year, month))
+    
+    async def get_monthly_report_data(
+        self,
+        user_id: int,
+        year: int,
+        month: int
+    ) -> Dict[str, Any]:
+        """
+        月次レポートの項目（MonthlyReportと同じ並び、勤怠は検証前の行のまま）
+        """
+        if archive_service.is_archived(year):
+            # アーカイブ済みの年はParquetファイルから読み込む
+            attendances = await asyncio.to_thread(
+                archive_service.read_monthly_attendances, user_id, year, month
+            )
+            totals = None
+        else:
+            # 月の勤怠データを取得（日付範囲で指定してパーティションを絞り込む、ORMは経由しない）
+            repository = AttendanceReadRepository(self.db)
+            attendances = await repository.for_month(user_id, year, month)
+            totals = await repository.month_totals(user_id, year, month)
         
-        # 集計
+        return self.summarize_month(year, month, attendances, totals)
+    
+    async def get_period_report_data(
+        self,
+        user_id: int,
+        year: int,
+        period: int
+    ) -> Dict[str, Any]:
+        """
+        給与期間（締め日による月度）のレポートの項目（PeriodReportと同じ並び）
+        """
+        calendar = default_pay_periods()
+        pay_period = calendar.resolve(year, period)
+        attendances, totals = await self._range_attendances(user_id, pay_period.start_date, pay_period.end_date)
+        
+        return {
+            "year": year,
+            "period": period,
+            "closing_day": calendar.closing_day,
+            "start_date": pay_period.start_date,
+            "end_date": pay_period.end_date,
+            **self.summarize_attendances(attendances, totals)
+        }
+    
+    async def _range_attendances(
+        self,
+        user_id: int,
+        start_date: date,
+        end_date: date
+    ) -> Tuple[List[Any], Optional[MonthTotals]]:
+        """
+        期間の勤怠と集計クエリの結果（期間がアーカイブ済みの年にかかる場合、集計は勤怠の行から行うためNone）
+        """
+        years = range(start_date.year, end_date.year + 1)
+        repository = AttendanceReadRepository(self.db)
+        if not any(archive_service.is_archived(year) for year in years):
+            attendances = await repository.for_range(user_id, start_date, end_date)
+            return attendances, await repository.range_totals(user_id, start_date, end_date)
+        
+        # 年ごとにアーカイブ（Parquetファイル）とデータベースから読み分ける
+        attendances: List[Any] = []
+        for year in years:
+            year_start = max(start_date, date(year, 1, 1))
+            year_end = min(end_date, date(year, 12, 31))
+            if archive_service.is_archived(year):
+                for month in range(year_start.month, year_end.month + 1):
+                    rows = await asyncio.to_thread(
+                        archive_service.read_monthly_attendances, user_id, year, month
+                    )
+                    attendances.extend(a for a in rows if year_start <= a.date <= year_end)
+            else:
+                attendances.extend(await repository.for_range(user_id, year_start, year_end))
+        return attendances, None
+    
+    @staticmethod
+    def summarize_month(
+        year: int,
+        month: int,
+        attendances: List[Any],
+        totals: Optional[MonthTotals] = None
+    ) -> Dict[str, Any]:
+        """
+        月の勤怠から月次レポートの項目を集計
+        """
+        return {
+            "year": year,
+            "month": month,
+            **ReportService.summarize_attendances(attendances, totals)
+        }
+    
+    @staticmethod
+    def summarize_attendances(attendances: List[Any], totals: Optional[MonthTotals] = None) -> Dict[str, Any]:
+        """
+        勤怠から日数・時間・金額の項目を集計（attendance_listを含む）
+        totals（集計クエリの結果）を渡さなければ勤怠の行から分・銭の整数で合計する
+        """
+        if totals is None:
+            totals = MonthTotals.from_rows(attendances)
         total_days = len(attendances)
-        total_hours = sum(a.total_hours or Decimal("0") for a in attendances)
-        total_amount = sum(a.total_amount or Decimal("0") for a in attendances)
         
         # 平均日次労働時間
         average_daily_hours = (
-            total_hours / total_days if total_days > 0
+            minutes_to_hours(totals.work_minutes, total_days) if total_days > 0
             else Decimal("0")
         )
         
-        return MonthlyReport(
-            year=year,
-            month=month,
-            total_days=total_days,
-            total_hours=total_hours,
-            total_amount=total_amount,
-            average_daily_hours=average_daily_hours,
-            attendance_list=attendances
-        )
+        # 割増区分ごとの時間
+        premium_hours = {
+            hours_field: minutes_to_hours(getattr(totals, minutes_field))
+            for minutes_field, hours_field in PREMIUM_BUCKETS
+        }
+        
+        return {
+            "total_days": total_days,
+            "total_hours": totals.total_hours,
+            "total_amount": totals.total_amount,
+            "average_daily_hours": average_daily_hours,
+            **premium_hours,
+            "attendance_list": attendances
+        }
+    
+    async def get_monthly_report_data_bulk(
+        self,
+        year: int,
+        month: int,
+        user_ids: Optional[Iterable[int]] = None
+    ) -> List[Tuple[UserRow, Dict[str, Any]]]:
+        """
+        複数ユーザーの月次レポートの項目をまとめて取得（ユーザー・勤怠・休憩・集計の4回のクエリ）
+        user_idsを省略すると全ユーザー（ユーザーID順）
+        """
+        query = select(*USER_COLUMNS).order_by(User.id)
+        if user_ids is not None:
+            query = query.where(User.id.in_(list(user_ids)))
+        result = await self.db.execute(query)
+        users = [UserRow(*row) for row in result.all()]
+        if not users:
+            return []
+        
+        by_user: Dict[int, List[Any]] = {}
+        # アーカイブ済みの年は勤怠の行から集計する（None）
+        totals_by_user: Optional[Dict[int, MonthTotals]] = None
+        if archive_service.is_archived(year):
+            # アーカイブ済みの年はParquetファイルから読み込む
+            for user in users:
+                by_user[user.id] = await asyncio.to_thread(
+                    archive_service.read_monthly_attendances, user.id, year, month
+                )
+        else:
+            _, last_day = monthrange(year, month)
+            conditions = [
+                Attendance.date >= date(year, month, 1),
+                Attendance.date <= date(year, month, last_day)
+            ]
+            if user_ids is not None:
+                conditions.append(Attendance.user_id.in_([user.id for user in users]))
+            repository = AttendanceReadRepository(self.db)
+            rows = await repository.fetch(conditions, order_by=(Attendance.user_id, Attendance.date))
+            for row in rows:
+                by_user.setdefault(row.user_id, []).append(row)
+            totals_by_user = await repository.totals_by_user(conditions)
+        
+        return [
+            (user, self.summarize_month(
+                year, month, by_user.get(user.id, []),
+                totals_by_user.get(user.id, MonthTotals()) if totals_by_user is not None else None
+            ))
+            for user in users
+        ]
     
     async def get_yearly_report(
         self,
@@ -75,46 +226,74 @@ class ReportService:
         # 年間の勤怠データを月別に集計
         monthly_summary = []
         total_yearly_days = 0
-        total_yearly_hours = Decimal("0")
-        total_yearly_amount = Decimal("0")
+        total_yearly_minutes = 0
+        total_yearly_sen = 0
+        total_premium_minutes = {minutes_field: 0 for minutes_field, _ in PREMIUM_BUCKETS}
         
-        for month in range(1, 13):
-            # 月次データ取得
+        if archive_service.is_archived(year):
+            # アーカイブ済みの年はParquetファイルから集計
+            monthly_rows = await asyncio.to_thread(
+                archive_service.read_yearly_summary, user_id, year
+            )
+        else:
+            # 月別の集計を1回のクエリで取得
+            month_column = extract('month', Attendance.date)
             result = await self.db.execute(
                 select(
+                    month_column.label('month'),
                     func.count(Attendance.id).label('days'),
-                    func.sum(Attendance.total_hours).label('hours'),
-                    func.sum(Attendance.total_amount).label('amount')
+                    func.sum(Attendance.work_minutes).label('work_minutes'),
+                    func.sum(Attendance.amount_sen).label('amount_sen'),
+                    *[
+                        func.sum(getattr(Attendance, minutes_field)).label(minutes_field)
+                        for minutes_field, _ in PREMIUM_BUCKETS
+                    ]
                 )
                 .where(and_(
                     Attendance.user_id == user_id,
-                    extract('year', Attendance.date) == year,
-                    extract('month', Attendance.date) == month
+                    Attendance.date >= date(year, 1, 1),
+                    Attendance.date <= date(year, 12, 31)
                 ))
+                .group_by(month_column)
             )
-            monthly_data = result.first()
+            monthly_rows = {int(row.month): row._asdict() for row in result.all()}
+        
+        for month in range(1, 13):
+            monthly_data = monthly_rows.get(month)
+            if monthly_data is None:
+                continue
             
-            days = monthly_data.days or 0
-            hours = monthly_data.hours or Decimal("0")
-            amount = monthly_data.amount or Decimal("0")
+            days = monthly_data["days"] or 0
+            work_minutes = int(monthly_data["work_minutes"] or 0)
+            amount_sen = int(monthly_data["amount_sen"] or 0)
             
             if days > 0:
                 monthly_summary.append({
                     "month": month,
                     "total_days": days,
-                    "total_hours": float(hours),
-                    "total_amount": float(amount),
-                    "average_daily_hours": float(hours / days)
+                    "total_hours": float(minutes_to_hours(work_minutes)),
+                    "total_amount": amount_sen / 100,
+                    "average_daily_hours": work_minutes / 60 / days,
+                    **{
+                        hours_field: float(minutes_to_hours(monthly_data.get(minutes_field)))
+                        for minutes_field, hours_field in PREMIUM_BUCKETS
+                    }
                 })
             
             total_yearly_days += days
-            total_yearly_hours += hours
-            total_yearly_amount += amount
+            total_yearly_minutes += work_minutes
+            total_yearly_sen += amount_sen
+            for minutes_field, _ in PREMIUM_BUCKETS:
+                total_premium_minutes[minutes_field] += monthly_data.get(minutes_field) or 0
         
         return YearlyReport(
             year=year,
             total_days=total_yearly_days,
-            total_hours=total_yearly_hours,
-            total_amount=total_yearly_amount,
-            monthly_summary=monthly_summary
+            total_hours=minutes_to_hours(total_yearly_minutes),
+            total_amount=sen_to_yen(total_yearly_sen),
+            monthly_summary=monthly_summary,
+            **{
+                hours_field: minutes_to_hours(total_premium_minutes[minutes_field])
+                for minutes_field, hours_field in PREMIUM_BUCKETS
+            }
         )
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+変更の順序（sync_xid, sync_seq）による差分同期
+
+勤怠・休憩の作成・更新と削除（sync_tombstones）を (sync_xid, sync_seq, 種別, ID) の順に並べ、
+カーソル以降の変更だけを返す。sync_xid・sync_seq は書き込みのたびにトリガーで設定する（app/core/sync_versioning.py）。
+PostgreSQLでは実行中の最も古いトランザクションより前（sync_xid < pg_snapshot_xmin）の変更だけを返す。
+それ以降に現れる変更はすべてカーソルより後に並ぶため、処理に時間のかかったトランザクションの変更も取りこぼさない
+（実行中のトランザクションがある間は、それより後の変更の同期が待たされる）。
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, delete, literal, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+from app.models.sync_tombstone import SyncTombstone
+from app.services.read_repository import (
+    ATTENDANCE_COLUMNS, BREAK_COLUMNS, attendance_row, break_row
+)
+from app.utils.cursor import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# 同じ順序の値（トリガー作成前の行）の変更の並び順
+KIND_ATTENDANCE = 0
+KIND_BREAK = 1
+KIND_TOMBSTONE = 2
+
+# ((sync_xid, sync_seq, 種別, ID), レスポンスの項目名, 行)
+Change = Tuple[Tuple[int, int, int, int], str, Any]
+
+
+class SyncCursorExpired(Exception):
+    """
+    削除記録の保持期間より古いカーソル（全件の再同期が必要）
+    """
+    pass
+
+
+@dataclass(frozen=True)
+class SyncCursor:
+    """
+    最後に返した変更のキーと発行日時
+    """
+    xid: int
+    seq: int
+    kind: int
+    id: int
+    issued_at: datetime
+
+    @property
+    def key(self) -> Tuple[int, int, int, int]:
+        return (self.xid, self.seq, self.kind, self.id)
+
+    def encode(self) -> str:
+        return encode_cursor([self.xid, self.seq, self.kind, self.id, self.issued_at.isoformat()])
+
+    @classmethod
+    def decode(cls, value: str) -> "SyncCursor":
+        try:
+            values = decode_cursor(value)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid sync cursor: {value}") from e
+        if isinstance(values, list) and len(values) == 3:
+            # 更新日時による以前のカーソルは位置を引き継げないため全件を取り直す
+            raise SyncCursorExpired("Sync cursor was issued before change ordering; full resync required")
+        try:
+            xid, seq, kind, row_id, issued_at = values
+            return cls(int(xid), int(seq), int(kind), int(row_id), datetime.fromisoformat(issued_at))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid sync cursor: {value}") from e
+
+
+def _as_utc(value: datetime) -> datetime:
+    # タイムゾーンなしの値はUTCとして扱う
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SyncService:
+    """
+    差分同期サービス
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _timestamp(self, value: datetime) -> Any:
+        """
+        日時をDBの値と比較できる形で渡す
+        SQLiteはCURRENT_TIMESTAMPの文字列（マイクロ秒なし）で保存されるため同じ書式の文字列で比較する
+        """
+        if self.db.bind.dialect.name == "sqlite":
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return literal(value.isoformat(sep=" "), String)
+        return value
+
+    async def _horizon(self) -> Optional[int]:
+        """
+        これより前のトランザクションはすべて確定している sync_xid（PostgreSQLのみ、SQLiteは書き込みが直列のため不要）
+        """
+        if self.db.bind.dialect.name != "postgresql":
+            return None
+        result = await self.db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+        return result.scalar()
+
+    @staticmethod
+    def _visible(model: Any, kind: int, cursor: Optional[SyncCursor], horizon: Optional[int]) -> Any:
+        """
+        (sync_xid, sync_seq, 種別, ID) がカーソルより後で、確定済みの行の条件
+        """
+        conditions = []
+        if horizon is not None:
+            conditions.append(model.sync_xid < horizon)
+        if cursor is not None:
+            version = tuple_(model.sync_xid, model.sync_seq)
+            if kind > cursor.kind:
+                conditions.append(version >= tuple_(cursor.xid, cursor.seq))
+            elif kind < cursor.kind:
+                conditions.append(version > tuple_(cursor.xid, cursor.seq))
+            else:
+                conditions.append(
+                    tuple_(model.sync_xid, model.sync_seq, model.id) > tuple_(cursor.xid, cursor.seq, cursor.id)
+                )
+        return and_(*conditions)
+
+    async def changes(
+        self,
+        user_id: int,
+        since: Optional[str] = None,
+        limit: int = 500
+    ) -> Dict[str, Any]:
+        """
+        カーソル以降に作成・更新・削除された勤怠と休憩を取得（sinceを省略すると全件）
+        """
+        cursor = SyncCursor.decode(since) if since else None
+        now = datetime.now(timezone.utc)
+        if cursor is not None:
+            if _as_utc(cursor.issued_at) < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+                raise SyncCursorExpired(
+                    f"Sync cursor is older than {settings.SYNC_TOMBSTONE_RETENTION_DAYS} days"
+                )
+        horizon = await self._horizon()
+
+        # 種別ごとにカーソル以降の先頭 limit+1 件を取り、まとめて並べ直す
+        result = await self.db.execute(
+            select(*ATTENDANCE_COLUMNS, Attendance.sync_xid, Attendance.sync_seq)
+            .where(
+                Attendance.user_id == user_id,
+                self._visible(Attendance, KIND_ATTENDANCE, cursor, horizon)
+            )
+            .order_by(Attendance.sync_xid, Attendance.sync_seq, Attendance.id)
+            .limit(limit + 1)
+        )
+        changes: List[Change] = [
+            ((row.sync_xid, row.sync_seq, KIND_ATTENDANCE, row.id), "attendance", attendance_row(row))
+            for row in result.all()
+        ]
+
+        result = await self.db.execute(
+            select(*BREAK_COLUMNS, BreakTime.sync_xid, BreakTime.sync_seq)
+            .join(Attendance, Attendance.id == BreakTime.attendance_id)
+            .where(
+                Attendance.user_id == user_id,
+                self._visible(BreakTime, KIND_BREAK, cursor, horizon)
+            )
+            .order_by(BreakTime.sync_xid, BreakTime.sync_seq, BreakTime.id)
+            .limit(limit + 1)
+        )
+        changes += [
+            ((row.sync_xid, row.sync_seq, KIND_BREAK, row.id), "break_times", break_row(row))
+            for row in result.all()
+        ]
+
+        changes += await self._tombstone_changes(user_id, cursor, horizon, limit)
+
+        changes.sort(key=lambda change: change[0])
+        page = changes[:limit]
+
+        # 削除後に同じIDの行が作られた場合（SQLiteはIDを再利用する）は削除記録を返さない
+        # クライアントは作成・更新を反映してから削除を反映する
+        recreated = set()
+        response: Dict[str, Any] = {"attendance": [], "break_times": [], "deleted": []}
+        for _, bucket, item in reversed(page):
+            if bucket == "deleted":
+                if (item["entity"], item["id"]) in recreated:
+                    continue
+            else:
+                recreated.add(("attendance" if bucket == "attendance" else "break_time", item.id))
+            response[bucket].append(item)
+        for items in response.values():
+            items.reverse()
+
+        # 変更がなくても発行日時を更新したカーソルを返す（同期を続けるクライアントのカーソルは期限切れにならない）
+        if page:
+            next_cursor = SyncCursor(*page[-1][0], issued_at=now)
+        elif cursor is not None:
+            next_cursor = SyncCursor(*cursor.key, issued_at=now)
+        else:
+            next_cursor = SyncCursor(0, 0, KIND_ATTENDANCE, 0, issued_at=now)
+        response["cursor"] = next_cursor.encode()
+        response["has_more"] = len(changes) > limit
+
+        logger.info(
+            f"Sync for user {user_id}: {len(response['attendance'])} attendance, "
+            f"{len(response['break_times'])} break_times, {len(response['deleted'])} deleted"
+        )
+        return response
+
+    async def _tombstone_changes(
+        self,
+        user_id: int,
+        cursor: Optional[SyncCursor],
+        horizon: Optional[int],
+        limit: int
+    ) -> List[Change]:
+        """
+        カーソル以降の削除記録
+        """
+        result = await self.db.execute(
+            select(SyncTombstone)
+            .where(
+                SyncTombstone.user_id == user_id,
+                self._visible(SyncTombstone, KIND_TOMBSTONE, cursor, horizon)
+            )
+            .order_by(SyncTombstone.sync_xid, SyncTombstone.sync_seq, SyncTombstone.id)
+            .limit(limit + 1)
+        )
+        return [
+            ((tombstone.sync_xid, tombstone.sync_seq, KIND_TOMBSTONE, tombstone.id), "deleted", {
+                "entity": tombstone.entity,
+                "id": tombstone.entity_id,
+                "attendance_id": tombstone.attendance_id,
+                "deleted_at": tombstone.deleted_at
+            })
+            for tombstone in result.scalars().all()
+        ]
+
+    async def purge_tombstones(self) -> int:
+        """
+        保持期間を過ぎた削除記録を削除（コミットは呼び出し側で行う）
+        """
+        horizon = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        result = await self.db.execute(
+            delete(SyncTombstone).where(SyncTombstone.deleted_at < self._timestamp(horizon))
+        )
+        logger.info(f"Purged {result.rowcount} sync tombstones older than {horizon:%Y-%m-%d}")
+        return result.rowcount
@@ -0,0 +1,124 @@
+"""
+ユーザー検索（名前・メールアドレスの前方一致/部分一致と時給の範囲）
+
+結果は (name, id) 順のキーセットページネーションで返す（OFFSETのように先頭から読み飛ばさない）。
+部分一致は PostgreSQL では pg_trgm のGINインデックス、SQLite では FTS5（trigram）で絞り込む。
+trigramは3文字未満の検索語には使えないため、その場合はLIKEで検索する。
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.search_index import USERS_FTS_TABLE, user_search_index_available
+from app.models.user import User
+from app.utils.cursor import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("substring", "prefix")
+
+# SQLiteでFTS5のインデックスが使えるか（プロセスごとに1回だけ確認）
+_sqlite_fts_available: Optional[bool] = None
+
+
+def _like_pattern(q: str, mode: str) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if mode == "prefix" else f"%{escaped}%"
+
+
+def _fts_phrase(q: str) -> str:
+    # 検索語をフレーズとして渡す（FTS5の演算子として解釈させない）
+    return '"' + q.replace('"', '""') + '"'
+
+
+class UserSearchService:
+    """
+    ユーザー検索サービス
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _fts_available(self) -> bool:
+        global _sqlite_fts_available
+        if _sqlite_fts_available is None:
+            _sqlite_fts_available = await self.db.run_sync(
+                lambda session: user_search_index_available(session.connection())
+            )
+        return _sqlite_fts_available
+
+    async def _text_condition(self, q: str, mode: str) -> Any:
+        """
+        名前またはメールアドレスが検索語に一致する条件
+        """
+        pattern = _like_pattern(q, mode)
+        if self.db.bind.dialect.name == "postgresql":
+            # ILIKEはpg_trgmのGINインデックスで検索される（前方一致も同じインデックスを使う）
+            return or_(User.name.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\"))
+
+        like = or_(User.name.like(pattern, escape="\\"), User.email.like(pattern, escape="\\"))
+        if len(q) < 3 or not await self._fts_available():
+            return like
+
+        # FTS5で候補を絞り込む（前方一致は候補に対してLIKEで先頭を確認）
+        candidates = User.id.in_(
+            select(text("rowid"))
+            .select_from(text(USERS_FTS_TABLE))
+            .where(text(f"{USERS_FTS_TABLE} MATCH :phrase").bindparams(phrase=_fts_phrase(q)))
+        )
+        return and_(candidates, like) if mode == "prefix" else candidates
+
+    async def search(
+        self,
+        q: Optional[str] = None,
+        mode: str = "substring",
+        min_hourly_rate: Optional[Decimal] = None,
+        max_hourly_rate: Optional[Decimal] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        条件に合うユーザーを名前順で取得（next_cursorを渡すと続きを取得）
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode} (expected one of {', '.join(SEARCH_MODES)})")
+
+        conditions = []
+        q = (q or "").strip()
+        if q:
+            conditions.append(await self._text_condition(q, mode))
+        if min_hourly_rate is not None:
+            conditions.append(User.hourly_rate >= min_hourly_rate)
+        if max_hourly_rate is not None:
+            conditions.append(User.hourly_rate <= max_hourly_rate)
+
+        if cursor:
+            try:
+                last_name, last_id = decode_cursor(cursor)
+                last_id = int(last_id)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Invalid cursor: {cursor}") from e
+            conditions.append(or_(
+                User.name > last_name,
+                and_(User.name == last_name, User.id > last_id)
+            ))
+
+        result = await self.db.execute(
+            select(User)
+            .where(*conditions)
+            .order_by(User.name, User.id)
+            .limit(limit + 1)
+        )
+        users: List[User] = list(result.scalars().all())
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor([users[-1].name, users[-1].id])
+
+        logger.info(f"User search q={q!r} mode={mode}: {len(users)} results")
+        return {"items": users, "next_cursor": next_cursor}
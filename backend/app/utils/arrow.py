@@ -0,0 +1,34 @@
+"""
+Apache Arrow / Parquet 関連のユーティリティ（pyarrowは必要時のみ読み込む）
+"""
+
+from decimal import Decimal
+from typing import Any, Optional
+
+
+class ArrowUnavailableError(RuntimeError):
+    """
+    pyarrowがインストールされていない場合のエラー
+    """
+    pass
+
+
+def require_pyarrow():
+    """
+    pyarrowを読み込む（未インストールの場合はArrowUnavailableError）
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ArrowUnavailableError("pyarrow is required for columnar export (pip install pyarrow)") from e
+    return pyarrow
+
+
+def to_decimal(value: Any, places: str = "0.01") -> Optional[Decimal]:
+    """
+    Arrowのdecimal型に合わせて桁を揃える（SQLiteはfloatで返す場合があるため）
+    """
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(Decimal(places))
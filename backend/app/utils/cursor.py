@@ -0,0 +1,26 @@
+"""
+キーセットページネーションのカーソル（最後に返した行のキーをURLで渡せる文字列にする）
+"""
+
+import base64
+import json
+from typing import Any, List
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value: str) -> List[Any]:
+    """
+    カーソルを値のリストに戻す（不正な値はValueError）
+    """
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {value}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {value}")
+    return values
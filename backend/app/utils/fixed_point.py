@@ -0,0 +1,53 @@
+"""
+労働時間・金額の固定小数点（整数）表現
+
+労働時間は分、金額は銭（1/100円）の整数で保存・集計し、レスポンスを作るときだけ
+従来の形（時間・円の小数点以下2桁のDecimal）に変換する。
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Optional
+
+CENT = Decimal("0.01")
+SEN_PER_YEN = 100
+# 割増率は1万分率の整数で扱う（0.25 -> 2500）
+BASIS_POINTS = 10000
+
+
+def minutes_to_hours(minutes: Optional[int], days: int = 1) -> Decimal:
+    """
+    分 -> 時間（小数点以下2桁、daysを渡すと1日あたり）
+    """
+    return (Decimal(minutes or 0) / (60 * days)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def sen_to_yen(sen: Optional[int]) -> Decimal:
+    """
+    銭 -> 円（小数点以下2桁）
+    """
+    return Decimal(sen or 0).scaleb(-2)
+
+
+def hours_to_minutes(hours: Any) -> int:
+    """
+    時間（Decimal・文字列・数値）-> 分（小数点以下2桁の時間からは元の分に戻る）
+    """
+    return int((Decimal(str(hours or 0)) * 60).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def yen_to_sen(yen: Any) -> int:
+    """
+    円（Decimal・文字列・数値）-> 銭
+    """
+    return int((Decimal(str(yen or 0)) * SEN_PER_YEN).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def to_basis_points(ratio: Any) -> int:
+    return int((Decimal(str(ratio)) * BASIS_POINTS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def divide_half_up(numerator: int, denominator: int) -> int:
+    """
+    0以上の整数の割り算（四捨五入）
+    """
+    return (2 * numerator + denominator) // (2 * denominator)
@@ -0,0 +1,99 @@
+"""
+レスポンスの縮小（?detail=summary と ?fields= による項目の絞り込み）
+"""
+
+import typing
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from app.core.fast_json import FastJSONResponse, fast_json_available
+
+# 項目名 -> 子の項目の木（Noneはその項目を丸ごと返す）
+FieldTree = Dict[str, Optional["FieldTree"]]
+
+
+def _nested_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """
+    List[Model] / Optional[Model] などからモデルを取り出す
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _nested_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel], exclude: Iterable[str] = ()) -> Optional[FieldTree]:
+    """
+    カンマ区切りの項目指定（ネストはドット区切り）を検証して木にする
+    例: total_hours,attendance_list.date,attendance_list.total_hours
+    excludeの項目（summaryで省かれる項目など）は指定できない
+    """
+    if not fields:
+        return None
+
+    excluded = set(exclude)
+    tree: FieldTree = {}
+    for path in (p.strip() for p in fields.split(",")):
+        if not path:
+            continue
+        node = tree
+        current_model: Optional[Type[BaseModel]] = model
+        parts = path.split(".")
+        for depth, name in enumerate(parts):
+            if (
+                current_model is None
+                or name not in current_model.model_fields
+                or ".".join(parts[:depth + 1]) in excluded
+            ):
+                raise ValueError(f"Unknown field: {path}")
+            is_leaf = depth == len(parts) - 1
+            annotation = current_model.model_fields[name].annotation
+            current_model = _nested_model(annotation)
+            if is_leaf:
+                node[name] = None
+            else:
+                child = node.get(name, {})
+                if child is None:
+                    # 親が丸ごと指定済み
+                    break
+                node[name] = child
+                node = child
+    return tree or None
+
+
+def _get(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def project(obj: Any, tree: Optional[FieldTree]) -> Any:
+    """
+    指定された項目だけを残す（dict・dataclass・モデルのいずれにも対応）
+    """
+    if tree is None or obj is None:
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [project(item, tree) for item in obj]
+    return {name: project(_get(obj, name), subtree) for name, subtree in tree.items()}
+
+
+def _to_jsonable(content: Any) -> Any:
+    # Pydanticと同じくDecimalは文字列で返す
+    return jsonable_encoder(content, custom_encoder={Decimal: str})
+
+
+def shaped_response(content: Any) -> Response:
+    """
+    縮小したレスポンスを返す（response_modelの補完を経由しない）
+    """
+    if fast_json_available():
+        return FastJSONResponse(content)
+    return JSONResponse(_to_jsonable(content))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+締め済みの年の勤怠データをアーカイブするスクリプト
+
+使い方:
+    python archive_attendance.py list
+    python archive_attendance.py archive YEAR [--keep-rows]
+    python archive_attendance.py verify YEAR
+"""
+
+import argparse
+import sys
+import os
+
+# パスを追加
+sys.path.append(os.getcwd())
+
+from app.core.database import sync_engine
+from app.services.archive_service import ArchiveError, archive_service
+from app.utils.arrow import ArrowUnavailableError
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="勤怠データのアーカイブ")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="アーカイブ済みの年を表示")
+
+    archive_parser = subparsers.add_parser("archive", help="指定年をアーカイブしてDBから削除")
+    archive_parser.add_argument("year", type=int)
+    archive_parser.add_argument("--keep-rows", action="store_true", help="DBの行を削除しない")
+
+    verify_parser = subparsers.add_parser("verify", help="アーカイブファイルを検証")
+    verify_parser.add_argument("year", type=int)
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            manifest = archive_service.manifest()
+            print(f"📁 Archive directory: {archive_service.archive_dir}")
+            for year in archive_service.archived_years():
+                entry = manifest["years"][str(year)]
+                print(
+                    f"   - {year}: {entry['attendance_rows']} attendance, "
+                    f"{entry['break_rows']} break_times (archived at {entry['archived_at']})"
+                )
+
+        elif args.command == "archive":
+            print(f"🚀 Archiving {args.year} to {archive_service.archive_dir}...")
+            with sync_engine.begin() as conn:
+                entry = archive_service.archive_year(conn, args.year, delete_rows=not args.keep_rows)
+            print(
+                f"✅ Archived {entry['attendance_rows']} attendance and "
+                f"{entry['break_rows']} break_times rows in {len(entry['files'])} files"
+            )
+
+        elif args.command == "verify":
+            archive_service.verify_year(args.year)
+            print(f"✅ Archive for {args.year} is intact")
+
+    except (ArchiveError, ArrowUnavailableError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
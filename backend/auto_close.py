@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+打刻忘れ（未退勤の勤怠・未終了の休憩）を締めるスクリプト（cron用）
+
+使い方:
+    python auto_close.py [--after-hours N] [--policy standard|end_of_day|clock_in] [--dry-run] [--json]
+
+例（毎日3時に実行）:
+    0 3 * * * cd /app && python auto_close.py
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import os
+from datetime import timedelta
+
+# パスを追加
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.events import event_broker
+from app.services.auto_close_service import POLICIES, AutoCloseService
+from app.utils.timezone import now_jst
+
+
+async def run(args: argparse.Namespace) -> int:
+    cutoff = now_jst().replace(tzinfo=None) - timedelta(hours=args.after_hours)
+
+    # 他ワーカーのSSEクライアントにも締めた勤怠を通知する
+    await event_broker.start()
+    try:
+        async with AsyncSessionLocal() as db:
+            report = await AutoCloseService(db).run(cutoff=cutoff, policy=args.policy, dry_run=args.dry_run)
+    finally:
+        await event_broker.stop()
+
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+        return 0
+
+    if report.skipped:
+        print("⏭️  Another auto-close run is in progress; skipped")
+        return 0
+
+    print(f"{'🔍' if args.dry_run else '✅'} {report.summary()}")
+    for item in report.closed_shifts:
+        print(
+            f"   - shift {item['attendance_id']} (user {item['user_id']}, {item['date']}): "
+            f"{item['clock_in']} - {item['clock_out']}"
+        )
+    for item in report.closed_breaks:
+        print(
+            f"   - break {item['break_id']} (user {item['user_id']}, {item['date']}): "
+            f"{item['start_time']} - {item['end_time']}"
+        )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="打刻忘れの自動締め")
+    parser.add_argument(
+        "--after-hours",
+        type=int,
+        default=settings.AUTO_CLOSE_AFTER_HOURS,
+        help="出勤からこの時間を過ぎても退勤していない勤怠を対象にする"
+    )
+    parser.add_argument("--policy", choices=POLICIES, default=settings.AUTO_CLOSE_POLICY)
+    parser.add_argument("--dry-run", action="store_true", help="対象を表示するだけで更新しない")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
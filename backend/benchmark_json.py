@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+一覧系エンドポイントのJSONレスポンスの速度比較（Pydantic経由 と orjson高速経路）
+
+一時ディレクトリのSQLiteにテストデータを作成し、勤怠一覧・月間カレンダー・月次レポートを
+両方の経路で呼び出して所要時間を比較する（レスポンスが同じJSONになることも確認する）。
+
+使い方:
+    python benchmark_json.py [--days 1000] [--breaks 2] [--iterations 50]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+
+# 一時ディレクトリのSQLiteを使う（設定の読み込み前に指定する）
+_workdir = tempfile.mkdtemp(prefix="attendance-bench-")
+os.environ["DB_TYPE"] = "sqlite"
+os.environ["HOME"] = _workdir
+
+# パスを追加
+sys.path.append(os.getcwd())
+
+import logging
+logging.disable(logging.INFO)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.database import Base, sync_engine
+from app.models.attendance import Attendance
+from app.models.break_time import BreakTime
+from app.models.user import User
+
+
+def seed(days: int, breaks_per_day: int) -> int:
+    """
+    1ユーザー分の勤怠を過去days日分作成
+    """
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        user_id = conn.execute(
+            insert(User).values(name="bench", email="bench@example.com", hourly_rate=Decimal("1200"))
+        ).inserted_primary_key[0]
+
+        start = date.today() - timedelta(days=days - 1)
+        attendance_rows = [
+            {
+                "user_id": user_id,
+                "date": start + timedelta(days=i),
+                "clock_in": dt_time(9, 0),
+                "clock_out": dt_time(18, 0),
+                "work_minutes": 480,
+                "amount_sen": 960000,
+                "total_hours": Decimal("8.00"),
+                "total_amount": Decimal("9600.00"),
+                "regular_minutes": 480,
+            }
+            for i in range(days)
+        ]
+        conn.execute(insert(Attendance), attendance_rows)
+
+        ids = conn.execute(
+            Attendance.__table__.select().with_only_columns(Attendance.id, Attendance.date)
+        ).all()
+        break_rows = [
+            {
+                "attendance_id": attendance_id,
+                "attendance_date": work_date,
+                "start_time": dt_time(12 + b, 0),
+                "end_time": dt_time(12 + b, 30),
+                "duration": 30,
+            }
+            for attendance_id, work_date in ids
+            for b in range(breaks_per_day)
+        ]
+        if break_rows:
+            conn.execute(insert(BreakTime), break_rows)
+    return user_id
+
+
+def measure(client: TestClient, path: str, params: dict, iterations: int):
+    response = client.get(path, params=params)
+    response.raise_for_status()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        client.get(path, params=params)
+    elapsed = (time.perf_counter() - started) / iterations
+    return elapsed, response.json(), len(response.content)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="JSONレスポンスの速度比較")
+    parser.add_argument("--days", type=int, default=1000, help="作成する勤怠の日数")
+    parser.add_argument("--breaks", type=int, default=2, help="1日あたりの休憩数")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    from app.core.fast_json import fast_json_available
+    if not fast_json_available():
+        print("❌ orjson is not installed")
+        return 1
+
+    print(f"🚀 Seeding {args.days} days x {args.breaks} breaks into {_workdir}...")
+    user_id = seed(args.days, args.breaks)
+    today = date.today()
+
+    import main as app_main
+    settings.PUNCH_BUFFER_ENABLED = False
+    settings.JOB_WORKER_ENABLED = False
+    settings.AUTO_CLOSE_ENABLED = False
+
+    routes = [
+        ("list", "/api/attendance/", {"user_id": user_id, "limit": 1000}),
+        ("calendar", "/api/attendance/calendar", {"user_id": user_id, "year": today.year, "month": today.month}),
+        ("monthly", "/api/reports/monthly", {"user_id": user_id, "year": today.year, "month": today.month}),
+    ]
+
+    print(f"{'route':<10}{'pydantic (ms)':>15}{'orjson (ms)':>15}{'speedup':>10}{'bytes':>10}  same JSON")
+    with TestClient(app_main.app) as client:
+        for name, path, params in routes:
+            settings.FAST_JSON_RESPONSES = False
+            slow, slow_json, size = measure(client, path, params, args.iterations)
+            settings.FAST_JSON_RESPONSES = True
+            fast, fast_json, _ = measure(client, path, params, args.iterations)
+            same = "✅" if slow_json == fast_json else "❌"
+            print(f"{name:<10}{slow * 1000:>15.2f}{fast * 1000:>15.2f}{slow / fast:>9.2f}x{size:>10}  {same}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        shutil.rmtree(_workdir, ignore_errors=True)
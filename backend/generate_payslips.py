@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+給与明細書（HTML）を全ユーザー分まとめて作成するスクリプト
+
+出力先が .zip で終わればzipファイル、それ以外はディレクトリに書き出す。
+描画はプロセスプールで並列に行い、件数・所要時間・1秒あたりの件数を表示する。
+
+使い方:
+    python generate_payslips.py --year 2026 --month 9 [--output payslips.zip] [--user-id 1 --user-id 2]
+                                [--workers N] [--chunk-size N] [--scaling] [--json]
+
+    --scaling を付けると、取得したデータを 1, 2, 4, ... CPUコア数 のプロセス数で描画し直して
+    スループットを比較する（出力は一時ディレクトリに書き出して削除する）。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+# パスを追加
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.payslip_service import PayslipService, default_workers, render_documents
+
+
+def _worker_counts() -> list:
+    counts, workers = [], 1
+    while workers < (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+async def scaling(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        payloads = await PayslipService(db).collect(args.year, args.month, args.user_id)
+    if not payloads:
+        print("❌ No users found")
+        return 1
+
+    print(f"🚀 Rendering {len(payloads)} payslips (chunk size {args.chunk_size})")
+    print(f"{'workers':>8}{'seconds':>10}{'docs/s':>10}{'speedup':>9}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in _worker_counts():
+            output = os.path.join(workdir, f"w{workers}")
+            started = time.perf_counter()
+            render_documents(payloads, pathlib.Path(output), workers, args.chunk_size)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"{workers:>8}{elapsed:>10.2f}{len(payloads) / elapsed:>10.0f}{baseline / elapsed:>8.2f}x")
+    return 0
+
+
+async def run(args: argparse.Namespace) -> int:
+    if args.scaling:
+        return await scaling(args)
+
+    async with AsyncSessionLocal() as db:
+        report = await PayslipService(db).generate(
+            args.year,
+            args.month,
+            output=args.output,
+            user_ids=args.user_id,
+            workers=args.workers,
+            chunk_size=args.chunk_size
+        )
+
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(f"✅ {report.summary()}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="給与明細書の一括作成")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="MONTH")
+    parser.add_argument("--output", help="出力先（.zipならzipファイル、それ以外はディレクトリ）")
+    parser.add_argument("--user-id", type=int, action="append", help="対象ユーザー（複数指定可、省略で全員）")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="描画に使うプロセス数")
+    parser.add_argument("--chunk-size", type=int, default=settings.PAYSLIP_CHUNK_SIZE, help="1回にワーカーへ渡す人数")
+    parser.add_argument("--scaling", action="store_true", help="プロセス数ごとのスループットを比較する")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
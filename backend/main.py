@@ -2,9 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
+from app.core.cache import cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.database import sync_engine, Base, initialize_database
-from app.api.routes import users, attendance, breaks, reports
+from app.core.events import event_broker
+from app.services.punch_buffer import punch_buffer
+from app.services.auto_close_service import auto_close_scheduler
+from app.services.job_service import job_worker
+from app.api.routes import users, attendance, breaks, reports, events, analytics, compliance, jobs, dashboard, sync
 
 # ロギング設定
 logging.basicConfig(
@@ -23,7 +29,7 @@ app = FastAPI(
 
 
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     """
     アプリケーション起動時の処理
     """
@@ -38,14 +44,37 @@ def startup_event():
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
+    
+    # イベント配信の開始
+    await event_broker.start()
+    
+    # 他のワーカーからのキャッシュ無効化の受信
+    await cache.start()
+    
+    # 打刻バッファの開始（未反映の打刻はログから復元される）
+    if settings.PUNCH_BUFFER_ENABLED:
+        await punch_buffer.start()
+    
+    # バックグラウンドジョブのワーカー
+    if settings.JOB_WORKER_ENABLED:
+        await job_worker.start()
+    
+    # 打刻忘れの自動締め（毎日決まった時刻に実行）
+    if settings.AUTO_CLOSE_ENABLED:
+        await auto_close_scheduler.start()
 
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     """
     アプリケーション終了時の処理
     """
     logger.info("Shutting down application...")
+    await auto_close_scheduler.stop()
+    await job_worker.stop()
+    await punch_buffer.stop()
+    await event_broker.stop()
+    await cache.close()
     sync_engine.dispose()
 
 # CORS設定
@@ -57,11 +86,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンス圧縮
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
 # ルーターの登録
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(attendance.router, prefix="/api/attendance", tags=["attendance"])
 app.include_router(breaks.router, prefix="/api/breaks", tags=["breaks"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(compliance.router, prefix="/api/compliance", tags=["compliance"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 
 
 @app.get("/")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+勤怠テーブルのパーティションを管理するスクリプト（PostgreSQLのみ）
+
+使い方:
+    python manage_partitions.py list
+    python manage_partitions.py ensure [--months-ahead N]
+    python manage_partitions.py convert
+    python manage_partitions.py detach YEAR [MONTH]
+"""
+
+import argparse
+import sys
+import os
+from datetime import date
+
+# パスを追加
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.database import sync_engine
+from app.core.partitioning import (
+    INTERVALS, convert_to_partitioned, detach_partition, ensure_partitions,
+    is_partitioned, list_partitions, lock_partition_maintenance
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="勤怠テーブルのパーティション管理")
+    parser.add_argument(
+        "--interval",
+        default=settings.ATTENDANCE_PARTITION_INTERVAL,
+        help="パーティション単位（monthly / yearly）"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="パーティション一覧を表示")
+
+    ensure_parser = subparsers.add_parser("ensure", help="今後のパーティションを作成")
+    ensure_parser.add_argument("--months-ahead", type=int, default=settings.ATTENDANCE_PARTITION_MONTHS_AHEAD)
+
+    subparsers.add_parser("convert", help="既存テーブルをパーティションテーブルへ移行")
+
+    detach_parser = subparsers.add_parser("detach", help="古いパーティションを切り離す")
+    detach_parser.add_argument("year", type=int)
+    detach_parser.add_argument("month", type=int, nargs="?")
+
+    args = parser.parse_args()
+
+    if settings.DB_TYPE.lower() == "sqlite":
+        print("❌ Partitioning is only supported on PostgreSQL")
+        return 1
+
+    interval = args.interval.lower()
+    if args.command != "list" and interval not in INTERVALS:
+        print(f"❌ Set --interval or ATTENDANCE_PARTITION_INTERVAL to one of: {', '.join(INTERVALS)}")
+        return 1
+
+    with sync_engine.begin() as conn:
+        if args.command != "list":
+            # 起動中のサーバーのパーティション作成と同時に実行しない
+            lock_partition_maintenance(conn)
+
+        if args.command == "list":
+            if not is_partitioned(conn):
+                print("📊 attendance is not partitioned")
+                return 0
+            for table in ("attendance", "break_times"):
+                print(f"📊 {table}:")
+                for name, bound in list_partitions(conn, table):
+                    print(f"   - {name}: {bound}")
+
+        elif args.command == "convert":
+            if is_partitioned(conn):
+                print("✅ attendance is already partitioned")
+                return 0
+            convert_to_partitioned(conn, interval)
+            print(f"✅ Converted attendance and break_times to {interval} partitions")
+
+        elif args.command == "ensure":
+            if not is_partitioned(conn):
+                print("❌ attendance is not partitioned (run 'convert' first)")
+                return 1
+            created = ensure_partitions(conn, interval, args.months_ahead)
+            print(f"✅ Created {created} partitions")
+
+        elif args.command == "detach":
+            if interval == "monthly" and args.month is None:
+                print("❌ MONTH is required for monthly partitions")
+                return 1
+            start = date(args.year, args.month or 1, 1)
+            detached = detach_partition(conn, start, interval)
+            if not detached:
+                print(f"⚠️  No attached partition found for {start:%Y-%m}")
+                return 1
+            for name in detached:
+                print(f"✅ Detached {name}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""
+テスト共通の設定
+
+アプリのモジュールを読み込む前に、データベースを一時ディレクトリのSQLiteに向ける
+（モデルの読み込み時にエンジンが作成されるため）。
+"""
+
+import os
+import tempfile
+
+os.environ["DB_TYPE"] = "sqlite"
+os.environ["HOME"] = tempfile.mkdtemp(prefix="attendance-test-")
@@ -0,0 +1,151 @@
+"""
+割増賃金の区間演算（深夜帯・法定休日・週40時間）のテスト
+
+ルールセットは既定値（1日8時間・週40時間・日曜起算・日曜が法定休日・深夜22〜5時）を使う。
+"""
+
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.services.pay_rules import PayRuleSet, ShiftInput, compile_rules
+
+SUNDAY = date(2026, 10, 18)  # 日曜（法定休日・週の起算日）
+MONDAY = SUNDAY + timedelta(days=1)
+TUESDAY = SUNDAY + timedelta(days=2)
+SATURDAY = SUNDAY + timedelta(days=6)
+
+
+@pytest.fixture
+def rules():
+    return compile_rules(PayRuleSet())
+
+
+def shift(work_date, clock_in, clock_out, breaks=(), attendance_id=1, hourly_rate=None):
+    return ShiftInput(
+        attendance_id=attendance_id,
+        user_id=1,
+        date=work_date,
+        clock_in=clock_in,
+        clock_out=clock_out,
+        hourly_rate=hourly_rate,
+        breaks=list(breaks)
+    )
+
+
+def evaluate_one(rules, value):
+    return rules.evaluate([value])[value.attendance_id]
+
+
+def test_night_window_across_midnight(rules):
+    result = evaluate_one(rules, shift(TUESDAY, time(20, 0), time(3, 0)))
+
+    assert result.work_minutes == 420
+    assert result.night_minutes == 300  # 22:00〜3:00
+    assert result.regular_minutes == 420
+    assert result.overtime_minutes == 0
+
+
+def test_night_window_with_break_after_midnight(rules):
+    result = evaluate_one(rules, shift(TUESDAY, time(20, 0), time(3, 0), [(time(0, 0), time(1, 0))]))
+
+    assert result.work_minutes == 360
+    assert result.night_minutes == 240  # 22:00〜0:00 と 1:00〜3:00
+
+
+def test_early_morning_night_window(rules):
+    result = evaluate_one(rules, shift(TUESDAY, time(4, 0), time(9, 0)))
+
+    assert result.night_minutes == 60  # 4:00〜5:00
+
+
+def test_holiday_window_starting_on_previous_day(rules):
+    # 土曜の夜から法定休日（日曜）にかかる勤務は0時以降だけが休日労働
+    result = evaluate_one(rules, shift(SATURDAY, time(20, 0), time(2, 0)))
+
+    assert result.work_minutes == 360
+    assert result.holiday_minutes == 120
+    assert result.regular_minutes == 240
+    assert result.night_minutes == 240
+
+
+def test_holiday_window_ending_on_next_day(rules):
+    # 日曜の夜から月曜にかかる勤務は0時までが休日労働
+    result = evaluate_one(rules, shift(SUNDAY, time(22, 0), time(6, 0)))
+
+    assert result.work_minutes == 480
+    assert result.holiday_minutes == 120
+    assert result.regular_minutes == 360
+    assert result.overtime_minutes == 0
+    assert result.night_minutes == 420
+
+
+def test_weekly_overtime_boundary_is_exactly_40_hours(rules):
+    shifts = [
+        shift(MONDAY + timedelta(days=day), time(9, 0), time(17, 0), attendance_id=day + 1)
+        for day in range(5)
+    ]
+    results = rules.evaluate(shifts)
+
+    assert sum(r.regular_minutes for r in results.values()) == 40 * 60
+    assert all(r.overtime_minutes == 0 for r in results.values())
+
+
+def test_weekly_overtime_after_40_hours(rules):
+    shifts = [
+        shift(MONDAY + timedelta(days=day), time(9, 0), time(17, 0), attendance_id=day + 1)
+        for day in range(5)
+    ]
+    shifts.append(shift(SATURDAY, time(9, 0), time(13, 0), attendance_id=6))
+    # 入力の順序によらず日付順に判定する
+    results = rules.evaluate(reversed(shifts))
+
+    assert results[6].regular_minutes == 0
+    assert results[6].overtime_minutes == 240
+    assert sum(r.regular_minutes for r in results.values()) == 40 * 60
+
+
+def test_daily_overtime_does_not_count_toward_weekly_limit(rules):
+    shifts = [
+        shift(MONDAY + timedelta(days=day), time(9, 0), time(18, 0), attendance_id=day + 1)
+        for day in range(5)
+    ]
+    results = rules.evaluate(shifts)
+
+    # 1日8時間を超えた分だけが時間外（週の法定内はちょうど40時間）
+    assert [r.overtime_minutes for r in results.values()] == [60] * 5
+    assert sum(r.regular_minutes for r in results.values()) == 40 * 60
+
+
+def test_weekly_limit_resets_at_week_start(rules):
+    shifts = [
+        shift(MONDAY + timedelta(days=day), time(9, 0), time(17, 0), attendance_id=day + 1)
+        for day in range(5)
+    ]
+    shifts.append(shift(SATURDAY + timedelta(days=2), time(9, 0), time(17, 0), attendance_id=6))
+    results = rules.evaluate(shifts)
+
+    assert results[6].regular_minutes == 480
+    assert results[6].overtime_minutes == 0
+
+
+def test_holiday_work_is_excluded_from_weekly_limit(rules):
+    shifts = [shift(SUNDAY, time(9, 0), time(17, 0), attendance_id=1)]
+    shifts += [
+        shift(MONDAY + timedelta(days=day), time(9, 0), time(17, 0), attendance_id=day + 2)
+        for day in range(5)
+    ]
+    results = rules.evaluate(shifts)
+
+    assert results[1].holiday_minutes == 480
+    assert results[1].regular_minutes == 0
+    assert all(results[day + 2].overtime_minutes == 0 for day in range(5))
+
+
+def test_price_includes_premiums(rules):
+    result = evaluate_one(rules, shift(TUESDAY, time(9, 0), time(19, 0), hourly_rate=Decimal("1000")))
+
+    # 600分 × 1000円/60 + 時間外120分 × 1000円/60 × 0.25
+    assert result.overtime_minutes == 120
+    assert result.total_amount == Decimal("10500.00")
@@ -0,0 +1,140 @@
+"""
+打刻バッファのDB反映（障害時の再試行と打刻の破棄）のテスト
+
+DBへの反映（_apply）を差し替えて、キュー・追記ログ・反映済み位置の扱いだけを確認する。
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.punch_buffer import PunchBuffer
+
+
+class FakeDatabase:
+    """
+    指定した回数だけ失敗してから反映に成功するDB
+    """
+
+    def __init__(self, failures: int = 0, error=None, rejected=()):
+        self.failures = failures
+        self.error = error or OperationalError("INSERT INTO attendance", {}, Exception("connection refused"))
+        self.rejected = set(rejected)
+        self.calls = 0
+        self.applied = []
+
+    async def apply(self, batch):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        if any(punch.user_id in self.rejected for punch in batch):
+            raise IntegrityError("INSERT INTO attendance", {}, Exception("constraint failed"))
+        self.applied.extend(batch)
+
+
+def make_buffer(tmp_path, database: FakeDatabase) -> PunchBuffer:
+    buffer = PunchBuffer(tmp_path / "punches.log", flush_interval_ms=10, max_batch_size=500)
+    buffer._apply = database.apply
+    return buffer
+
+
+async def wait_until(condition, timeout: float = 5.0) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_operational_errors_keep_punch_until_database_recovers(tmp_path):
+    database = FakeDatabase(failures=PunchBuffer.MAX_BATCH_FAILURES + 3)
+    buffer = make_buffer(tmp_path, database)
+    await buffer.start()
+    try:
+        punch = await buffer.submit(user_id=1, kind="clock_in")
+
+        await wait_until(lambda: 1 not in buffer.presence)
+
+        assert database.calls == PunchBuffer.MAX_BATCH_FAILURES + 4
+        assert [p.punch_id for p in database.applied] == [punch.punch_id]
+        assert buffer.log.read_checkpoint() == punch.seq
+    finally:
+        await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_operational_errors_do_not_checkpoint_past_punch(tmp_path):
+    database = FakeDatabase(failures=1000)
+    buffer = make_buffer(tmp_path, database)
+    await buffer.start()
+    punch = await buffer.submit(user_id=1, kind="clock_in")
+    await wait_until(lambda: database.calls > PunchBuffer.MAX_BATCH_FAILURES)
+
+    assert [p.punch_id for p in await buffer.pending_for(1)] == [punch.punch_id]
+    assert buffer.log.read_checkpoint() == 0
+    await buffer.stop()
+
+    # 再起動後にログから復元して反映する
+    recovered = FakeDatabase()
+    buffer = make_buffer(tmp_path, recovered)
+    await buffer.start()
+    try:
+        await wait_until(lambda: 1 not in buffer.presence)
+        assert [p.punch_id for p in recovered.applied] == [punch.punch_id]
+    finally:
+        await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_delay_is_capped(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "PUNCH_RETRY_MAX_SECONDS", 0.05)
+    buffer = make_buffer(tmp_path, FakeDatabase())
+    error = OperationalError("SELECT 1", {}, Exception("connection refused"))
+    for _ in range(10):
+        buffer._back_off(1, error)
+    assert buffer._retry_delay == 0.05
+
+
+@pytest.mark.asyncio
+async def test_integrity_error_drops_only_rejected_punch(tmp_path):
+    database = FakeDatabase(rejected={2})
+    buffer = make_buffer(tmp_path, database)
+    await buffer.start()
+    try:
+        accepted = await buffer.submit(user_id=1, kind="clock_in")
+        rejected = await buffer.submit(user_id=2, kind="clock_in")
+
+        await wait_until(lambda: not buffer.presence)
+
+        assert [p.punch_id for p in database.applied] == [accepted.punch_id]
+        assert buffer.log.read_checkpoint() == rejected.seq
+    finally:
+        await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_other_worker_sees_unapplied_punch(tmp_path):
+    # 同じディレクトリの2つのバッファは別々のスロットのログを使う（ワーカー2つ分）
+    down = FakeDatabase(failures=1000)
+    worker = make_buffer(tmp_path, down)
+    await worker.start()
+    reader = make_buffer(tmp_path, FakeDatabase())
+    await reader.start()
+    try:
+        punch = await worker.submit(user_id=1, kind="clock_in")
+        assert worker.log.path != reader.log.path
+
+        assert [p.punch_id for p in await reader.pending_for(1)] == [punch.punch_id]
+        assert not await reader.wait_for_user(1, timeout=0.05)
+
+        down.failures = 0
+        assert await reader.wait_for_user(1, timeout=5.0)
+        assert await reader.pending_for(1) == []
+        assert [p.punch_id for p in down.applied] == [punch.punch_id]
+    finally:
+        await reader.stop()
+        await worker.stop()
@@ -22,10 +22,18 @@ CREATE TABLE IF NOT EXISTS attendance (
     date DATE NOT NULL,
     clock_in TIME,
     clock_out TIME,
-    total_hours DECIMAL(5,2) DEFAULT 0,
-    total_amount DECIMAL(10,2) DEFAULT 0,
+    work_minutes INTEGER DEFAULT 0, -- 労働時間（分）
+    amount_sen BIGINT DEFAULT 0, -- 支給額（銭）
+    total_hours DECIMAL(5,2) DEFAULT 0, -- work_minutesの時間表記
+    total_amount DECIMAL(10,2) DEFAULT 0, -- amount_senの円表記
+    regular_minutes INTEGER DEFAULT 0, -- 法定内労働（分）
+    overtime_minutes INTEGER DEFAULT 0, -- 時間外労働（分）
+    night_minutes INTEGER DEFAULT 0, -- 深夜労働（分）
+    holiday_minutes INTEGER DEFAULT 0, -- 法定休日労働（分）
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sync_xid BIGINT NOT NULL DEFAULT 0, -- 差分同期用: 書き込んだトランザクションのID
+    sync_seq BIGINT NOT NULL DEFAULT 0, -- 差分同期用: 書き込み順の連番
     UNIQUE(user_id, date)
 );
 
@@ -33,11 +41,67 @@ CREATE TABLE IF NOT EXISTS attendance (
 CREATE TABLE IF NOT EXISTS break_times (
     id SERIAL PRIMARY KEY,
     attendance_id INTEGER REFERENCES attendance(id) ON DELETE CASCADE,
+    attendance_date DATE, -- 勤怠の日付（パーティションキー）
     start_time TIME NOT NULL,
     end_time TIME,
     duration INTEGER DEFAULT 0, -- 分単位
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sync_xid BIGINT NOT NULL DEFAULT 0,
+    sync_seq BIGINT NOT NULL DEFAULT 0
+);
+
+-- overtime_accumulatorsテーブルの作成（36協定の時間外労働累計、month=0は協定年度の累計）
+CREATE TABLE IF NOT EXISTS overtime_accumulators (
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    overtime_minutes INTEGER NOT NULL DEFAULT 0,
+    holiday_minutes INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, year, month)
+);
+
+-- jobsテーブルの作成（バックグラウンドジョブのキュー）
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    type VARCHAR(100) NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL,
+    locked_by VARCHAR(64),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    result JSON,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- sync_tombstonesテーブルの作成（差分同期で削除を伝えるための記録）
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id SERIAL PRIMARY KEY,
+    entity VARCHAR(20) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    attendance_id INTEGER,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    sync_xid BIGINT NOT NULL DEFAULT 0,
+    sync_seq BIGINT NOT NULL DEFAULT 0
+);
+
+-- idempotency_keysテーブルの作成（Idempotency-Keyによる再送時のレスポンス再利用）
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(64) PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'completed', -- pending: 処理中として予約済み
+    status_code INTEGER NOT NULL,
+    response_body TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
 
 -- 更新日時を自動更新するトリガー関数
@@ -59,10 +123,47 @@ CREATE TRIGGER update_attendance_updated_at BEFORE UPDATE ON attendance
 CREATE TRIGGER update_break_times_updated_at BEFORE UPDATE ON break_times
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- 差分同期用の変更の順序を設定するトリガー関数（backend/app/core/sync_versioning.py と同じ）
+CREATE SEQUENCE IF NOT EXISTS sync_change_seq;
+
+CREATE OR REPLACE FUNCTION set_sync_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.sync_xid = pg_current_xact_id()::text::bigint;
+    NEW.sync_seq = nextval('sync_change_seq');
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER set_sync_version_attendance BEFORE INSERT OR UPDATE ON attendance
+    FOR EACH ROW EXECUTE FUNCTION set_sync_version();
+
+CREATE TRIGGER set_sync_version_break_times BEFORE INSERT OR UPDATE ON break_times
+    FOR EACH ROW EXECUTE FUNCTION set_sync_version();
+
+CREATE TRIGGER set_sync_version_sync_tombstones BEFORE INSERT OR UPDATE ON sync_tombstones
+    FOR EACH ROW EXECUTE FUNCTION set_sync_version();
+
 -- インデックスの作成（パフォーマンス向上）
 CREATE INDEX IF NOT EXISTS idx_attendance_user_id_date ON attendance(user_id, date);
 CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date);
+CREATE INDEX IF NOT EXISTS idx_attendance_open_shifts ON attendance(date) WHERE clock_out IS NULL;
 CREATE INDEX IF NOT EXISTS idx_break_times_attendance_id ON break_times(attendance_id);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+CREATE INDEX IF NOT EXISTS idx_overtime_accumulators_period ON overtime_accumulators(year, month, overtime_minutes);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority, run_after);
+CREATE INDEX IF NOT EXISTS idx_users_name_id ON users(name, id);
+CREATE INDEX IF NOT EXISTS idx_users_hourly_rate ON users(hourly_rate);
+CREATE INDEX IF NOT EXISTS idx_attendance_user_sync ON attendance(user_id, sync_xid, sync_seq);
+CREATE INDEX IF NOT EXISTS idx_break_times_sync ON break_times(sync_xid, sync_seq);
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_sync ON sync_tombstones(user_id, sync_xid, sync_seq);
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_deleted_at ON sync_tombstones(deleted_at);
+-- ユーザー検索（名前・メールアドレスの部分一致）用のトライグラムインデックス
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+-- 未終了の休憩は勤怠ごとに1件のみ（休憩開始時の重複チェックを制約で行う）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_break_times_open_attendance ON break_times(attendance_id) WHERE end_time IS NULL;
 
 -- サンプルデータの挿入（開発用）
 INSERT INTO users (name, email, hourly_rate) VALUES